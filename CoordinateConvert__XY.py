@@ -1,5 +1,5 @@
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
 import math
 import argparse
 import sys
@@ -22,30 +22,46 @@ def load_coordinates(input_source):
             sys.exit(1)
 
 
-def transform_coordinates(coords, x_offset, y_offset, theta_deg, scale):
-    """坐标转换核心函数（先旋转再缩放平移）"""
+def transform_matrix(theta_deg, scale):
+    """转换矩阵（含Y轴翻转、旋转和缩放），作用于行向量 [x, y]"""
     theta = math.radians(theta_deg)
     cos_theta = math.cos(theta)
     sin_theta = math.sin(theta)
-    transformed = []
+    # y取反后旋转：rx = x*cos - y*sin, ry = -x*sin - y*cos
+    return scale * np.array([[cos_theta, -sin_theta],
+                             [-sin_theta, -cos_theta]]).T
 
-    for x, y in coords:
-        y=0-y
-        # 先旋转（逆时针）
-        rx = x * cos_theta + y * sin_theta
-        ry = -x * sin_theta + y * cos_theta
 
-        # 再缩放
-        sx = rx * scale
-        sy = ry * scale
+def transform_array(xy, x_offset, y_offset, theta_deg, scale):
+    """向量化坐标转换，xy为(N, 2)数组"""
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    return xy @ transform_matrix(theta_deg, scale) + np.array([x_offset, y_offset])
 
-        # 最后平移
-        new_x = sx + x_offset
-        new_y = sy + y_offset
 
-        transformed.append((new_x, new_y))
+def transform_coordinates(coords, x_offset, y_offset, theta_deg, scale):
+    """坐标转换核心函数（先旋转再缩放平移）"""
+    if len(coords) == 0:
+        return []
+    transformed = transform_array(coords, x_offset, y_offset, theta_deg, scale)
+    return [tuple(point) for point in transformed.tolist()]
+
+
+def stream_transform(input_file, output_file, x_offset, y_offset, theta_deg, scale,
+                     chunksize=200000):
+    """分块流式转换CSV，边读边写，返回处理的点数"""
+    matrix = transform_matrix(theta_deg, scale)
+    offset = np.array([x_offset, y_offset])
+    total = 0
+    with open(output_file, 'w', newline='') as out:
+        out.write('Transformed_X,Transformed_Y\n')
+        for chunk in pd.read_csv(input_file, usecols=['X', 'Y'], dtype=float,
+                                 chunksize=chunksize):
+            transformed = chunk.to_numpy() @ matrix + offset
+            np.savetxt(out, transformed, delimiter=',', fmt='%.6f')
+            total += len(transformed)
+    print(f"结果已保存至：{output_file}（{total} 个点）")
+    return total
 
-    return transformed
 
 def save_results( transformed, output_path):
     """保存结果到CSV"""
@@ -59,6 +75,7 @@ def save_results( transformed, output_path):
 # 使用示例
 def plot_preview(original, transformed):
     """可视化对比图"""
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 5))
 
     # 原始坐标（蓝色）
@@ -80,15 +97,36 @@ def plot_preview(original, transformed):
     plt.grid(True, linestyle='--', alpha=0.6)
     plt.legend()
     plt.show()
-if __name__ == "__main__":
-    # 示例参数：新坐标系原点在(2,3)，逆时针旋转30度，缩放0.5倍
-    x_offset = -250
-    y_offset = 15
-    theta_deg = 0
-    scale = 0.5
+def preview_file(input_file, x_offset, y_offset, theta_deg, scale, limit=2000):
+    """仅读取前limit个点生成预览"""
+    df = pd.read_csv(input_file, usecols=['X', 'Y'], nrows=limit)
+    original = list(zip(df['X'], df['Y']))
+    plot_preview(original, transform_coordinates(original, x_offset, y_offset, theta_deg, scale))
 
 
-    origondata=load_coordinates("test.csv")
-    transferedata=transform_coordinates(origondata,x_offset,y_offset,theta_deg,scale)
-    save_results(transferedata,"transformedresult,csv")
-    plot_preview(origondata,transferedata)
\ No newline at end of file
+if __name__ == "__main__":
+    # 示例参数：新坐标系原点在(-250,15)，不旋转，缩放0.5倍
+    parser = argparse.ArgumentParser(description="CSV坐标流式转换")
+    parser.add_argument("input", nargs='?', default="test.csv",
+                        help="输入CSV（含X、Y列），或坐标串 \"x1,y1 x2,y2 ...\"")
+    parser.add_argument("output", nargs='?', default="transformedresult,csv", help="输出CSV")
+    parser.add_argument("--x-offset", type=float, default=-250)
+    parser.add_argument("--y-offset", type=float, default=15)
+    parser.add_argument("--theta", type=float, default=0, help="旋转角度（度）")
+    parser.add_argument("--scale", type=float, default=0.5)
+    parser.add_argument("--chunksize", type=int, default=200000, help="每块读取的行数")
+    parser.add_argument("--preview", action="store_true", help="转换后显示预览图")
+    args = parser.parse_args()
+
+    if args.input.endswith('.csv'):
+        stream_transform(args.input, args.output, args.x_offset, args.y_offset,
+                         args.theta, args.scale, args.chunksize)
+        if args.preview:
+            preview_file(args.input, args.x_offset, args.y_offset, args.theta, args.scale)
+    else:
+        # 坐标串输入：点数很少，直接在内存中转换
+        original = load_coordinates(args.input)
+        transformed = transform_coordinates(original, args.x_offset, args.y_offset, args.theta, args.scale)
+        save_results(transformed, args.output)
+        if args.preview:
+            plot_preview(original, transformed)
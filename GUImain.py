@@ -6,12 +6,18 @@ import threading
 import numpy as np
 import pandas as pd
 import control
+import countbyhand as CO
 import time
 import math
 import os
 import sys
+import json
+import hashlib
 import CoordinateConvert__XY as CXY
 import WenxingCircle as WC
+import SpiralPath as SP
+from coverage import CoverageMap
+from serial_transport import TransportHalted
 import csv
 coordinate_of_edge= 0
 Centerpoint=(0,0)
@@ -28,6 +34,17 @@ except:
 
 
 cameraoffset=40 ####摄像头与喷嘴的偏移矫正
+camera_offset_x=55   ####治疗时摄像头与喷嘴的偏移
+camera_offset_y=-30
+nozzle_height=95
+camera_index=0   ####摄像头设备号
+calibration_cache_path="calibration_cache.json"
+calibration_tolerance=2.0   ####缓存标定快速验证允许误差(mm)
+path_mode="rings"   ####治疗路径模式: rings(同心圆交点) / contour(轮廓平行螺线) / spiral(阿基米德螺线)
+path_spacing=1.0    ####连续路径模式的路径点间距(mm)
+treatment_time=0.5  ####每处所需治疗停留时间(s)，与TreatmentConfig.treatment_time一致
+nozzle_radius=2.5   ####喷嘴覆盖半径(mm)
+coverage_path="coverage_map.npy"   ####治疗覆盖栅格，中断后恢复时跳过已覆盖区域
 def read_coordinates_csv(file_path):
     """
     使用csv模块读取第2列和第3列数据，跳过首行
@@ -59,7 +76,8 @@ class CameraApp:
         self.root.minsize(600, 700)
 
         # 打开摄像头
-        self.cap = cv2.VideoCapture(0)
+        self.camera_index = camera_index
+        self.cap = cv2.VideoCapture(self.camera_index)
 
         # 灵敏度参数
         self.sensitivity_params = {
@@ -75,6 +93,13 @@ class CameraApp:
         
         # 标定控制相关
         self.calibration_cancelled = False
+        
+        # 最近一次检测到的伤口轮廓（像素坐标），治疗路径直接在内存中规划
+        self.last_contour = None
+        
+        # 治疗覆盖栅格（物理坐标）
+        self.coverage = None
+        self.skipped_points = []  # 本次治疗中未到位而跳过的点
 
         # 创建主滚动区域
         self.main_canvas = tk.Canvas(root)
@@ -194,6 +219,18 @@ class CameraApp:
                                       state='disabled')
         self.cancel_button.pack(fill="x", pady=5)
         
+        # 继续上次治疗开关：默认新建覆盖记录，勾选后才沿用同一伤口和标定的已保存记录
+        self.resume_coverage_var = tk.BooleanVar(value=False)
+        self.resume_coverage_check = ttk.Checkbutton(self.confirm_frame,
+                                                   text="继续上次治疗（跳过已覆盖区域）",
+                                                   variable=self.resume_coverage_var)
+        self.resume_coverage_check.pack(fill="x", pady=5)
+        
+        # 重置治疗覆盖记录按钮
+        self.reset_coverage_button = ttk.Button(self.confirm_frame, text="重置治疗覆盖记录", 
+                                              command=self.reset_coverage)
+        self.reset_coverage_button.pack(fill="x", pady=5)
+        
         # 添加提示信息
         self.control_hint_label = ttk.Label(self.confirm_frame, 
                                           text="提示：按回车键(Enter)或空格键(Space)也可以开始治疗", 
@@ -286,7 +323,6 @@ class CameraApp:
     def save_sensitivity_params(self):
         """保存灵敏度参数到文件"""
         try:
-            import json
             with open('sensitivity_params.json', 'w') as f:
                 json.dump(self.sensitivity_params, f, indent=4)
             print("灵敏度参数已保存到 sensitivity_params.json")
@@ -296,7 +332,6 @@ class CameraApp:
     def load_sensitivity_params(self):
         """从文件加载灵敏度参数"""
         try:
-            import json
             with open('sensitivity_params.json', 'r') as f:
                 loaded_params = json.load(f)
             
@@ -395,8 +430,8 @@ class CameraApp:
                 arm.move_to_position(position['x'], target_y, position['z'])
                 position["y"] = target_y
                 
-                # 等待机械臂稳定
-                time.sleep(2)
+                # 等待机械臂到位并稳定
+                arm.wait_until_arrived(position['x'], position['y'], position['z'])
                 
                 # 3. 获取新位置的伤口中心
                 new_center = self.get_stable_center(calibration_params['stability_checks'])
@@ -441,7 +476,7 @@ class CameraApp:
                 # 7. 返回原位置
                 arm.move_to_position(position['x'], position['y'] + calibration_params['distance'], position['z'])
                 position["y"] += calibration_params['distance']
-                time.sleep(1)
+                arm.wait_until_arrived(position['x'], position['y'], position['z'])
                 
                 # 更新摄像头显示
                 self.update_camera()
@@ -491,6 +526,82 @@ class CameraApp:
         
         return median_scale
 
+    def calibration_fingerprint(self):
+        """标定指纹：实际打开的摄像头设备号、串口、喷嘴高度和拍摄高度"""
+        try:
+            port = arm.ser.port
+        except Exception:
+            port = None
+        key = {
+            "device_id": self.camera_index,
+            "camera_offset": [camera_offset_x, camera_offset_y],
+            "nozzle_height": nozzle_height,
+            "port": port,
+            "camera_z": position['z']
+        }
+        return hashlib.sha1(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def load_calibration_cache(self):
+        """读取与当前配置匹配的缓存比例"""
+        try:
+            with open(calibration_cache_path, 'r') as f:
+                cache = json.load(f)
+            entry = cache.get(self.calibration_fingerprint())
+            if entry:
+                return entry['scale']
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取标定缓存失败: {e}")
+        return None
+
+    def save_calibration_cache(self, scale):
+        """保存标定比例到缓存"""
+        try:
+            try:
+                with open(calibration_cache_path, 'r') as f:
+                    cache = json.load(f)
+            except (FileNotFoundError, ValueError):
+                cache = {}
+            cache[self.calibration_fingerprint()] = {'scale': scale, 'timestamp': time.time()}
+            with open(calibration_cache_path, 'w') as f:
+                json.dump(cache, f, indent=4)
+            print(f"标定比例已缓存到 {calibration_cache_path}")
+        except Exception as e:
+            print(f"保存标定缓存失败: {e}")
+
+    def verify_cached_scale(self, scale, distance=40):
+        """移动一次验证缓存比例，返回是否在允许误差内"""
+        old_center = self.get_stable_center(3)
+        if old_center is None:
+            return False
+        arm.move_to_position(position['x'], position['y'] - distance, position['z'])
+        arm.wait_until_arrived(position['x'], position['y'] - distance, position['z'])
+        new_center = self.get_stable_center(3)
+        arm.move_to_position(position['x'], position['y'], position['z'])
+        if new_center is None:
+            return False
+        pixel_distance = math.sqrt((new_center[0] - old_center[0])**2 +
+                                   (new_center[1] - old_center[1])**2)
+        residual = abs(pixel_distance * scale - distance)
+        print(f"缓存标定验证: 残差 {residual:.2f}mm (允许 {calibration_tolerance}mm)")
+        return residual <= calibration_tolerance
+
+    def calibrate_with_cache(self):
+        """优先使用经过快速验证的缓存标定，否则执行完整标定"""
+        cached_scale = self.load_calibration_cache()
+        if cached_scale is not None:
+            self.root.after(0, lambda: self.calibration_status_label.config(text="验证缓存标定..."))
+            if self.verify_cached_scale(cached_scale):
+                print(f"使用缓存标定比例: {cached_scale:.4f} mm/px")
+                return cached_scale
+            print("缓存标定验证失败，重新标定")
+        
+        scale = self.improved_calibration()
+        if scale is not None:
+            self.save_calibration_cache(scale)
+        return scale
+
     def get_stable_center(self, checks=3):
         """获取稳定的伤口中心（多次检测取平均）"""
         centers = []
@@ -520,6 +631,7 @@ class CameraApp:
             self.confirm_button.config(state='disabled', text='标定中...')
             self.cancel_button.config(state='normal')
             self.calibration_cancelled = False
+            arm.clear_emergency_stop()
             self.root.update()
             
             # 在后台线程中执行标定
@@ -545,8 +657,15 @@ class CameraApp:
     def _run_calibration_background(self):
         """在后台线程中运行标定过程"""
         try:
-            # 使用改进的标定算法
-            average_scale = self.improved_calibration()
+            # 使用缓存标定或改进的标定算法
+            average_scale = self.calibrate_with_cache()
+            if average_scale is None:
+                # 标定被取消或未得到比例，不进行治疗
+                print("标定未完成，取消治疗")
+                self.root.after(0, lambda: self.calibration_status_label.config(text="标定未完成，未开始治疗"))
+                self.root.after(0, lambda: self.confirm_button.config(state='normal', text='🚀 开始治疗 (CONFIRM) 🚀'))
+                self.root.after(0, lambda: self.cancel_button.config(state='disabled'))
+                return
             
             # 在UI线程中更新状态
             self.root.after(0, lambda: self.calibration_status_label.config(text=f"标定完成！比例: {average_scale:.4f}"))
@@ -560,19 +679,22 @@ class CameraApp:
             y_offset = position['y']
             theta_deg = 90
         
-            origondata = CXY.load_coordinates(output_path)
-            transferedata = CXY.transform_coordinates(origondata, x_offset, y_offset, theta_deg, average_scale)
-            CXY.save_results(transferedata, "transformedresult.csv")
-            
-            # 生成治疗路径
-            WC.process_shape(
-            input_file="transformedresult.csv",
-            output_file="circle_intersections.csv",
-            radius_step=5  # 半径检测步长（单位：坐标单位）
-        )
-            
-            # 执行治疗路径
-            self.execute_treatment_with_realtime_camera(average_scale)
+            # 内存中流式规划：轮廓 -> 坐标转换 -> 逐环生成治疗点，边规划边执行
+            contour = self.last_contour
+            if contour is None:
+                contour = CXY.load_coordinates(output_path)
+            physical = CXY.transform_array(contour, x_offset, y_offset, theta_deg, average_scale)
+            self.coverage = self.load_or_create_coverage(physical)
+            radius_step = 5  # 半径检测步长（单位：坐标单位）
+            if path_mode == "rings":
+                total_rings = len(WC.scan_radii(physical, radius_step))
+                rings = WC.iter_treatment_rings(physical, radius_step)
+                
+                # 执行治疗路径
+                self.execute_treatment_stream(rings, total_rings)
+            else:
+                segments = SP.iter_spiral_path(physical, pitch=radius_step, spacing=path_spacing, mode=path_mode)
+                self.execute_continuous_stream(segments)
             
         except Exception as e:
             print(f"标定或执行过程中发生错误：{e}")
@@ -594,68 +716,276 @@ class CameraApp:
 
     
     def execute_treatment_with_realtime_camera(self, scale):
-        """执行治疗并实时更新摄像头"""
-        print("开始执行治疗路径...")
-        
-        # 读取治疗路径点
+        """执行治疗并实时更新摄像头（从circle_intersections.csv读取路径）"""
         pointlists = read_coordinates_csv("circle_intersections.csv")
         if not pointlists:
             print("没有找到治疗路径点")
             return
+        self.execute_treatment_stream([(None, np.array(pointlists))], 1)
+
+    def execute_treatment_stream(self, rings, total_rings):
+        """
+        流式执行治疗路径，rings逐环产出 (radius, (M, 2)治疗点)
+        开始移动前对全部环做IK→FK往返校验，任一点不可达时不开始治疗
+        """
+        print("开始执行治疗路径...")
+        
+        # 交点计算很快，先生成并校验全部环，避免外环不可达时内环已经治疗
+        rings = list(rings)
+        if not self.validate_treatment_rings(rings):
+            return
         
         # 设置机械臂参数
         arm.setPID(P=8, I=0)
         arm.move_to_position(position['x'], position['y'], position['z'])
-        time.sleep(1)
+        arm.wait_until_arrived(position['x'], position['y'], position['z'])
         
         # 治疗参数
-        camera_offset_x = 55
-        camera_offset_y = -30
-        nozzle_height = 95
         movement_speed = 50  # mm/s
         
-        lastx = pointlists[0][0]
-        lasty = pointlists[0][1]
-        total_points = len(pointlists)
+        last = None
+        executed = 0
+        self.skipped_points = []
+        for ring_index, (radius, ring) in enumerate(rings):
+            # 跳过已达到剂量的点
+            if self.coverage is not None:
+                ring = ring[self.coverage.needs_treatment(ring)]
+                if len(ring) == 0:
+                    continue
+            
+            targets = self._ring_targets(ring)
+            for point, (target_x, target_y, target_z) in zip(ring.tolist(), targets.tolist()):
+                if self.calibration_cancelled:
+                    print("治疗已中止")
+                    self.save_coverage()
+                    self.report_skipped_points()
+                    return
+                try:
+                    executed += 1
+                    
+                    # 计算移动距离和时间
+                    distance = 0.0 if last is None else math.hypot(point[0] - last[0], point[1] - last[1])
+                    move_time = distance / movement_speed
+                    
+                    print(f"执行点 {executed} (第 {ring_index+1}/{total_rings} 环): ({target_x:.1f}, {target_y:.1f}, {target_z})")
+                    print(f"移动距离: {distance:.2f}mm, 预计时间: {move_time:.2f}s")
+                    
+                    # 移动机械臂
+                    arm.move_to_position(target_x, target_y, target_z)
+                    
+                    # 更新位置记录
+                    last = point
+                    
+                    # 实时更新摄像头显示
+                    self.update_camera_during_treatment(ring_index+1, total_rings, point)
+                    
+                    # 等待到位（反馈驱动，超时取预计时间的3倍且不少于1秒）
+                    if not arm.wait_until_arrived(target_x, target_y, target_z, timeout=max(3 * move_time, 1.0)):
+                        print(f"第 {executed} 个点未到位，跳过治疗")
+                        self.skipped_points.append(point)  # 不记入覆盖栅格，保持未治疗状态
+                        continue
+                    
+                    # 执行治疗动作，只补足剩余剂量
+                    dwell = treatment_time
+                    if self.coverage is not None:
+                        dwell = float(self.coverage.remaining([point])[0])
+                    self.execute_treatment_action(ring_index+1, total_rings, dwell)
+                    if self.coverage is not None:
+                        self.coverage.add_dwell([point], dwell)
+                    
+                except TransportHalted:
+                    print("紧急停止，治疗已中止")
+                    self.save_coverage()
+                    self.report_skipped_points()
+                    return
+                except Exception as e:
+                    print(f"执行第 {executed} 个点失败：{e}")
+                    # 可以选择继续或停止
+                    continue
+            
+            self.save_coverage()
+        
+        print(f"治疗路径执行完成！共 {executed} 个点")
+        self.report_skipped_points()
+
+    def report_skipped_points(self):
+        """向操作者报告未到位而跳过治疗的点（它们在覆盖栅格中仍为未治疗，继续治疗时会补齐）"""
+        skipped = self.skipped_points
+        if not skipped:
+            return
+        print(f"警告：{len(skipped)} 个点未到位，未进行治疗：")
+        for x, y in skipped:
+            print(f"  ({x:.1f}, {y:.1f})")
+        message = f"⚠ {len(skipped)} 个点未到位未治疗，请检查后继续治疗补齐"
+        self.root.after(0, lambda: self.calibration_status_label.config(text=message))
+
+    def _ring_targets(self, ring):
+        """治疗点 (M, 2) 转换为喷嘴目标点 (M, 3)"""
+        return np.column_stack((ring + (camera_offset_x, camera_offset_y),
+                                np.full(len(ring), nozzle_height)))
+
+    def validate_treatment_rings(self, rings):
+        """一次IK→FK往返校验全部环的治疗点，全部可达返回True"""
+        if not rings:
+            return True
+        targets = self._ring_targets(np.vstack([ring for _, ring in rings]))
+        errors, ok = CO.verify_ik_roundtrip(targets)
+        if ok.all():
+            return True
+        ring_index = np.repeat(np.arange(len(rings)), [len(ring) for _, ring in rings])
+        bad = np.flatnonzero(~ok)
+        print(f"路径校验失败：{len(bad)} 个点不可达（涉及 {len(np.unique(ring_index[bad]))} 环），"
+              f"例如第 {ring_index[bad[0]]+1} 环 {targets[bad[0]]}，未开始治疗")
+        return False
+
+    def execute_continuous_stream(self, segments, camera_every=10):
+        """
+        执行连续路径（螺线/轮廓平行），每段按等弧长点匀速流式发送关节指令，
+        速度由所需剂量决定（单遍经过即达到剂量），段间空行程用直线移动；
+        segments逐段产出 (M, 2) 路径点，开始移动前校验全部段和空行程，任一点不可达时不开始治疗
+        """
+        print("开始执行连续治疗路径...")
+        plans = self.plan_continuous_segments(list(self._untreated_runs(segments)))
+        if plans is None:
+            return
         
-        print(f"开始执行 {total_points} 个治疗点...")
+        if self.coverage is not None:
+            movement_speed = self.coverage.pass_speed()  # mm/s
+        else:
+            movement_speed = 2 * nozzle_radius / treatment_time
+        print(f"连续路径速度: {movement_speed:.1f}mm/s")
+        last_target = None
+        current, passed = None, 0  # 正在流式发送的段及已发送点数，紧急停止时据此记录剂量
+        try:
+            arm.setPID(P=8, I=0)
+            arm.move_to_position(position['x'], position['y'], position['z'])
+            arm.wait_until_arrived(position['x'], position['y'], position['z'])
+            for index, (segment, targets, commands) in enumerate(plans):
+                # 空行程到段起点
+                if last_target is None:
+                    arm.move_to_position(*targets[0])
+                    arm.wait_until_arrived(*targets[0])
+                elif not arm.move_to_position_straight(last_target, targets[0]):
+                    print(f"空行程到第 {index+1} 段起点失败，治疗中止")
+                    self.save_coverage()
+                    return
+                
+                # 匀速流式发送
+                step_time = np.concatenate(([0.0], np.hypot(*np.diff(segment, axis=0).T))) / movement_speed
+                deadlines = time.perf_counter() + np.cumsum(step_time)
+                current, passed = segment, 0
+                arm.streaming = True  # 流式发送期间暂停位置轮询
+                try:
+                    for i, (command, deadline) in enumerate(zip(commands, deadlines)):
+                        if self.calibration_cancelled:
+                            print("治疗已中止")
+                            # 记录本段已经过部分的剂量
+                            if self.coverage is not None:
+                                self.coverage.add_path(segment[:i], movement_speed)
+                            self.save_coverage()
+                            return
+                        delay = deadline - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                        arm.submit_command(command)  # 流水线发送，不等待回显
+                        passed = i + 1
+                        if i % camera_every == 0:
+                            self.update_camera_during_treatment(i+1, len(segment), segment[i])
+                    acked = arm.wait_for_commands()
+                finally:
+                    arm.streaming = False
+                current = None
+                if not acked:
+                    # 有设定点丢失时机械臂未必走完本段，不记入覆盖，保持未治疗状态
+                    print(f"第 {index+1} 段有指令未确认，治疗中止")
+                    self.save_coverage()
+                    return
+                last_target = targets[-1]
+                if self.coverage is not None:
+                    self.coverage.add_path(segment, movement_speed)
+                    self.save_coverage()
+                print(f"第 {index+1} 段完成: {len(segment)} 点")
+        except TransportHalted:
+            print("紧急停止，连续治疗已中止")
+            # 机械臂停在最后发出的设定点之前，只记入已确定经过的部分
+            if self.coverage is not None and current is not None:
+                self.coverage.add_path(current[:max(passed - 1, 0)], movement_speed)
+            self.save_coverage()
+            return
         
-        for i, point in enumerate(pointlists):
+        print("连续治疗路径执行完成！")
+
+    def plan_continuous_segments(self, segments):
+        """
+        一次校验全部连续路径段的治疗点（IK→FK往返）和段间空行程直线，
+        全部可达时返回 [(段, (M, 3)目标点, 指令列表)]，否则返回None
+        """
+        if not segments:
+            return []
+        targets = [self._ring_targets(segment) for segment in segments]
+        stacked = np.vstack(targets)
+        commands, valid = CO.anglecommandgenerator_batch(stacked)
+        errors, ok = CO.verify_commands(commands, stacked)
+        ok &= valid
+        if not ok.all():
+            segment_index = np.repeat(np.arange(len(segments)), [len(segment) for segment in segments])
+            bad = np.flatnonzero(~ok)
+            print(f"路径校验失败：{len(bad)} 个点不可达（涉及 {len(np.unique(segment_index[bad]))} 段），"
+                  f"例如第 {segment_index[bad[0]]+1} 段 {stacked[bad[0]]}，未开始治疗")
+            return None
+        # 段间空行程为直线，按1mm间距取点校验
+        for index in range(1, len(targets)):
+            start, end = targets[index - 1][-1], targets[index][0]
+            count = int(np.ceil(np.linalg.norm(end - start))) + 1
+            errors, ok = CO.verify_ik_roundtrip(np.linspace(start, end, count))
+            if not ok.all():
+                print(f"路径校验失败：到第 {index+1} 段起点的空行程经过不可达点，未开始治疗")
+                return None
+        offsets = np.concatenate(([0], np.cumsum([len(segment) for segment in segments])))
+        return [(segment, target, commands[offsets[i]:offsets[i + 1]])
+                for i, (segment, target) in enumerate(zip(segments, targets))]
+
+    def _untreated_runs(self, segments):
+        """从连续路径段中去掉已覆盖的部分"""
+        for segment in segments:
+            if self.coverage is None:
+                yield segment
+            else:
+                yield from self.coverage.split_untreated(segment)
+
+    def load_or_create_coverage(self, polygon):
+        """
+        新建覆盖栅格；仅当操作者勾选"继续上次治疗"，且已保存的记录属于同一伤口轮廓和标定时才沿用，
+        避免新伤口被当作已治疗而跳过
+        """
+        calibration = self.calibration_fingerprint()
+        if self.resume_coverage_var.get():
+            coverage = CoverageMap.load(coverage_path)
+            if coverage is None:
+                print("没有已保存的治疗覆盖记录，新建覆盖记录")
+            elif coverage.matches(polygon, calibration):
+                print(f"继续 {coverage.session} 的治疗覆盖记录，已覆盖 {coverage.coverage_fraction(polygon):.1%}")
+                return coverage
+            else:
+                print("已保存的治疗覆盖记录与当前伤口或标定不符，新建覆盖记录")
+        return CoverageMap.for_polygon(polygon, calibration=calibration,
+                                       nozzle_radius=nozzle_radius, required_dose=treatment_time)
+
+    def save_coverage(self):
+        """保存覆盖栅格，便于中断后恢复"""
+        if self.coverage is not None:
             try:
-                # 计算目标位置
-                target_x = point[0] + camera_offset_x
-                target_y = point[1] + camera_offset_y
-                target_z = nozzle_height
-                
-                # 计算移动距离和时间
-                distance = math.sqrt((point[0] - lastx)**2 + (point[1] - lasty)**2)
-                move_time = max(distance / movement_speed, 0.5)  # 最小0.5秒
-                
-                print(f"执行点 {i+1}/{total_points}: ({target_x:.1f}, {target_y:.1f}, {target_z})")
-                print(f"移动距离: {distance:.2f}mm, 预计时间: {move_time:.2f}s")
-                
-                # 移动机械臂
-                arm.move_to_position(target_x, target_y, target_z)
-                
-                # 更新位置记录
-                lastx = point[0]
-                lasty = point[1]
-                
-                # 实时更新摄像头显示
-                self.update_camera_during_treatment(i+1, total_points, point)
-                
-                # 等待移动完成
-                time.sleep(move_time)
-                
-                # 执行治疗动作（可以在这里添加具体的治疗逻辑）
-                self.execute_treatment_action(i+1, total_points)
-                
+                self.coverage.save(coverage_path)
             except Exception as e:
-                print(f"执行第 {i+1} 个点失败：{e}")
-                # 可以选择继续或停止
-                continue
-        
-        print("治疗路径执行完成！")
+                print(f"保存治疗覆盖记录失败：{e}")
+
+    def reset_coverage(self):
+        """清除治疗覆盖记录，下次治疗从头执行"""
+        self.coverage = None
+        for path in (coverage_path, os.path.splitext(coverage_path)[0] + '.json'):
+            if os.path.exists(path):
+                os.remove(path)
+        print("治疗覆盖记录已重置")
 
     def update_camera_during_treatment(self, current_point, total_points, point):
         """治疗过程中的实时摄像头更新"""
@@ -703,8 +1033,8 @@ class CameraApp:
         except Exception as e:
             print(f"更新摄像头显示失败：{e}")
 
-    def execute_treatment_action(self, current_point, total_points):
-        """执行具体的治疗动作"""
+    def execute_treatment_action(self, current_point, total_points, dwell=treatment_time):
+        """执行具体的治疗动作，dwell为本点停留时间(s)"""
         # 这里可以添加具体的治疗逻辑
         # 例如：喷涂、切割、加热等
         
@@ -717,17 +1047,18 @@ class CameraApp:
         # 3. 记录治疗数据
         # 4. 安全检查和异常处理
         
-        # 示例治疗时间
-        treatment_time = 0.5  # 秒
-        time.sleep(treatment_time)
+        time.sleep(dwell)
 
     def emergency_stop(self):
         """紧急停止"""
         print("执行紧急停止...")
+        # 中止正在执行的治疗路径
+        self.calibration_cancelled = True
         try:
             # 停止机械臂运动
-            # arm.stop()  # 如果有停止方法
-            print("机械臂已停止")
+            latency = arm.emergency_stop()
+            ack = f"{latency['ack_ms']:.1f}ms" if latency['ack_ms'] is not None else "未确认"
+            print(f"机械臂已停止 (写入 {latency['write_ms']:.1f}ms, 确认 {ack})")
         except Exception as e:
             print(f"紧急停止失败：{e}")
         
@@ -1004,6 +1335,7 @@ class CameraApp:
                 Centerpoint=(x_sum/len(coordinates),y_sum/len(coordinates))
                 print("centerpoint:",Centerpoint,"WIDTH::",w,"HEIGHT::",h)
                 print("使用灵敏度参数:", self.sensitivity_params)
+                self.last_contour = coordinates
                 df = pd.DataFrame(coordinates, columns=["X", "Y"])
                 df.to_csv(output_path, index=False)
                 return Centerpoint,df
@@ -1,6 +1,6 @@
 import csv
 import math
-import matplotlib.pyplot as plt
+import numpy as np
 
 
 def read_coordinates(input_file):
@@ -24,135 +24,291 @@ def read_coordinates(input_file):
         raise FileNotFoundError(f"文件 {input_file} 不存在")
 
 
-def cartesian_to_polar(x, y):
-    """将直角坐标转换为极坐标（角度单位：度）"""
-    r = math.sqrt(x ** 2 + y ** 2)
-    theta = math.degrees(math.atan2(y, x))
-    return r, theta
+def edge_radial_extent(starts, ends):
+    """
+    每条边到原点距离的范围 [rmin, rmax]
 
+    rmax在端点处取得；rmin为原点在线段上的投影点（截断到端点）的距离
+    """
+    d = ends - starts
+    length_sq = np.einsum('ij,ij->i', d, d)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(length_sq > 0, -np.einsum('ij,ij->i', starts, d) / length_sq, 0.0)
+    closest = starts + np.clip(t, 0.0, 1.0)[:, None] * d
+    rmin = np.hypot(closest[:, 0], closest[:, 1])
+    rmax = np.maximum(np.hypot(starts[:, 0], starts[:, 1]), np.hypot(ends[:, 0], ends[:, 1]))
+    return rmin, rmax
 
-def find_circle_intersections(line_start, line_end, radius):
-    """计算线段与圆的交点"""
-    # 线段参数方程：P = P0 + t*(P1-P0), t ∈ [0,1]
-    x0, y0 = line_start
-    x1, y1 = line_end
-    dx = x1 - x0
-    dy = y1 - y0
 
-    # 圆的方程：x² + y² = r²
-    # 代入线段方程：(x0 + t*dx)² + (y0 + t*dy)² = r²
-    # 展开：t²*(dx²+dy²) + 2t*(x0dx+y0dy) + (x0²+y0² - r²) = 0
-    a = dx ** 2 + dy ** 2
-    b = 2 * (x0 * dx + y0 * dy)
-    c = x0 ** 2 + y0 ** 2 - radius ** 2
+def radial_candidates(starts, ends, radii, eps=1e-9):
+    """
+    半径区间索引：在升序半径数组上二分查找每条边的径向范围，
+    只生成半径落在边径向范围内的 (半径索引, 边索引) 候选对
 
+    候选对的数量与交点数量同阶，而不是 半径数×边数
+    """
+    rmin, rmax = edge_radial_extent(starts, ends)
+    lo = np.searchsorted(radii, rmin - eps, side='left')
+    hi = np.searchsorted(radii, rmax + eps, side='right')
+    counts = np.maximum(hi - lo, 0)
+    edge_index = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.cumsum(counts) - counts
+    radius_index = lo[edge_index] + np.arange(counts.sum()) - offsets[edge_index]
+    return radius_index, edge_index
+
+
+def scan_radii(vertices, radius_step):
+    """测试半径（从最小半径-2步长到最大半径+2步长）"""
+    vertex_r = np.hypot(vertices[:, 0], vertices[:, 1])
+    return np.arange(vertex_r.min() - 2 * radius_step, vertex_r.max() + 2 * radius_step, radius_step)
+
+
+def solve_candidates(starts, ends, radii, radius_index, edge_index):
+    """
+    对 (半径索引, 边索引) 候选对求解 t²*a + t*b + c = 0，返回去重后的 (半径索引, (M, 2)交点)
+    """
+    d = ends - starts
+    s0, d0 = starts[edge_index], d[edge_index]
+    a = np.einsum('ij,ij->i', d0, d0)
+    b = 2 * np.einsum('ij,ij->i', s0, d0)
+    c = np.einsum('ij,ij->i', s0, s0) - radii[radius_index] ** 2
     discriminant = b ** 2 - 4 * a * c
-    intersections = []
+    solvable = (discriminant >= 0) & (a > 0)
+    root = np.sqrt(np.where(solvable, discriminant, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.concatenate(((-b + root) / (2 * a), (-b - root) / (2 * a)))
+    pair = np.tile(np.arange(len(a)), 2)
+    hit = np.tile(solvable, 2) & (t >= 0) & (t <= 1)
+
+    pair, t_hit = pair[hit], t[hit]
+    radius_index, edge_index = radius_index[pair], edge_index[pair]
+    xy = starts[edge_index] + t_hit[:, None] * d[edge_index]
+
+    # 去重（相邻边在公共顶点处的交点、相切时的重根）
+    key = np.column_stack((radius_index, np.round(xy, 9)))
+    _, first = np.unique(key, axis=0, return_index=True)
+    return radius_index[first], xy[first]
+
+
+def iter_treatment_rings(points, radius_step=1.0, alternate=True):
+    """
+    流式路径规划：按半径从小到大逐环计算交点并立即产出，无需等待整条路径
+
+    每环内按极角排序（以轮廓平均方向为基准展开），相邻非空圆环方向交替
+    产出:
+        (radius, (M, 2) 已排序的交点数组)
+    """
+    vertices = np.asarray(points, dtype=float).reshape(-1, 2)
+    starts = vertices
+    ends = np.roll(vertices, -1, axis=0)
+    radii = scan_radii(vertices, radius_step)
+
+    # 候选对按半径分组
+    radius_index, edge_index = radial_candidates(starts, ends, radii)
+    order = np.argsort(radius_index, kind='stable')
+    radius_index, edge_index = radius_index[order], edge_index[order]
+    bounds = np.searchsorted(radius_index, np.arange(len(radii) + 1))
+
+    mean_angle = math.atan2(vertices[:, 1].mean(), vertices[:, 0].mean())
+    ring_count = 0
+    for k in range(len(radii)):
+        lo, hi = bounds[k], bounds[k + 1]
+        if lo == hi:
+            continue
+        _, xy = solve_candidates(starts, ends, radii, radius_index[lo:hi], edge_index[lo:hi])
+        if len(xy) == 0:
+            continue
+        angle = (np.arctan2(xy[:, 1], xy[:, 0]) - mean_angle + math.pi) % (2 * math.pi) - math.pi
+        if alternate and ring_count % 2 == 1:
+            angle = -angle
+        ring_count += 1
+        yield radii[k], xy[np.argsort(angle)]
+
+
+def iter_treatment_points(points, radius_step=1.0, alternate=True):
+    """逐点产出 (x, y) 治疗点"""
+    for _, ring in iter_treatment_rings(points, radius_step, alternate):
+        for x, y in ring.tolist():
+            yield x, y
+
+
+def circle_intersections(points, radius_step=1.0):
+    """
+    向量化计算多边形所有边与所有同心圆的交点
+
+    参数:
+        points: (N, 2) 多边形顶点（自动闭合）
+        radius_step: 半径步长
+    返回:
+        dict，键为 radius/x/y/polar_r/polar_theta 的等长数组，
+        按半径升序排列，同一半径内按polar_r排序
+    """
+    vertices = np.asarray(points, dtype=float).reshape(-1, 2)
+    starts = vertices
+    ends = np.roll(vertices, -1, axis=0)
+
+    radii = scan_radii(vertices, radius_step)
+
+    # 只对候选(半径, 边)组合求解
+    radius_index, edge_index = radial_candidates(starts, ends, radii)
+    radius_index, xy = solve_candidates(starts, ends, radii, radius_index, edge_index)
+
+    polar_r = np.hypot(xy[:, 0], xy[:, 1])
+    polar_theta = np.degrees(np.arctan2(xy[:, 1], xy[:, 0]))
+    order = np.lexsort((polar_r, radius_index))
+    return {
+        'radius': radii[radius_index[order]],
+        'x': xy[order, 0],
+        'y': xy[order, 1],
+        'polar_r': polar_r[order],
+        'polar_theta': polar_theta[order]
+    }
+
+
+def path_length(xy):
+    """折线路径总长度"""
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    return float(np.sum(np.hypot(*np.diff(xy, axis=0).T)))
+
+
+def estimate_treatment_time(xy, movement_speed=50.0, min_move_time=0.5):
+    """按逐点执行时的 move_time = max(distance / movement_speed, min_move_time) 估计总用时"""
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    distance = np.hypot(*np.diff(xy, axis=0).T)
+    return float(np.sum(np.maximum(distance / movement_speed, min_move_time)))
 
-    if discriminant >= 0:
-        t1 = (-b + math.sqrt(discriminant)) / (2 * a)
-        t2 = (-b - math.sqrt(discriminant)) / (2 * a)
 
-        for t in [t1, t2]:
-            if 0 <= t <= 1:
-                x = x0 + t * dx
-                y = y0 + t * dy
-                intersections.append((x, y))
+def two_opt(xy, max_passes=20):
+    """
+    开放路径的2-opt优化（起点固定），返回新的访问顺序
 
-    return intersections
+    对每个i向量化计算与所有j交换 (i,i+1),(j,j+1) 两条边的收益，取最大收益执行翻转，
+    直到一轮内没有改进或达到max_passes
+    """
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    order = np.arange(len(xy))
+    if len(xy) < 4:
+        return order
+    for _ in range(max_passes):
+        improved = False
+        for i in range(len(order) - 2):
+            p = xy[order]
+            a, b = p[i], p[i + 1]
+            c = p[i + 2:]
+            # j之后的点，最后一个点之后没有边（翻转尾段）
+            d = np.vstack((p[i + 3:], np.full((1, 2), np.nan)))
+            removed = np.hypot(*(a - b)) + np.nan_to_num(np.hypot(*(c - d).T))
+            added = np.hypot(*(a - c).T) + np.nan_to_num(np.hypot(*(b - d).T))
+            gain = removed - added
+            j = int(np.argmax(gain))
+            if gain[j] > 1e-9:
+                order[i + 1:i + 3 + j] = order[i + 1:i + 3 + j][::-1]
+                improved = True
+        if not improved:
+            break
+    return order
 
 
-def process_shape(input_file, output_file, radius_step=1.0):
+def order_treatment_points(result, alternate=True, use_two_opt=False):
+    """
+    减少空行程的治疗点排序：每个圆环内按极角排序，相邻圆环方向交替，可选2-opt优化
+
+    参数:
+        result: circle_intersections 的返回值
+        alternate: 相邻圆环是否交替方向（蛇形）
+        use_two_opt: 是否再执行2-opt优化
+    返回:
+        (排序后的结果dict, 排序前路径长度, 排序后路径长度)
+    """
+    xy = np.column_stack((result['x'], result['y']))
+    before = path_length(xy)
+    if len(xy) == 0:
+        return result, before, before
+
+    # 以所有点的平均方向为基准展开极角，避免在±180°处断开
+    mean_angle = np.degrees(np.arctan2(np.sin(np.radians(result['polar_theta'])).mean(),
+                                       np.cos(np.radians(result['polar_theta'])).mean()))
+    angle = (result['polar_theta'] - mean_angle + 180.0) % 360.0 - 180.0
+
+    ring = np.unique(result['radius'], return_inverse=True)[1]
+    direction = np.where(ring % 2 == 1, -1.0, 1.0) if alternate else 1.0
+    order = np.lexsort((angle * direction, ring))
+
+    if use_two_opt:
+        order = order[two_opt(xy[order])]
+
+    ordered = {key: np.asarray(value)[order] for key, value in result.items()}
+    return ordered, before, path_length(xy[order])
+
+
+def save_intersections(result, output_file):
+    """保存交点到CSV（列: radius, x, y, polar_r, polar_theta）"""
+    fieldnames = ['radius', 'x', 'y', 'polar_r', 'polar_theta']
+    np.savetxt(output_file, np.column_stack([result[name] for name in fieldnames]),
+               delimiter=',', header=','.join(fieldnames), comments='', fmt='%.12g')
+
+
+def plot_intersections(points, result, image_file='intersection_preview.png'):
+    """绘制原始图形、同心圆和交点的预览图"""
+    import matplotlib.pyplot as plt
+
+    closed_shape = list(points) + [points[0]]
+    plt.figure(figsize=(10, 8))
+
+    # 绘制原始图形
+    x_coords, y_coords = zip(*closed_shape)
+    plt.plot(x_coords, y_coords, 'b-', lw=2, label='原始图形')
+
+    # 绘制交点
+    if len(result['x']):
+        plt.scatter(result['x'], result['y'], c='r', s=50, label='交点')
+
+    # 绘制圆
+    for radius in np.unique(result['radius']):
+        circle = plt.Circle((0, 0), radius, color='g', fill=False,
+                            linestyle='--', alpha=0.3)
+        plt.gca().add_patch(circle)
+
+    plt.title("图形与圆的交点分析")
+    plt.xlabel("X轴")
+    plt.ylabel("Y轴")
+    plt.axis('equal')
+    plt.grid(True)
+    plt.legend()
+    plt.savefig(image_file)
+    plt.close()
+
+
+def process_shape(input_file, output_file, radius_step=1.0, preview=True,
+                  order=True, use_two_opt=False):
     try:
         # 读取原始坐标
         points = read_coordinates(input_file)
-        closed_shape = points + [points[0]]  # 闭合图形
-
-        # 计算所有边的半径范围
-        min_radius = min(math.sqrt(x ** 2 + y ** 2) for x, y in points)
-        max_radius = max(math.sqrt(x ** 2 + y ** 2) for x, y in points)
-
-        # 生成测试半径（从最小半径-步长到最大半径+步长）
-        radii = [r for r in
-                 frange(min_radius - 2 * radius_step,
-                        max_radius + 2 * radius_step,
-                        radius_step)]
-
-        # 查找所有交点
-        results = []
-        for radius in radii:
-            intersections = []
-            # 检查每条边
-            for i in range(len(closed_shape) - 1):
-                start = closed_shape[i]
-                end = closed_shape[i + 1]
-                pts = find_circle_intersections(start, end, radius)
-                intersections.extend(pts)
-
-            # 去重并转换为极坐标
-            unique_pts = list(set(intersections))
-            polar_pts = []
-            for x, y in unique_pts:
-                r, theta = cartesian_to_polar(x, y)
-                polar_pts.append({
-                    'radius': radius,
-                    'x': x,
-                    'y': y,
-                    'polar_r': r,
-                    'polar_theta': theta
-                })
-            # 按距离原点距离排序
-            polar_pts.sort(key=lambda pt: pt['polar_r'])
-            results.extend(polar_pts)
 
-        # 保存结果到CSV
-        with open(output_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=['radius', 'x', 'y', 'polar_r', 'polar_theta'])
-            writer.writeheader()
-            writer.writerows(results)
+        # 计算所有交点
+        results = circle_intersections(points, radius_step)
 
-        # 绘制预览图
-        plt.figure(figsize=(10, 8))
-
-        # 绘制原始图形
-        x_coords, y_coords = zip(*closed_shape)
-        plt.plot(x_coords, y_coords, 'b-', lw=2, label='原始图形')
-
-        # 绘制交点
-        if results:
-            x_pts = [row['x'] for row in results]
-            y_pts = [row['y'] for row in results]
-            plt.scatter(x_pts, y_pts, c='r', s=50, label='交点')
-
-        # 绘制圆
-        for radius in sorted(set(row['radius'] for row in results)):
-            circle = plt.Circle((0, 0), radius, color='g', fill=False,
-                                linestyle='--', alpha=0.3)
-            plt.gca().add_patch(circle)
-
-        plt.title("图形与圆的交点分析")
-        plt.xlabel("X轴")
-        plt.ylabel("Y轴")
-        plt.axis('equal')
-        plt.grid(True)
-        plt.legend()
-        plt.savefig('intersection_preview.png')
-        plt.close()
+        # 按减少空行程的顺序排列
+        if order:
+            before_xy = np.column_stack((results['x'], results['y']))
+            results, before, after = order_treatment_points(results, use_two_opt=use_two_opt)
+            after_xy = np.column_stack((results['x'], results['y']))
+            print(f"路径长度: {before:.1f} -> {after:.1f}，"
+                  f"预计用时: {estimate_treatment_time(before_xy):.1f}s -> {estimate_treatment_time(after_xy):.1f}s")
 
+        # 保存结果到CSV
+        save_intersections(results, output_file)
         print(f"处理完成！结果已保存至 {output_file}")
-        print(f"预览图已保存至 intersection_preview.png")
+
+        # 绘制预览图
+        if preview:
+            plot_intersections(points, results)
+            print(f"预览图已保存至 intersection_preview.png")
 
     except Exception as e:
         print(f"处理错误: {str(e)}")
 
 
-def frange(start, stop, step):
-    """生成浮点数范围"""
-    while start < stop:
-        yield start
-        start += step
-
-
 # 使用示例
 if __name__ == "__main__":
     process_shape(
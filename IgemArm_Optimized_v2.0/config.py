@@ -51,6 +51,10 @@ class CalibrationConfig:
     stability_checks: int = 3
     max_cv_threshold: float = 0.1  # 变异系数阈值
 
+    # 标定缓存
+    cache_file: str = 'calibration_cache.json'
+    verify_tolerance_mm: float = 2.0  # 快速验证允许的残差
+
 @dataclass
 class RobotConfig:
     """机械臂配置"""
@@ -69,6 +73,36 @@ class RobotConfig:
     # 工作空间边界 (mm)
     workspace_bounds: Dict[str, Tuple[float, float]] = None
     
+    # 逆运动学模式: 'analytic'(解析解) 或 'grid'(预计算查找表插值)
+    ik_mode: str = 'analytic'
+    ik_grid_resolution: float = 5.0      # 查找表网格间距 (mm)
+    ik_grid_tolerance: float = 0.005     # 相对解析解允许的最大误差 (rad)
+    ik_grid_cache_dir: str = './data/ik_grid'
+    
+    # 关节轨迹参数 [base, shoulder, elbow, wrist, roll, hand]
+    max_joint_velocity: Tuple[float, ...] = (1.5, 1.5, 1.5, 2.0, 2.0, 2.0)      # rad/s
+    max_joint_acceleration: Tuple[float, ...] = (3.0, 3.0, 3.0, 4.0, 4.0, 4.0)  # rad/s²
+    stream_rate_hz: float = 50.0          # 轨迹流式发送频率
+    stream_max_skip_fraction: float = 0.05  # 允许因发送落后跳过的设定点比例，超过则视为移动失败
+    trajectory_profile: str = 's_curve'   # 速度曲线: 'trapezoid' 或 's_curve'
+    
+    # 命令流水线（窗口流控）
+    command_window: int = 8               # 最多在途（已发送未确认）命令数
+    command_buffer_bytes: int = 256       # 固件串口接收缓冲区大小，在途字节数不超过此值
+    
+    # 到位判定（基于T:1051反馈）
+    arrival_joint_tolerance: float = 0.01  # 反馈关节角与指令关节角的误差 (rad)
+    arrival_settle_time: float = 0.1      # 保持在误差内的时间 (s)
+    arrival_timeout: float = 5.0          # 等待到位超时 (s)
+    pose_max_age: float = 0.2             # 缓存位姿的最长有效期，超过则阻塞查询 (s)
+    
+    # 可达性/奇异性地图
+    use_reachability_map: bool = True
+    reachability_resolution: float = 5.0     # 体素边长 (mm)
+    reachability_cache_dir: str = './data/reachability'
+    singularity_threshold: float = 0.1       # 大臂小臂夹角 sin(C) 低于此值视为接近奇异
+    base_axis_margin: float = 20.0           # 距底座轴线小于此距离视为接近奇异 (mm)
+    
     def __post_init__(self):
         if self.workspace_bounds is None:
             self.workspace_bounds = {
@@ -3,24 +3,40 @@
 提供高精度的像素坐标到物理坐标转换功能
 """
 import math
+import time
+import json
+import os
+import hashlib
 import numpy as np
 from typing import List, Tuple, Optional, Dict, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 import logging
 from config import get_config
 from error_handler import handle_error, ErrorType, image_processing_error_handler
 
 logger = logging.getLogger(__name__)
 
-@dataclass
 class Point2D:
-    """2D点"""
-    x: float
-    y: float
+    """2D点（使用__slots__，无实例__dict__）"""
+    __slots__ = ('x', 'y')
+    
+    def __init__(self, x: float, y: float):
+        self.x = x
+        self.y = y
+    
+    def __repr__(self) -> str:
+        return f"Point2D(x={self.x!r}, y={self.y!r})"
+    
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
+    
+    __hash__ = None
     
     def distance_to(self, other: 'Point2D') -> float:
         """计算到另一点的距离"""
-        return math.sqrt((self.x - other.x)**2 + (self.y - other.y)**2)
+        return math.hypot(self.x - other.x, self.y - other.y)
     
     def __add__(self, other: 'Point2D') -> 'Point2D':
         """点加法"""
@@ -38,17 +54,142 @@ class Point2D:
         """标量除法"""
         return Point2D(self.x / scalar, self.y / scalar)
 
-@dataclass
 class Point3D:
-    """3D点"""
-    x: float
-    y: float
-    z: float
+    """3D点（使用__slots__，无实例__dict__）"""
+    __slots__ = ('x', 'y', 'z')
+    
+    def __init__(self, x: float, y: float, z: float):
+        self.x = x
+        self.y = y
+        self.z = z
+    
+    def __repr__(self) -> str:
+        return f"Point3D(x={self.x!r}, y={self.y!r}, z={self.z!r})"
+    
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.x == other.x and self.y == other.y and self.z == other.z
+    
+    __hash__ = None
     
     def distance_to(self, other: 'Point3D') -> float:
         """计算到另一点的距离"""
         return math.sqrt((self.x - other.x)**2 + (self.y - other.y)**2 + (self.z - other.z)**2)
 
+class PointArray:
+    """点集容器，按坐标分量存储为NumPy数组（结构数组），支持批量运算"""
+    __slots__ = ('x', 'y', 'z')
+    
+    def __init__(self, x, y, z=None):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.z = None if z is None else np.asarray(z, dtype=float)
+    
+    @classmethod
+    def from_points(cls, points) -> 'PointArray':
+        """由Point2D/Point3D列表构建"""
+        points = list(points)
+        x = np.fromiter((p.x for p in points), dtype=float, count=len(points))
+        y = np.fromiter((p.y for p in points), dtype=float, count=len(points))
+        if points and isinstance(points[0], Point3D):
+            z = np.fromiter((p.z for p in points), dtype=float, count=len(points))
+            return cls(x, y, z)
+        return cls(x, y)
+    
+    @classmethod
+    def from_array(cls, array) -> 'PointArray':
+        """由(N, 2)或(N, 3)数组构建"""
+        array = np.asarray(array, dtype=float)
+        if array.size == 0:
+            return cls(np.empty(0), np.empty(0))
+        array = np.atleast_2d(array)
+        if array.shape[1] >= 3:
+            return cls(array[:, 0], array[:, 1], array[:, 2])
+        return cls(array[:, 0], array[:, 1])
+    
+    @property
+    def is_3d(self) -> bool:
+        return self.z is not None
+    
+    def as_array(self) -> np.ndarray:
+        """返回(N, 2)或(N, 3)数组"""
+        if self.is_3d:
+            return np.column_stack((self.x, self.y, self.z))
+        return np.column_stack((self.x, self.y))
+    
+    def to_points(self) -> list:
+        """转换为Point2D/Point3D列表"""
+        if self.is_3d:
+            return [Point3D(x, y, z) for x, y, z in zip(self.x.tolist(), self.y.tolist(), self.z.tolist())]
+        return [Point2D(x, y) for x, y in zip(self.x.tolist(), self.y.tolist())]
+    
+    def __len__(self) -> int:
+        return len(self.x)
+    
+    def __iter__(self):
+        return iter(self.to_points())
+    
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if self.is_3d:
+                return Point3D(float(self.x[index]), float(self.y[index]), float(self.z[index]))
+            return Point2D(float(self.x[index]), float(self.y[index]))
+        z = None if self.z is None else self.z[index]
+        return PointArray(self.x[index], self.y[index], z)
+    
+    def __repr__(self) -> str:
+        return f"PointArray(n={len(self)}, dims={3 if self.is_3d else 2})"
+    
+    def _components(self, other):
+        """把另一操作数拆成与本点集对应的分量"""
+        if isinstance(other, PointArray):
+            return other.x, other.y, other.z
+        if isinstance(other, Point3D):
+            return other.x, other.y, other.z
+        if isinstance(other, Point2D):
+            return other.x, other.y, None
+        return other, other, other
+    
+    def _combine(self, other, op) -> 'PointArray':
+        ox, oy, oz = self._components(other)
+        z = None
+        if self.z is not None:
+            z = self.z if oz is None else op(self.z, oz)
+        return PointArray(op(self.x, ox), op(self.y, oy), z)
+    
+    def __add__(self, other) -> 'PointArray':
+        """批量加法（点集、单点或标量）"""
+        return self._combine(other, np.add)
+    
+    def __sub__(self, other) -> 'PointArray':
+        """批量减法（点集、单点或标量）"""
+        return self._combine(other, np.subtract)
+    
+    def __mul__(self, scalar) -> 'PointArray':
+        """批量标量/逐点乘法"""
+        return self._combine(scalar, np.multiply)
+    
+    def __truediv__(self, scalar) -> 'PointArray':
+        """批量标量/逐点除法"""
+        return self._combine(scalar, np.true_divide)
+    
+    def distance_to(self, other) -> np.ndarray:
+        """逐点计算到另一点（或对应点集）的距离"""
+        ox, oy, oz = self._components(other)
+        squared = (self.x - ox)**2 + (self.y - oy)**2
+        if self.z is not None and oz is not None:
+            squared = squared + (self.z - oz)**2
+        return np.sqrt(squared)
+    
+    def mean(self):
+        """质心"""
+        if len(self) == 0:
+            return Point3D(0, 0, 0) if self.is_3d else Point2D(0, 0)
+        if self.is_3d:
+            return Point3D(float(self.x.mean()), float(self.y.mean()), float(self.z.mean()))
+        return Point2D(float(self.x.mean()), float(self.y.mean()))
+
 @dataclass
 class CalibrationData:
     """标定数据"""
@@ -63,6 +204,90 @@ class CalibrationData:
         return (self.scale_factor > 0 and 
                 self.confidence > 0.5 and 
                 abs(self.rotation_angle) < math.pi)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        return {
+            "scale_factor": float(self.scale_factor),
+            "rotation_angle": float(self.rotation_angle),
+            "translation_offset": [float(self.translation_offset.x), float(self.translation_offset.y)],
+            "confidence": float(self.confidence),
+            "timestamp": float(self.timestamp)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CalibrationData':
+        """从字典恢复标定数据"""
+        offset_x, offset_y = data["translation_offset"]
+        return cls(
+            scale_factor=data["scale_factor"],
+            rotation_angle=data["rotation_angle"],
+            translation_offset=Point2D(offset_x, offset_y),
+            confidence=data["confidence"],
+            timestamp=data["timestamp"]
+        )
+
+def calibration_fingerprint(config=None) -> str:
+    """计算标定指纹（摄像头配置、机械臂端口和喷嘴高度）"""
+    config = config or get_config()
+    key = {
+        "camera": asdict(config.camera),
+        "port": config.robot.port,
+        "nozzle_height": config.camera.nozzle_height
+    }
+    key_str = json.dumps(key, sort_keys=True)
+    return hashlib.sha1(key_str.encode('utf-8')).hexdigest()
+
+class CalibrationCache:
+    """标定缓存，按配置指纹持久化标定数据"""
+    
+    def __init__(self, cache_file: str = None):
+        self.cache_file = cache_file or get_config().calibration.cache_file
+    
+    def _read(self) -> Dict[str, Any]:
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取标定缓存失败: {e}")
+            return {}
+    
+    def _write(self, entries: Dict[str, Any]) -> None:
+        with open(self.cache_file, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=4, ensure_ascii=False)
+    
+    def load(self, fingerprint: str) -> Optional[CalibrationData]:
+        """加载与指纹匹配的标定数据"""
+        entry = self._read().get(fingerprint)
+        if not entry:
+            return None
+        try:
+            return CalibrationData.from_dict(entry)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"标定缓存条目无效: {e}")
+            return None
+    
+    def save(self, fingerprint: str, calibration_data: CalibrationData) -> None:
+        """保存标定数据"""
+        entries = self._read()
+        entries[fingerprint] = calibration_data.to_dict()
+        try:
+            self._write(entries)
+            logger.info(f"标定数据已缓存到 {self.cache_file}")
+        except OSError as e:
+            logger.error(f"保存标定缓存失败: {e}")
+    
+    def invalidate(self, fingerprint: str) -> None:
+        """删除指纹对应的缓存条目"""
+        entries = self._read()
+        if entries.pop(fingerprint, None) is not None:
+            try:
+                self._write(entries)
+                logger.info("标定缓存已失效")
+            except OSError as e:
+                logger.error(f"更新标定缓存失败: {e}")
 
 class CoordinateTransformer:
     """坐标转换器"""
@@ -72,6 +297,8 @@ class CoordinateTransformer:
         self.calibration_data: Optional[CalibrationData] = None
         self.image_center: Optional[Point2D] = None
         self.workspace_bounds = self.config.robot.workspace_bounds
+        self.calibration_cache = CalibrationCache()
+        self.calibration_from_cache = False
         
     def set_image_center(self, width: int, height: int) -> None:
         """设置图像中心"""
@@ -87,9 +314,34 @@ class CoordinateTransformer:
             return
         
         self.calibration_data = calibration_data
+        self.calibration_from_cache = False
         logger.info(f"标定数据已设置: 比例={calibration_data.scale_factor:.4f}, "
                    f"置信度={calibration_data.confidence:.2f}")
     
+    def save_calibration_to_cache(self) -> None:
+        """将当前标定数据写入缓存"""
+        if self.calibration_data:
+            self.calibration_cache.save(calibration_fingerprint(self.config), self.calibration_data)
+    
+    def load_cached_calibration(self) -> bool:
+        """从缓存加载与当前配置匹配的标定数据，需再经快速验证"""
+        calibration_data = self.calibration_cache.load(calibration_fingerprint(self.config))
+        if not calibration_data or not calibration_data.is_valid():
+            logger.info("没有可用的标定缓存")
+            return False
+        
+        self.set_calibration_data(calibration_data)
+        self.calibration_from_cache = True
+        logger.info(f"已加载缓存标定: 比例={calibration_data.scale_factor:.4f}")
+        return True
+    
+    def invalidate_cached_calibration(self) -> None:
+        """丢弃缓存标定"""
+        self.calibration_cache.invalidate(calibration_fingerprint(self.config))
+        if self.calibration_from_cache:
+            self.calibration_data = None
+            self.calibration_from_cache = False
+    
     def pixel_to_physical(self, pixel_point: Point2D) -> Point3D:
         """将像素坐标转换为物理坐标"""
         if not self.calibration_data:
@@ -171,6 +423,24 @@ class CoordinateTransformer:
                         {"physical_point": physical_point})
             return Point2D(0, 0)
     
+    def pixel_delta_to_physical(self, pixel_from: Point2D, pixel_to: Point2D) -> Point2D:
+        """像素位移对应的物理位移（只用比例和旋转，与平移无关）"""
+        delta = pixel_to - pixel_from
+        rotated_delta = self._rotate_point(Point2D(delta.x, -delta.y), self.calibration_data.rotation_angle)
+        return rotated_delta * self.calibration_data.scale_factor
+    
+    def reanchor_translation(self, pixel_point: Point2D, physical_point: Point3D) -> None:
+        """保持比例和旋转不变，用本次的一对对应点重新确定平移"""
+        if not self.calibration_data or not self.image_center:
+            return
+        relative_point = pixel_point - self.image_center
+        rotated_point = self._rotate_point(Point2D(relative_point.x, -relative_point.y),
+                                           self.calibration_data.rotation_angle)
+        scaled_point = rotated_point * self.calibration_data.scale_factor
+        self.calibration_data.translation_offset = Point2D(physical_point.x, physical_point.y) - scaled_point
+        logger.info(f"平移已按当前位置重新确定: ({self.calibration_data.translation_offset.x:.1f}, "
+                   f"{self.calibration_data.translation_offset.y:.1f})")
+    
     def _rotate_point(self, point: Point2D, angle: float) -> Point2D:
         """旋转点"""
         cos_angle = math.cos(angle)
@@ -191,18 +461,74 @@ class CoordinateTransformer:
                 y_min <= point.y <= y_max and
                 z_min <= point.z <= z_max)
     
+    def _rotate_array(self, points: PointArray, angle: float) -> PointArray:
+        """批量旋转点（与_rotate_point一致）"""
+        cos_angle = math.cos(angle)
+        sin_angle = math.sin(angle)
+        return PointArray(points.x * cos_angle + points.y * sin_angle,
+                          -points.x * sin_angle + points.y * cos_angle)
+    
+    def pixel_to_physical_array(self, pixel_points: PointArray) -> Optional[PointArray]:
+        """批量将像素坐标转换为物理坐标（向量化，不逐点创建对象）"""
+        if not self.calibration_data:
+            handle_error(ErrorType.CALIBRATION_ERROR, 
+                        "未进行标定，无法转换坐标")
+            return None
+        
+        if not self.image_center:
+            handle_error(ErrorType.IMAGE_PROCESSING_ERROR, 
+                        "图像中心未设置")
+            return None
+        
+        relative = pixel_points - self.image_center
+        relative = PointArray(relative.x, -relative.y)
+        rotated = self._rotate_array(relative, self.calibration_data.rotation_angle)
+        physical = rotated * self.calibration_data.scale_factor + self.calibration_data.translation_offset
+        z = np.full(len(physical), self.config.camera.nozzle_height, dtype=float)
+        result = PointArray(physical.x, physical.y, z)
+        
+        out_of_bounds = int(np.count_nonzero(~self._within_bounds_mask(result)))
+        if out_of_bounds:
+            handle_error(ErrorType.BOUNDARY_ERROR, 
+                        f"转换后有 {out_of_bounds} 个坐标超出工作空间边界",
+                        {"bounds": self.workspace_bounds})
+        return result
+    
+    def physical_to_pixel_array(self, physical_points: PointArray) -> Optional[PointArray]:
+        """批量将物理坐标转换为像素坐标（逆变换）"""
+        if not self.calibration_data or not self.image_center:
+            handle_error(ErrorType.CALIBRATION_ERROR, 
+                        "标定数据或图像中心未设置")
+            return None
+        
+        translated = PointArray(physical_points.x, physical_points.y) - self.calibration_data.translation_offset
+        scaled = translated / self.calibration_data.scale_factor
+        rotated = self._rotate_array(scaled, -self.calibration_data.rotation_angle)
+        return PointArray(rotated.x, -rotated.y) + self.image_center
+    
+    def _within_bounds_mask(self, points: PointArray) -> np.ndarray:
+        """批量边界检查"""
+        x_min, x_max = self.workspace_bounds['x']
+        y_min, y_max = self.workspace_bounds['y']
+        z_min, z_max = self.workspace_bounds['z']
+        mask = (x_min <= points.x) & (points.x <= x_max) & (y_min <= points.y) & (points.y <= y_max)
+        if points.z is not None:
+            mask &= (z_min <= points.z) & (points.z <= z_max)
+        return mask
+    
     def batch_transform(self, pixel_points: List[Point2D]) -> List[Point3D]:
         """批量转换坐标"""
         if not pixel_points:
             return []
         
-        physical_points = []
-        for pixel_point in pixel_points:
-            physical_point = self.pixel_to_physical(pixel_point)
-            physical_points.append(physical_point)
+        if not isinstance(pixel_points, PointArray):
+            pixel_points = PointArray.from_points(pixel_points)
+        physical_points = self.pixel_to_physical_array(pixel_points)
+        if physical_points is None:
+            return [Point3D(0, 0, 0) for _ in range(len(pixel_points))]
         
         logger.info(f"批量转换完成: {len(pixel_points)} 个点")
-        return physical_points
+        return physical_points.to_points()
     
     def validate_transformation(self, pixel_points: List[Point2D], 
                               physical_points: List[Point3D]) -> Dict[str, float]:
@@ -210,12 +536,16 @@ class CoordinateTransformer:
         if len(pixel_points) != len(physical_points):
             return {"error": "点数量不匹配"}
         
-        errors = []
-        for i, (pixel, physical) in enumerate(zip(pixel_points, physical_points)):
-            # 转换回像素坐标
-            back_pixel = self.physical_to_pixel(physical)
-            error = pixel.distance_to(back_pixel)
-            errors.append(error)
+        if not isinstance(pixel_points, PointArray):
+            pixel_points = PointArray.from_points(pixel_points)
+        if not isinstance(physical_points, PointArray):
+            physical_points = PointArray.from_points(physical_points)
+        
+        # 转换回像素坐标
+        back_pixel = self.physical_to_pixel_array(physical_points)
+        if back_pixel is None:
+            return {"error": "标定数据或图像中心未设置"}
+        errors = pixel_points.distance_to(back_pixel)
         
         mean_error = np.mean(errors)
         max_error = np.max(errors)
@@ -279,6 +609,7 @@ class CalibrationManager:
             
             if calibration_data and calibration_data.is_valid():
                 self.transformer.set_calibration_data(calibration_data)
+                self.transformer.save_calibration_to_cache()
                 logger.info("标定完成")
                 return calibration_data
             else:
@@ -291,6 +622,60 @@ class CalibrationManager:
                         f"标定过程异常: {e}")
             return None
     
+    def verify_calibration(self, samples: List[Tuple[Point2D, Point3D]]) -> Tuple[bool, float]:
+        """用同一次会话中移动前后的标定点快速验证比例和旋转，返回(是否通过, 最大残差mm)
+        
+        比较像素位移换算出的物理位移与机械臂实际位移，因此与每次摆放不同的平移无关；
+        通过后用第一个样本重新确定平移。
+        """
+        if not self.transformer.calibration_data or len(samples) < 2:
+            return False, float('inf')
+        
+        reference_pixel, reference_physical = samples[0]
+        residuals = []
+        for pixel_point, physical_point in samples[1:]:
+            predicted = self.transformer.pixel_delta_to_physical(reference_pixel, pixel_point)
+            residuals.append(math.hypot(predicted.x - (physical_point.x - reference_physical.x),
+                                        predicted.y - (physical_point.y - reference_physical.y)))
+        
+        max_residual = max(residuals)
+        tolerance = self.config.calibration.verify_tolerance_mm
+        passed = max_residual <= tolerance
+        
+        if passed:
+            self.transformer.reanchor_translation(reference_pixel, reference_physical)
+            self.transformer.calibration_from_cache = False
+            logger.info(f"标定快速验证通过: 残差={max_residual:.2f}mm")
+        else:
+            logger.warning(f"标定快速验证失败: 残差={max_residual:.2f}mm > {tolerance}mm")
+            self.transformer.invalidate_cached_calibration()
+        return passed, max_residual
+    
+    def quick_verify(self, robot_controller, locate_wound) -> Tuple[bool, float]:
+        """移动一次采集两个标定点并验证缓存标定
+        
+        locate_wound: 无参数函数，返回当前图像中的伤口中心Point2D，失败返回None
+        """
+        start_pos = robot_controller.get_current_position()
+        if not start_pos:
+            raise Exception("无法获取机械臂当前位置")
+        start_pixel = locate_wound()
+        if start_pixel is None:
+            raise Exception("未检测到伤口")
+        
+        target_y = start_pos.y - self.config.calibration.distance_mm
+        robot_controller.move_to_position(start_pos.x, target_y, start_pos.z)
+        arrived = robot_controller.wait_until_arrived(start_pos.x, target_y, start_pos.z)
+        moved_pos = robot_controller.get_current_position()
+        moved_pixel = locate_wound()
+        
+        robot_controller.move_to_position(start_pos.x, start_pos.y, start_pos.z)
+        robot_controller.wait_until_arrived(start_pos.x, start_pos.y, start_pos.z)
+        
+        if not arrived or not moved_pos or moved_pixel is None:
+            raise Exception("验证移动后无法获取位置或伤口")
+        return self.verify_calibration([(start_pixel, start_pos), (moved_pixel, moved_pos)])
+    
     def _calculate_transformation(self) -> CalibrationData:
         """计算变换参数"""
         # 提取像素和物理坐标
@@ -1,4 +1,10 @@
 import math
+import numpy as np
+
+# 连杆长度(mm)与肩/肘关节的结构偏置角(rad)
+L1=238.7127
+L2=145
+JOINT_OFFSET=0.12600731876944798
 
 
 def cartesian_to_polar(x, y, degrees=False):
@@ -34,8 +40,8 @@ def cartesian_to_polar(x, y, degrees=False):
 
 def calculate_elbow_angle(x,y,z):
     l3=math.sqrt(x**2+y**2+z**2)
-    l1=238.7127
-    l2=145
+    l1=L1
+    l2=L2
     # 使用余弦定理计算角度: c² = a² + b² - 2ab·cos(C)
     cos_C = (l1**2 + l2**2 - l3**2) / (2 * l1 * l2)
     
@@ -45,14 +51,14 @@ def calculate_elbow_angle(x,y,z):
     # 计算角度弧度
     angle_C = math.pi - math.acos(cos_C)
     
-    return angle_C-0.12600731876944798
+    return angle_C-JOINT_OFFSET
 def calculate_shoulder_angle(x,y,z):
     distance=math.sqrt(x**2+y**2+z**2)
     
     angle=math.acos(math.sqrt(x**2+y**2)/distance)
     
-    angle2=math.acos((238.7127**2+distance**2-145**2)/(2*238.7127*distance))
-    return 3.1415926/2-(angle2+0.12600731876944798+angle)
+    angle2=math.acos((L1**2+distance**2-L2**2)/(2*L1*distance))
+    return 3.1415926/2-(angle2+JOINT_OFFSET+angle)
 def calculate_all_angles(x,y,z):
     base=cartesian_to_polar(x,y)
     shoulder=calculate_shoulder_angle(x,y,z)
@@ -63,8 +69,97 @@ def anglecommandgenerator(x,y,z,speed=0,acc=10):
     angles=calculate_all_angles(x,y,z)
     command={"T":102,"base":angles["base"],"shoulder":angles["shoulder"],"elbow":angles["elbow"],"wrist":math.pi-angles["elbow"]-angles["shoulder"]-0.1,"roll":angles["base"]-3.14/2,"hand":3.14,"spd":speed,"acc":acc}
     return command
+
+def calculate_all_angles_batch(points):
+    """
+    批量逆运动学，一次向量化计算整条轨迹
+
+    参数:
+        points: (N, 3) 笛卡尔目标点 [x, y, z]
+    返回:
+        angles: (N, 6) 关节角 [base, shoulder, elbow, wrist, roll, hand]
+        valid: (N,) bool，False表示目标不可达（标量版本中被cos_C截断掩盖）
+    """
+    points=np.asarray(points,dtype=float).reshape(-1,3)
+    x,y,z=points[:,0],points[:,1],points[:,2]
+    rho=np.hypot(x,y)
+    distance=np.sqrt(rho**2+z**2)
+
+    cos_C=(L1**2+L2**2-distance**2)/(2*L1*L2)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        cos_elev=rho/distance
+        cos_shoulder=(L1**2+distance**2-L2**2)/(2*L1*distance)
+    valid=(distance>0)&(np.abs(cos_C)<=1.0)&(np.abs(cos_shoulder)<=1.0)
+
+    cos_C=np.clip(cos_C,-1.0,1.0)
+    cos_elev=np.clip(np.nan_to_num(cos_elev,nan=1.0),-1.0,1.0)
+    cos_shoulder=np.clip(np.nan_to_num(cos_shoulder,nan=1.0),-1.0,1.0)
+
+    base=np.arctan2(y,x)
+    elbow=np.pi-np.arccos(cos_C)-JOINT_OFFSET
+    shoulder=3.1415926/2-(np.arccos(cos_shoulder)+JOINT_OFFSET+np.arccos(cos_elev))
+    wrist=np.pi-elbow-shoulder-0.1
+    roll=base-3.14/2
+    hand=np.full_like(base,3.14)
+    angles=np.column_stack((base,shoulder,elbow,wrist,roll,hand))
+    return angles,valid
+
+def anglecommandgenerator_batch(points,speed=0,acc=10):
+    """批量生成T:102指令，返回(指令列表, 可达掩码)"""
+    angles,valid=calculate_all_angles_batch(points)
+    names=("base","shoulder","elbow","wrist","roll","hand")
+    commands=[{"T":102,**dict(zip(names,row)),"spd":speed,"acc":acc} for row in angles.tolist()]
+    return commands,valid
     
 
+def forward_kinematics_batch(angles):
+    """
+    批量正运动学，与calculate_shoulder_angle/calculate_elbow_angle的连杆和偏置一致
+
+    参数:
+        angles: (N, >=3) 关节角，前三列为 [base, shoulder, elbow]；N可以为0
+    返回:
+        (N, 3) 末端位置 [x, y, z]
+    """
+    angles=np.asarray(angles,dtype=float)
+    angles=angles.reshape(-1,angles.shape[-1])
+    base,shoulder,elbow=angles[:,0],angles[:,1],angles[:,2]
+    # 大臂仰角，以及小臂相对大臂向下转过的外角
+    phi1=3.1415926/2-shoulder-JOINT_OFFSET
+    phi2=phi1-(elbow+JOINT_OFFSET)
+    rho=L1*np.cos(phi1)+L2*np.cos(phi2)
+    z=L1*np.sin(phi1)+L2*np.sin(phi2)
+    return np.column_stack((rho*np.cos(base),rho*np.sin(base),z))
+
+def forward_kinematics(base,shoulder,elbow):
+    """单点正运动学，返回(x, y, z)"""
+    x,y,z=forward_kinematics_batch([[base,shoulder,elbow]])[0].tolist()
+    return x,y,z
+
+def verify_ik_roundtrip(points,tolerance=0.5):
+    """
+    IK→FK往返校验，在发送任何指令前检查整条路径
+
+    参数:
+        points: (N, 3) 目标点
+        tolerance: 允许的位置误差(mm)
+    返回:
+        errors: (N,) 往返位置误差(mm)，不可达点为inf
+        ok: (N,) bool，可达且误差在容差内
+    """
+    points=np.asarray(points,dtype=float).reshape(-1,3)
+    angles,valid=calculate_all_angles_batch(points)
+    errors=np.linalg.norm(forward_kinematics_batch(angles)-points,axis=1)
+    errors[~valid]=np.inf
+    return errors,errors<=tolerance
+
+def verify_commands(commands,points,tolerance=0.5):
+    """校验已生成的T:102指令能否到达对应目标点，返回(误差, 通过掩码)"""
+    angles=np.array([[c["base"],c["shoulder"],c["elbow"]] for c in commands],dtype=float).reshape(-1,3)
+    points=np.asarray(points,dtype=float).reshape(-1,3)
+    errors=np.linalg.norm(forward_kinematics_batch(angles)-points,axis=1)
+    return errors,errors<=tolerance
+
 
 if __name__ == '__main__':
     
@@ -303,6 +303,10 @@ class ModernGUI:
         # 位置信息
         self.position_label = ttk.Label(status_frame, text="位置: 未知")
         self.position_label.pack(anchor=tk.W)
+        
+        # 通信延迟
+        self.latency_label = ttk.Label(status_frame, text="", font=("Courier", 8), justify=tk.LEFT)
+        self.latency_label.pack(anchor=tk.W)
     
     def create_log_panel(self):
         """创建日志面板"""
@@ -342,6 +346,11 @@ class ModernGUI:
             # 初始化机械臂控制器
             self.robot_controller = get_robot_controller()
             
+            # 加载缓存标定，待快速验证后启用治疗
+            if self.coordinate_transformer.load_cached_calibration():
+                self.calibration_status.config(text="已加载缓存标定 (待验证)", foreground="orange")
+                self.log_message("已加载缓存标定，开始标定时将执行快速验证")
+            
             # 更新状态显示
             self.update_status_display()
             
@@ -522,6 +531,7 @@ class ModernGUI:
             return
         
         # 在后台线程中执行标定
+        self.robot_controller.clear_emergency_stop()
         self.is_calibrating = True
         self.calibration_cancelled = False
         
@@ -529,7 +539,46 @@ class ModernGUI:
         self.cancel_calib_btn.config(state=tk.NORMAL)
         self.calibration_status.config(text="标定中...", foreground="orange")
         
-        threading.Thread(target=self._calibration_worker, daemon=True).start()
+        if self.coordinate_transformer.calibration_from_cache:
+            threading.Thread(target=self._verify_cached_calibration_worker, daemon=True).start()
+        else:
+            threading.Thread(target=self._calibration_worker, daemon=True).start()
+    
+    def _verify_cached_calibration_worker(self):
+        """缓存标定快速验证线程，失败时回退到完整标定"""
+        try:
+            self.log_message("快速验证缓存标定...")
+            
+            passed, residual = self.calibration_manager.quick_verify(
+                self.robot_controller, self._locate_wound_center
+            )
+            
+            if passed:
+                self.log_message(f"缓存标定验证通过: 残差={residual:.2f}mm")
+                self.root.after(0, lambda: self.calibration_status.config(
+                    text=f"缓存标定有效 (残差: {residual:.2f}mm)", foreground="green"
+                ))
+                self.root.after(0, lambda: self.start_treatment_btn.config(state=tk.NORMAL))
+                self.root.after(0, self._calibration_finished)
+                return
+            
+            self.log_message(f"缓存标定验证失败 (残差: {residual:.2f}mm)，执行完整标定", "WARNING")
+        
+        except Exception as e:
+            self.log_message(f"缓存标定验证失败: {e}，执行完整标定", "WARNING")
+            self.coordinate_transformer.invalidate_cached_calibration()
+        
+        self._calibration_worker()
+    
+    def _locate_wound_center(self):
+        """拍摄一帧并返回伤口中心像素坐标，未检测到返回None"""
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        result = detect_wound(frame, stable=True)
+        if not result.success or not result.contours:
+            return None
+        return result.contours[0].center
     
     def _calibration_worker(self):
         """标定工作线程"""
@@ -560,7 +609,7 @@ class ModernGUI:
             self.robot_controller.move_to_position(
                 current_pos.x, target_y, current_pos.z
             )
-            time.sleep(2)
+            self.robot_controller.wait_until_arrived(current_pos.x, target_y, current_pos.z)
             
             # 检测新位置
             ret, frame = self.cap.read()
@@ -646,6 +695,7 @@ class ModernGUI:
             return
         
         # 在后台线程中执行治疗
+        self.robot_controller.clear_emergency_stop()
         self.is_treating = True
         self.start_treatment_btn.config(state=tk.DISABLED)
         self.treatment_status.config(text="治疗中...", foreground="orange")
@@ -685,6 +735,14 @@ class ModernGUI:
         # 这里应该调用路径规划算法
         # 暂时使用简单的圆形路径
         self.log_message("生成治疗路径...")
+        
+        # 沿闭合轮廓逐段精确检查（工作空间、可达球壳、底座轴线和奇异区）
+        path = [(point.x, point.y, point.z) for point in physical_points]
+        if path:
+            path.append(path[0])
+        safe, msg = self.robot_controller.safety_checker.check_path_segments(path)
+        if not safe:
+            raise Exception(f"治疗路径不安全: {msg}")
         # TODO: 实现路径规划
     
     def _execute_treatment_path(self):
@@ -702,13 +760,18 @@ class ModernGUI:
     def emergency_stop(self):
         """紧急停止"""
         try:
+            latency = None
             if self.robot_controller:
-                self.robot_controller.emergency_stop()
+                latency = self.robot_controller.emergency_stop()
             
             self.is_calibrating = False
             self.is_treating = False
             
-            self.log_message("紧急停止已执行", "WARNING")
+            if latency:
+                ack = f"{latency['ack_ms']:.1f}ms" if latency['ack_ms'] is not None else "未确认"
+                self.log_message(f"紧急停止已执行 (写入 {latency['write_ms']:.1f}ms, 确认 {ack})", "WARNING")
+            else:
+                self.log_message("紧急停止已执行", "WARNING")
             
         except Exception as e:
             self.log_message(f"紧急停止失败: {e}", "ERROR")
@@ -812,6 +875,7 @@ class ModernGUI:
             self.position_label.config(
                 text=f"位置: ({pos.x:.1f}, {pos.y:.1f}, {pos.z:.1f})"
             )
+            self.latency_label.config(text=self.robot_controller.get_latency_report())
         
         # 定期更新
         self.root.after(1000, self.update_status_display)
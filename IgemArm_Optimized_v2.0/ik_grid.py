@@ -0,0 +1,226 @@
+"""
+逆运动学查找表
+在工作空间内预计算关节解并缓存到磁盘，运行时通过三线性插值快速求解，
+用于50-100Hz的高频轨迹流式控制
+"""
+import os
+import json
+import shutil
+import hashlib
+import logging
+from typing import Dict, Tuple, Optional
+
+import numpy as np
+
+from config import get_config
+from countbyhand import calculate_all_angles_batch, L1, L2, JOINT_OFFSET
+
+logger = logging.getLogger(__name__)
+
+# 单元误差检查点（单元内局部坐标）：{0, 0.5, 1}³ 覆盖角点、棱中点、面中心和中心，
+# 再加 {0.25, 0.75}³ 的内部点
+CELL_CHECK_OFFSETS = np.vstack((
+    np.stack(np.meshgrid(*[[0.0, 0.5, 1.0]] * 3, indexing='ij'), axis=-1).reshape(-1, 3),
+    np.stack(np.meshgrid(*[[0.25, 0.75]] * 3, indexing='ij'), axis=-1).reshape(-1, 3),
+))
+# 检查点之间的误差峰值可能略高于检查点，检查时使用容差的80%
+CELL_CHECK_MARGIN = 0.8
+
+class IKLookupGrid:
+    """逆运动学查找表
+
+    网格只存储肩关节和肘关节角（随位置平滑变化），不可达网格点存为NaN；
+    底座角 atan2(y, x) 在 ±π 处不连续，直接解析计算，不做插值。
+    生成时在每个网格单元的角点、棱中点、面中心和内部点与解析解比较，任一点误差
+    超过容差的单元（靠近可达边界处）标记为不可用，查询落在这些单元时回退到解析解。
+    """
+
+    def __init__(self, workspace_bounds: Dict[str, Tuple[float, float]],
+                 resolution: float = 5.0, cache_dir: str = './data/ik_grid',
+                 tolerance: float = 0.005):
+        self.workspace_bounds = workspace_bounds
+        self.resolution = float(resolution)
+        self.cache_dir = cache_dir
+        self.tolerance = float(tolerance)
+        self.origin = np.array([workspace_bounds[axis][0] for axis in 'xyz'], dtype=float)
+        upper = np.array([workspace_bounds[axis][1] for axis in 'xyz'], dtype=float)
+        self.shape = tuple(int(n) for n in np.ceil((upper - self.origin) / self.resolution).astype(int) + 1)
+        self.upper = self.origin + (np.array(self.shape) - 1) * self.resolution
+        self.grid: Optional[np.ndarray] = None
+        self.cell_ok: Optional[np.ndarray] = None
+        self.max_error: Optional[float] = None
+
+    @property
+    def cache_path(self) -> str:
+        """缓存目录路径（由边界、分辨率和连杆参数决定），内含grid.npy、cells.npy和meta.json"""
+        key = json.dumps({
+            "bounds": {axis: list(self.workspace_bounds[axis]) for axis in 'xyz'},
+            "resolution": self.resolution,
+            "tolerance": self.tolerance,
+            "cell_checks": [len(CELL_CHECK_OFFSETS), CELL_CHECK_MARGIN],
+            "links": [L1, L2, JOINT_OFFSET]
+        }, sort_keys=True)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"ik_grid_{digest}")
+
+    def load_or_build(self) -> 'IKLookupGrid':
+        """内存映射加载缓存；缓存不存在时计算并保存"""
+        path = self.cache_path
+        if not os.path.isdir(path):
+            self.build()
+            self.save()
+        self.grid = np.load(os.path.join(path, 'grid.npy'), mmap_mode='r')
+        self.cell_ok = np.load(os.path.join(path, 'cells.npy'), mmap_mode='r')
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.max_error = json.load(f).get("max_error")
+        logger.info(f"逆运动学查找表已加载: {path} {self.shape}")
+        return self
+
+    def build(self) -> None:
+        """在网格点上计算解析逆运动学"""
+        axes = [self.origin[i] + np.arange(n) * self.resolution for i, n in enumerate(self.shape)]
+        gx, gy, gz = np.meshgrid(*axes, indexing='ij')
+        points = np.column_stack((gx.ravel(), gy.ravel(), gz.ravel()))
+
+        grid = np.empty((len(points), 2), dtype=np.float32)
+        chunk = 200000
+        for start in range(0, len(points), chunk):
+            angles, valid = calculate_all_angles_batch(points[start:start + chunk])
+            values = angles[:, 1:3].astype(np.float32)
+            values[~valid] = np.nan
+            grid[start:start + chunk] = values
+
+        self.grid = grid.reshape(self.shape + (2,))
+
+        # 单元误差检查：每个单元内的角点、棱中点、面中心、中心及内部点都与解析解比较
+        cell_shape = tuple(n - 1 for n in self.shape)
+        cells = np.indices(cell_shape).reshape(3, -1).T
+        cell_ok = np.empty(len(cells), dtype=bool)
+        offsets = CELL_CHECK_OFFSETS
+        cell_chunk = max(chunk // len(offsets), 1)
+        for start in range(0, len(cells), cell_chunk):
+            i0 = np.repeat(cells[start:start + cell_chunk], len(offsets), axis=0)
+            t = np.tile(offsets, (len(i0) // len(offsets), 1))
+            exact, exact_valid = calculate_all_angles_batch(self.origin + (i0 + t) * self.resolution)
+            approx = self._interpolate(i0, t)
+            # 腕关节由肩、肘角导出，其误差为两者之和
+            delta = exact[:, 1:3] - approx
+            error = np.maximum(np.max(np.abs(delta), axis=1), np.abs(delta.sum(axis=1)))
+            point_ok = exact_valid & np.all(np.isfinite(approx), axis=1) & (error <= self.tolerance * CELL_CHECK_MARGIN)
+            cell_ok[start:start + cell_chunk] = point_ok.reshape(-1, len(offsets)).all(axis=1)
+        self.cell_ok = cell_ok.reshape(cell_shape)
+
+        self.max_error = self.verify()
+        logger.info(f"逆运动学查找表已生成: {self.shape}, 可用单元={self.cell_ok.mean():.1%}, "
+                    f"最大误差={self.max_error:.5f}rad")
+
+    def save(self) -> None:
+        """
+        保存查找表到磁盘：网格、单元掩码和元数据先写入临时目录，再整体重命名为缓存目录，
+        中途崩溃不会留下不配套的文件
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.cache_path
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, 'grid.npy'), np.ascontiguousarray(self.grid))
+        np.save(os.path.join(tmp_path, 'cells.npy'), np.ascontiguousarray(self.cell_ok))
+        with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({"shape": list(self.shape), "resolution": self.resolution,
+                       "tolerance": self.tolerance, "max_error": self.max_error}, f, indent=4)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # 其他进程已先写好同一缓存
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+
+    def lookup(self, points) -> Tuple[np.ndarray, np.ndarray]:
+        """三线性插值求解 (N, 3) 目标点，返回 (N, 6) 关节角和可用掩码
+
+        掩码为False表示目标在网格外、不可达或所在单元精度不足
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        inside = np.all((points >= self.origin) & (points <= self.upper), axis=1)
+
+        index = (points - self.origin) / self.resolution
+        i0 = np.clip(np.floor(index).astype(int), 0, np.array(self.shape) - 2)
+        t = np.clip(index - i0, 0.0, 1.0)
+        shoulder_elbow = self._interpolate(i0, t)
+        ix, iy, iz = i0[:, 0], i0[:, 1], i0[:, 2]
+
+        valid = inside & np.all(np.isfinite(shoulder_elbow), axis=1) & self.cell_ok[ix, iy, iz]
+        shoulder, elbow = shoulder_elbow[:, 0], shoulder_elbow[:, 1]
+        base = np.arctan2(points[:, 1], points[:, 0])
+        wrist = np.pi - elbow - shoulder - 0.1
+        roll = base - 3.14 / 2
+        hand = np.full_like(base, 3.14)
+        return np.column_stack((base, shoulder, elbow, wrist, roll, hand)), valid
+
+    def _interpolate(self, i0: np.ndarray, t: np.ndarray) -> np.ndarray:
+        """在单元 i0 内按局部坐标 t∈[0,1]³ 三线性插值，返回 (N, 2) 肩/肘关节角"""
+        ix, iy, iz = i0[:, 0], i0[:, 1], i0[:, 2]
+        tx, ty, tz = t[:, 0:1], t[:, 1:2], t[:, 2:3]
+
+        g = self.grid
+        c00 = g[ix, iy, iz] * (1 - tx) + g[ix + 1, iy, iz] * tx
+        c10 = g[ix, iy + 1, iz] * (1 - tx) + g[ix + 1, iy + 1, iz] * tx
+        c01 = g[ix, iy, iz + 1] * (1 - tx) + g[ix + 1, iy, iz + 1] * tx
+        c11 = g[ix, iy + 1, iz + 1] * (1 - tx) + g[ix + 1, iy + 1, iz + 1] * tx
+        c0 = c00 * (1 - ty) + c10 * ty
+        c1 = c01 * (1 - ty) + c11 * ty
+        return c0 * (1 - tz) + c1 * tz
+
+    def solve(self, points) -> Tuple[np.ndarray, np.ndarray]:
+        """查找表求解，查找表不可用的点回退到解析解，返回 (N, 6) 关节角和可达掩码"""
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        angles, valid = self.lookup(points)
+        fallback = ~valid
+        if np.any(fallback):
+            exact, exact_valid = calculate_all_angles_batch(points[fallback])
+            angles[fallback] = exact
+            valid[fallback] = exact_valid
+        return angles, valid
+
+    def verify(self, samples: int = 50000, seed: int = 0) -> float:
+        """随机抽样与解析解比较，返回可达点上的最大角度误差(rad)"""
+        rng = np.random.default_rng(seed)
+        points = rng.uniform(self.origin, self.upper, size=(samples, 3))
+        exact, exact_valid = calculate_all_angles_batch(points)
+        approx, approx_valid = self.lookup(points)
+        both = exact_valid & approx_valid
+        if not np.any(both):
+            return 0.0
+        return float(np.max(np.abs(exact[both] - approx[both])))
+
+# 全局查找表实例
+ik_grid = None
+
+def get_ik_grid() -> IKLookupGrid:
+    """获取全局逆运动学查找表（首次调用时加载或生成）"""
+    global ik_grid
+    if ik_grid is None:
+        robot = get_config().robot
+        ik_grid = IKLookupGrid(robot.workspace_bounds, robot.ik_grid_resolution,
+                               robot.ik_grid_cache_dir, robot.ik_grid_tolerance).load_or_build()
+        if ik_grid.max_error is not None and ik_grid.max_error > robot.ik_grid_tolerance:
+            logger.warning(f"查找表误差 {ik_grid.max_error:.5f}rad 超过允许值 "
+                           f"{robot.ik_grid_tolerance}rad，请减小 ik_grid_resolution")
+    return ik_grid
+
+def grid_anglecommandgenerator(x: float, y: float, z: float, speed: float = 0, acc: float = 10) -> Optional[Dict]:
+    """使用查找表生成T:102指令，目标不可达时返回None"""
+    angles, valid = get_ik_grid().solve([[x, y, z]])
+    if not valid[0]:
+        return None
+    base, shoulder, elbow, wrist, roll, hand = angles[0].tolist()
+    return {"T": 102, "base": base, "shoulder": shoulder, "elbow": elbow,
+            "wrist": wrist, "roll": roll, "hand": hand, "spd": speed, "acc": acc}
+
+if __name__ == "__main__":
+    # 生成查找表并输出误差
+    grid = get_ik_grid()
+    print(f"网格尺寸: {grid.shape}, 分辨率: {grid.resolution}mm")
+    print(f"相对解析解最大误差: {grid.verify():.5f} rad")
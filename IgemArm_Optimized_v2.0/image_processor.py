@@ -10,7 +10,7 @@ import logging
 import time
 from config import get_config
 from error_handler import handle_error, ErrorType, image_processing_error_handler
-from coordinate_transformer import Point2D
+from coordinate_transformer import Point2D, PointArray
 
 logger = logging.getLogger(__name__)
 
@@ -184,24 +184,15 @@ class ContourDetector:
             epsilon = self.config.image_processing.contour_epsilon_factor * perimeter
             approx_points = cv2.approxPolyDP(contour, epsilon, True)
             
-            # 转换为Point2D列表
+            # 转换为相对于图像中心的坐标（批量计算）
             h, w = image_shape[:2]
             image_center = Point2D(w // 2, h // 2)
             
-            points = []
-            for point in approx_points:
-                pixel_point = Point2D(point[0][0], point[0][1])
-                # 转换为相对于图像中心的坐标
-                relative_point = pixel_point - image_center
-                points.append(relative_point)
+            relative_points = PointArray.from_array(approx_points.reshape(-1, 2)) - image_center
+            points = relative_points.to_points()
             
             # 计算质心
-            if points:
-                center_x = sum(p.x for p in points) / len(points)
-                center_y = sum(p.y for p in points) / len(points)
-                center = Point2D(center_x, center_y)
-            else:
-                center = Point2D(0, 0)
+            center = relative_points.mean()
             
             # 计算边界矩形
             x, y, w, h = cv2.boundingRect(contour)
@@ -0,0 +1,226 @@
+"""
+工作空间可达性与奇异性地图
+基于countbyhand运动学在工作空间内预计算体素分类（可达/接近奇异/不可达）并缓存到磁盘，
+运行时按体素索引常数时间查询，整条路径可一次向量化筛查
+"""
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, Tuple, Optional
+
+import numpy as np
+
+from config import get_config
+from countbyhand import calculate_all_angles_batch, L1, L2, JOINT_OFFSET
+
+logger = logging.getLogger(__name__)
+
+# 体素分类
+UNREACHABLE = 0
+NEAR_SINGULAR = 1
+REACHABLE = 2
+
+class ReachabilityMap:
+    """可达性体素地图
+
+    在体素角点上用批量逆运动学判断可达性和关节限位，并计算奇异性指标：
+    大臂与小臂夹角C的 sin(C)（手臂伸直或折叠时趋于0）以及末端到底座轴线的水平距离
+    （底座角在轴线上无定义）。每个体素取其8个角点中最差的分类，保证查询结果偏保守。
+    """
+
+    def __init__(self, workspace_bounds: Dict[str, Tuple[float, float]],
+                 resolution: float = 5.0, cache_dir: str = './data/reachability',
+                 singularity_threshold: float = 0.1, axis_margin: float = 20.0,
+                 joint_limits: Optional[Dict[str, float]] = None):
+        self.workspace_bounds = workspace_bounds
+        self.resolution = float(resolution)
+        self.cache_dir = cache_dir
+        self.singularity_threshold = float(singularity_threshold)
+        self.axis_margin = float(axis_margin)
+        self.joint_limits = joint_limits or {'shoulder': np.pi / 2, 'elbow': np.pi, 'wrist': np.pi}
+        self.origin = np.array([workspace_bounds[axis][0] for axis in 'xyz'], dtype=float)
+        upper = np.array([workspace_bounds[axis][1] for axis in 'xyz'], dtype=float)
+        # 角点数
+        self.shape = tuple(int(n) for n in np.ceil((upper - self.origin) / self.resolution).astype(int) + 1)
+        self.upper = self.origin + (np.array(self.shape) - 1) * self.resolution
+        self.cells: Optional[np.ndarray] = None
+
+    @property
+    def cache_path(self) -> str:
+        """缓存文件路径（由边界、分辨率、阈值和连杆参数决定）"""
+        key = json.dumps({
+            "bounds": {axis: list(self.workspace_bounds[axis]) for axis in 'xyz'},
+            "resolution": self.resolution,
+            "singularity_threshold": self.singularity_threshold,
+            "axis_margin": self.axis_margin,
+            "joint_limits": self.joint_limits,
+            "links": [L1, L2, JOINT_OFFSET]
+        }, sort_keys=True)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"reachability_{digest}.npy")
+
+    def load_or_build(self) -> 'ReachabilityMap':
+        """内存映射加载缓存；缓存不存在时计算并保存"""
+        path = self.cache_path
+        if not os.path.exists(path):
+            self.build()
+            self.save()
+        self.cells = np.load(path, mmap_mode='r')
+        logger.info(f"可达性地图已加载: {path} {self.cells.shape}")
+        return self
+
+    def classify_exact(self, points) -> np.ndarray:
+        """直接用运动学对 (N, 3) 点分类（不查表）"""
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        angles, valid = calculate_all_angles_batch(points)
+        within_limits = ((np.abs(angles[:, 1]) <= self.joint_limits['shoulder']) &
+                         (np.abs(angles[:, 2]) <= self.joint_limits['elbow']) &
+                         (np.abs(angles[:, 3]) <= self.joint_limits['wrist']))
+
+        # 大臂与小臂夹角C：elbow = π - C - JOINT_OFFSET
+        link_angle = np.pi - angles[:, 2] - JOINT_OFFSET
+        singular = ((np.abs(np.sin(link_angle)) < self.singularity_threshold) |
+                    (np.hypot(points[:, 0], points[:, 1]) < self.axis_margin))
+
+        result = np.full(len(points), UNREACHABLE, dtype=np.uint8)
+        reachable = valid & within_limits
+        result[reachable] = REACHABLE
+        result[reachable & singular] = NEAR_SINGULAR
+        return result
+
+    def build(self) -> None:
+        """在体素角点上分类，每个体素取8个角点的最差值"""
+        axes = [self.origin[i] + np.arange(n) * self.resolution for i, n in enumerate(self.shape)]
+        gx, gy, gz = np.meshgrid(*axes, indexing='ij')
+        corners = self.classify_exact(np.column_stack((gx.ravel(), gy.ravel(), gz.ravel())))
+        corners = corners.reshape(self.shape)
+
+        cells = corners[:-1, :-1, :-1].copy()
+        for dx in (0, 1):
+            for dy in (0, 1):
+                for dz in (0, 1):
+                    np.minimum(cells, corners[dx:dx + self.shape[0] - 1,
+                                              dy:dy + self.shape[1] - 1,
+                                              dz:dz + self.shape[2] - 1], out=cells)
+        self.cells = cells
+        logger.info(f"可达性地图已生成: {cells.shape}, 可达={np.mean(cells == REACHABLE):.1%}, "
+                    f"接近奇异={np.mean(cells == NEAR_SINGULAR):.1%}")
+
+    def save(self) -> None:
+        """保存地图到磁盘"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.cache_path
+        tmp_path = path + '.tmp.npy'
+        np.save(tmp_path, np.ascontiguousarray(self.cells))
+        os.replace(tmp_path, path)
+
+    def classify(self, points) -> np.ndarray:
+        """查表分类 (N, 3) 点，工作空间外的点为UNREACHABLE"""
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        inside = np.all((points >= self.origin) & (points <= self.upper), axis=1)
+        index = np.floor((points - self.origin) / self.resolution).astype(int)
+        index = np.clip(index, 0, np.array(self.cells.shape) - 1)
+        result = np.asarray(self.cells[index[:, 0], index[:, 1], index[:, 2]])
+        return np.where(inside, result, UNREACHABLE).astype(np.uint8)
+
+    def is_reachable(self, points, allow_singular: bool = False) -> np.ndarray:
+        """返回 (N,) bool 可达掩码"""
+        level = NEAR_SINGULAR if allow_singular else REACHABLE
+        return self.classify(points) >= level
+
+def segment_box_clip(starts, ends, lower, upper) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    线段与轴对齐盒的slab求交，返回每条线段在盒内部分的参数区间 [t_enter, t_exit]
+
+    参数:
+        starts, ends: (N, 3) 线段端点
+        lower, upper: (3,) 盒的下/上边界
+    返回:
+        t_enter, t_exit: (N,)，t_enter > t_exit 表示线段与盒不相交；
+        线段完全在盒内当且仅当 t_enter <= 0 且 t_exit >= 1
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+    direction = np.asarray(ends, dtype=float).reshape(-1, 3) - starts
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t0 = (lower - starts) / direction
+        t1 = (upper - starts) / direction
+    # 与某轴平行的线段：该轴坐标在slab内则不约束，否则不相交
+    parallel = direction == 0
+    inside_slab = (starts >= lower) & (starts <= upper)
+    t_near = np.where(parallel, np.where(inside_slab, -np.inf, np.inf), np.minimum(t0, t1))
+    t_far = np.where(parallel, np.where(inside_slab, np.inf, -np.inf), np.maximum(t0, t1))
+    t_enter = np.maximum(np.max(t_near, axis=1), 0.0)
+    t_exit = np.minimum(np.min(t_far, axis=1), 1.0)
+    return t_enter, t_exit
+
+def segment_distance_range(starts, ends, axes=(0, 1, 2)) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    线段上各点到原点（axes=(0,1)时为到z轴）距离的最小值和最大值，返回 (N,) 两个数组
+
+    距离平方沿线段为凸二次函数，最大值在端点，最小值在投影点（截断到[0,1]）
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 3)[:, list(axes)]
+    ends = np.asarray(ends, dtype=float).reshape(-1, 3)[:, list(axes)]
+    direction = ends - starts
+    length_sq = np.einsum('ij,ij->i', direction, direction)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(length_sq > 0, -np.einsum('ij,ij->i', starts, direction) / length_sq, 0.0)
+    closest = starts + np.clip(t, 0.0, 1.0)[:, None] * direction
+    d_min = np.linalg.norm(closest, axis=1)
+    d_max = np.maximum(np.linalg.norm(starts, axis=1), np.linalg.norm(ends, axis=1))
+    return d_min, d_max
+
+def segment_min_link_sine(starts, ends) -> np.ndarray:
+    """
+    线段上大臂与小臂夹角C的 |sin(C)| 最小值，返回 (N,)
+
+    由余弦定理 cos(C) = (L1² + L2² - r²) / (2·L1·L2) 随到原点距离r单调变化，
+    |cos(C)| 的最大值（即 |sin(C)| 的最小值）在距离区间 [r_min, r_max] 的端点取得
+    """
+    r_min, r_max = segment_distance_range(starts, ends)
+    cos_c = np.clip((L1**2 + L2**2 - np.stack((r_min, r_max)) ** 2) / (2 * L1 * L2), -1.0, 1.0)
+    return np.sqrt(1.0 - np.max(cos_c ** 2, axis=0))
+
+def segment_reachable_mask(starts, ends, workspace_bounds: Dict[str, Tuple[float, float]],
+                           axis_margin: float = 0.0, singularity_threshold: float = 0.0) -> np.ndarray:
+    """
+    精确判断每条线段是否整段位于可达区域内：工作空间盒 ∩ 球壳 [L1-L2, L1+L2]，
+    与底座轴线保持 axis_margin 以上的水平距离，且全段 |sin(C)| 不低于 singularity_threshold
+    （与体素地图的接近奇异判据一致）。返回 (N,) bool
+    """
+    lower = [workspace_bounds[axis][0] for axis in 'xyz']
+    upper = [workspace_bounds[axis][1] for axis in 'xyz']
+    t_enter, t_exit = segment_box_clip(starts, ends, lower, upper)
+    in_box = (t_enter <= 0) & (t_exit >= 1)
+    r_min, r_max = segment_distance_range(starts, ends)
+    in_shell = (r_min >= abs(L1 - L2)) & (r_max <= L1 + L2)
+    rho_min, _ = segment_distance_range(starts, ends, axes=(0, 1))
+    regular = segment_min_link_sine(starts, ends) >= singularity_threshold
+    return in_box & in_shell & (rho_min >= axis_margin) & regular
+
+# 全局地图实例
+reachability_map = None
+
+def get_reachability_map() -> ReachabilityMap:
+    """获取全局可达性地图（首次调用时加载或生成）"""
+    global reachability_map
+    if reachability_map is None:
+        robot = get_config().robot
+        reachability_map = ReachabilityMap(robot.workspace_bounds, robot.reachability_resolution,
+                                           robot.reachability_cache_dir,
+                                           robot.singularity_threshold,
+                                           robot.base_axis_margin).load_or_build()
+    return reachability_map
+
+if __name__ == "__main__":
+    # 生成地图并与直接计算比较
+    reach = get_reachability_map()
+    print(f"体素: {reach.cells.shape}, 分辨率: {reach.resolution}mm")
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(reach.origin, reach.upper, size=(100000, 3))
+    exact = reach.classify_exact(samples)
+    mapped = reach.classify(samples)
+    print(f"查表比直接计算更乐观的点: {int(np.sum(mapped > exact))}")
@@ -0,0 +1,336 @@
+"""
+RoArm串口模拟器
+通过伪终端(pty)提供与真实机械臂相同的JSON协议（T:100/102/104/105/108/1051/999），
+模拟关节运动时间、反馈发送频率、串口带宽以及处理延迟/抖动，
+控制器、流式执行器和治疗流程可在普通Linux机器上测试和基准测试：
+    sim = RoArmSimulator().start()
+    arm = RoArmControl(port=sim.port)
+"""
+import os
+import tty
+import json
+import heapq
+import random
+import select
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from countbyhand import calculate_all_angles_batch, forward_kinematics_batch, anglecommandgenerator
+
+# 回零姿态 [base, shoulder, elbow, wrist, roll, hand]
+HOME_JOINTS = (0.0, 0.0, np.pi / 2, 0.0, 0.0, np.pi)
+JOINT_NAMES = ("base", "shoulder", "elbow", "wrist", "roll", "hand")
+
+
+class RoArmSimulator:
+    """模拟机械臂
+
+    参数:
+        baudrate: 串口波特率，每字节按10位计算收发耗时
+        latency: 固件处理一条命令的基础延迟 (s)
+        jitter: 处理延迟的高斯抖动标准差 (s)
+        feedback_hz: 主动发送T:1051反馈的频率，0表示只在收到T:105时回复
+        joint_speed: 各关节最大角速度 (rad/s)，标量或(6,)
+        seed: 抖动随机数种子
+    """
+
+    def __init__(self, baudrate: int = 115200, latency: float = 0.002, jitter: float = 0.0005,
+                 feedback_hz: float = 0.0, joint_speed=1.5, seed: Optional[int] = None):
+        self.baudrate = baudrate
+        self.latency = latency
+        self.jitter = jitter
+        self.feedback_hz = feedback_hz
+        self.joint_speed = np.broadcast_to(np.asarray(joint_speed, dtype=float), (6,)).copy()
+        self._random = random.Random(seed)
+
+        self.joints = np.array(HOME_JOINTS, dtype=float)
+        self.target = self.joints.copy()
+        self.pid = {}
+        self.stats = {"received": 0, "sent": 0, "unparsed": 0, "stops": 0}
+
+        self._master = None
+        self._slave = None
+        self.port = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._events = []          # (时刻, 序号, 动作)
+        self._sequence = 0
+        self._cond = threading.Condition()
+        self._rx_free = 0.0        # 接收链路空闲时刻
+        self._tx_free = 0.0        # 发送链路空闲时刻
+        self._last_process = 0.0   # 保证命令按到达顺序处理
+        self._last_update = time.monotonic()
+        self._threads = []
+
+    def _byte_time(self, size: int) -> float:
+        return size * 10.0 / self.baudrate
+
+    def start(self) -> 'RoArmSimulator':
+        """创建伪终端并启动模拟线程，self.port为可供pyserial打开的设备名"""
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._running = True
+        targets = [self._reader_loop, self._scheduler_loop]
+        if self.feedback_hz > 0:
+            targets.append(self._feedback_loop)
+        for target in targets:
+            thread = threading.Thread(target=target, name=f"roarm-sim-{target.__name__}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        """停止模拟器并关闭伪终端"""
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # ---- 运动模型 ----
+
+    def _advance(self) -> None:
+        """按关节限速把当前关节角推进到当前时刻（需持有锁）"""
+        now = time.monotonic()
+        dt = now - self._last_update
+        self._last_update = now
+        step = self.joint_speed * dt
+        self.joints += np.clip(self.target - self.joints, -step, step)
+
+    def position(self):
+        """当前末端位置 (x, y, z)"""
+        with self._lock:
+            self._advance()
+            return tuple(forward_kinematics_batch(self.joints[None, :])[0].tolist())
+
+    def is_moving(self) -> bool:
+        with self._lock:
+            self._advance()
+            return bool(np.any(np.abs(self.target - self.joints) > 1e-6))
+
+    def _feedback_line(self) -> bytes:
+        """紧凑格式的T:1051反馈（字段顺序与固件一致）"""
+        with self._lock:
+            self._advance()
+            joints = self.joints.copy()
+        x, y, z = forward_kinematics_batch(joints[None, :])[0].tolist()
+        b, s, e, t, r, g = joints.tolist()
+        return (b'{"T":1051,"x":%.2f,"y":%.2f,"z":%.2f,"tit":%.4f,"b":%.4f,"s":%.4f,"e":%.4f,'
+                b'"t":%.4f,"r":%.4f,"g":%.4f,"tB":0,"tS":0,"tE":0,"tT":0,"tR":0}\n'
+                % (x, y, z, t, b, s, e, t, r, g))
+
+    def _handle(self, line: bytes) -> None:
+        """执行一条命令并安排回复"""
+        try:
+            message = json.loads(line)
+            t_code = message["T"]
+        except (ValueError, KeyError, TypeError):
+            self.stats["unparsed"] += 1
+            return
+        self.stats["received"] += 1
+
+        if t_code == 105:
+            self._transmit(self._feedback_line())
+            return
+        with self._lock:
+            self._advance()
+            if t_code == 100:
+                self.target = np.array(HOME_JOINTS, dtype=float)
+            elif t_code == 102:
+                self.target = np.array([message.get(name, self.target[i])
+                                        for i, name in enumerate(JOINT_NAMES)], dtype=float)
+            elif t_code == 104:
+                angles, valid = calculate_all_angles_batch([[message["x"], message["y"], message["z"]]])
+                if valid[0]:
+                    self.target[:3] = angles[0, :3]
+            elif t_code == 108:
+                self.pid[message.get("joint")] = (message.get("p"), message.get("i"))
+            elif t_code == 999:
+                self.target = self.joints.copy()
+                self.stats["stops"] += 1
+        # 其余命令原样回显
+        self._transmit(line + b'\n')
+
+    # ---- 链路与调度 ----
+
+    def _schedule(self, when: float, action) -> None:
+        with self._cond:
+            self._sequence += 1
+            heapq.heappush(self._events, (when, self._sequence, action))
+            self._cond.notify()
+
+    def _transmit(self, data: bytes) -> None:
+        """按发送带宽排队写出"""
+        now = time.monotonic()
+        self._tx_free = max(self._tx_free, now) + self._byte_time(len(data))
+        self._schedule(self._tx_free, lambda: self._write(data))
+
+    def _write(self, data: bytes) -> None:
+        try:
+            os.write(self._master, data)
+            self.stats["sent"] += 1
+        except OSError:
+            pass
+
+    def _reader_loop(self) -> None:
+        """读取主机发送的数据，按接收带宽和处理延迟安排命令执行"""
+        buffer = b''
+        while self._running:
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                chunk = os.read(self._master, 4096)
+            except OSError:
+                break
+            now = time.monotonic()
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                self._rx_free = max(self._rx_free, now) + self._byte_time(len(line) + 1)
+                line = line.strip()
+                if not line:
+                    continue
+                delay = max(self.latency + self._random.gauss(0.0, self.jitter), 0.0)
+                self._last_process = max(self._rx_free + delay, self._last_process)
+                self._schedule(self._last_process, lambda line=line: self._handle(line))
+
+    def _scheduler_loop(self) -> None:
+        """按时刻执行排队的动作"""
+        while self._running:
+            with self._cond:
+                while self._running and (not self._events or self._events[0][0] > time.monotonic()):
+                    timeout = self._events[0][0] - time.monotonic() if self._events else None
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+                _, _, action = heapq.heappop(self._events)
+            action()
+
+    def _feedback_loop(self) -> None:
+        """按feedback_hz主动发送位置反馈"""
+        period = 1.0 / self.feedback_hz
+        deadline = time.monotonic()
+        while self._running:
+            deadline += period
+            time.sleep(max(deadline - time.monotonic(), 0.0))
+            self._transmit(self._feedback_line())
+
+
+def run_controller_check(port: str) -> bool:
+    """在模拟器上驱动 ImprovedRobotController：点到点移动并等待到位、流式平滑移动、紧急停止、重连"""
+    from robot_controller_improved import ImprovedRobotController
+
+    arm = ImprovedRobotController(port=port)
+    try:
+        if not arm.is_connected:
+            print("控制器: 连接失败")
+            return False
+        results = {}
+        results["move"] = arm.move_to_position(175, 0, 100) and arm.wait_until_arrived(175, 0, 100)
+        results["smooth"] = arm.move_to_position_smooth(200, 60, 60)
+        stream = arm.active_streamer.report() if arm.active_streamer else {}
+        latency = arm.emergency_stop()
+        results["stop"] = latency is not None and latency["ack_ms"] is not None
+        arm.clear_emergency_stop()
+        results["reconnect"] = arm.connect() and arm.move_to_position_smooth(175, -40, 90)
+        print(f"控制器: {results}, 流式发送 {stream.get('sent')}点/跳过{stream.get('skipped')}点")
+        return all(results.values())
+    finally:
+        arm.disconnect()
+
+
+def run_roarm_control_check(port: str) -> bool:
+    """在模拟器上驱动 RoArmControl：点到点移动并等待到位、直线轨迹流式发送、紧急停止"""
+    from control import RoArmControl
+
+    arm = RoArmControl(port=port)
+    try:
+        results = {}
+        arm.move_to_position(175, 0, 100)
+        results["move"] = arm.wait_until_arrived(175, 0, 100)
+        start = arm.getcurrentposition()
+        results["straight"] = start is not None and arm.move_to_position_straight(start, [200, 60, 60]) \
+            and arm.wait_until_arrived(200, 60, 60)
+        latency = arm.emergency_stop()
+        results["stop"] = latency["ack_ms"] is not None
+        arm.clear_emergency_stop()
+        print(f"RoArmControl: {results}")
+        return all(results.values())
+    finally:
+        arm.close()
+
+
+if __name__ == '__main__':
+    # 在模拟器上对串口传输层做基准测试
+    import serial
+    from serial_transport import SerialTransport, CommandPipeline, wait_until_arrived
+
+    with RoArmSimulator(latency=0.002, jitter=0.0005, seed=0) as sim:
+        ser = serial.Serial(sim.port, 115200, timeout=1)
+        transport = SerialTransport(ser)
+        transport.start()
+        print(f"模拟器端口: {sim.port}")
+
+        start = time.perf_counter()
+        for _ in range(50):
+            transport.request({"T": 105})
+        print(f"T:105往返: {(time.perf_counter() - start) / 50 * 1000:.2f}ms/次")
+
+        points = np.column_stack((np.full(200, 175.0), np.linspace(-50, 50, 200), np.full(200, 75.0)))
+        angles, _ = calculate_all_angles_batch(points)
+        commands = [{"T": 102, **dict(zip(JOINT_NAMES, row)), "spd": 0, "acc": 10} for row in angles.tolist()]
+        start = time.perf_counter()
+        for command in commands:
+            transport.request(command)
+        blocking = time.perf_counter() - start
+        print(f"200条T:102: 逐条等待 {blocking:.3f}s")
+        for buffer_bytes in (256, 1024):
+            pipeline = CommandPipeline(transport, window=8, buffer_bytes=buffer_bytes)
+            start = time.perf_counter()
+            pipeline.submit_many(commands)
+            pipeline.drain()
+            print(f"200条T:102: 流水线(缓冲区{buffer_bytes}B) {time.perf_counter() - start:.3f}s")
+
+        command = anglecommandgenerator(175, 80, 75)
+        transport.request(command)
+        start = time.perf_counter()
+        arrived = wait_until_arrived(transport, [command[name] for name in JOINT_NAMES[:4]])
+        print(f"移动到位: {arrived}, 用时 {time.perf_counter() - start:.3f}s")
+
+        print(f"紧急停止: {transport.emergency_stop()}")
+        print(transport.latency.format_report())
+        transport.stop()
+        ser.close()
+
+    # 在模拟器上驱动上层控制器（仅运行当前目录中存在且依赖可导入的控制器）
+    checks = {"ImprovedRobotController": run_controller_check, "RoArmControl": run_roarm_control_check}
+    failed = []
+    for name, check in checks.items():
+        with RoArmSimulator(latency=0.002, jitter=0.0005, seed=0) as sim:
+            try:
+                ok = check(sim.port)
+            except ImportError as e:
+                print(f"{name}: 跳过（{e}）")
+                continue
+        if not ok:
+            failed.append(name)
+    if failed:
+        raise SystemExit(f"模拟器检查失败: {failed}")
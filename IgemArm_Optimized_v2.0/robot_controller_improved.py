@@ -8,15 +8,20 @@ import json
 import threading
 import queue
 import math
+import numpy as np
 from typing import Optional, Dict, Any, List, Callable, Tuple
 from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
+from concurrent.futures import Future
 import logging
 
 from config import get_config
 from error_handler import handle_error, ErrorType, communication_error_handler, boundary_error_handler
 from coordinate_transformer import Point3D, Point2D
+from trajectory import plan_cartesian_line
+from serial_transport import SerialTransport, CommandPipeline, wait_until_arrived, gather_replies
+from reachability import get_reachability_map, segment_reachable_mask, UNREACHABLE, NEAR_SINGULAR
 
 logger = logging.getLogger(__name__)
 
@@ -73,8 +78,9 @@ class RobotStatus:
 class SafetyChecker:
     """安全检查器"""
     
-    def __init__(self, workspace_bounds: Dict[str, Tuple[float, float]]):
+    def __init__(self, workspace_bounds: Dict[str, Tuple[float, float]], reachability_map=None):
         self.workspace_bounds = workspace_bounds
+        self.reachability_map = reachability_map
         self.max_joint_angles = {
             'base': math.pi,
             'shoulder': math.pi/2,
@@ -91,8 +97,8 @@ class SafetyChecker:
             'wrist2_load': 500
         }
     
-    def check_position(self, position: Point3D) -> Tuple[bool, str]:
-        """检查位置是否安全"""
+    def check_position(self, position: Point3D, allow_singular: bool = False) -> Tuple[bool, str]:
+        """检查位置是否安全（工作空间边界，以及可达性地图中的可达/奇异分类）"""
         x_min, x_max = self.workspace_bounds['x']
         y_min, y_max = self.workspace_bounds['y']
         z_min, z_max = self.workspace_bounds['z']
@@ -106,8 +112,53 @@ class SafetyChecker:
         if not (z_min <= position.z <= z_max):
             return False, f"Z坐标 {position.z} 超出范围 [{z_min}, {z_max}]"
         
+        if self.reachability_map is not None:
+            level = self.reachability_map.classify([[position.x, position.y, position.z]])[0]
+            if level == UNREACHABLE:
+                return False, f"位置 {position} 超出机械臂可达范围"
+            if level == NEAR_SINGULAR and not allow_singular:
+                return False, f"位置 {position} 接近奇异位形"
+        
         return True, "位置安全"
     
+    def check_segments(self, points, allow_singular: bool = False) -> np.ndarray:
+        """
+        一次NumPy调用检查折线路径 (N, 3) 的所有线段，返回 (N-1,) bool
+        
+        使用线段与工作空间盒的slab求交以及线段到底座原点/轴线的距离区间（含奇异性
+        sin(C)判据），结果精确，与线段长度无关
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        axis_margin = 0.0
+        singularity_threshold = 0.0
+        if self.reachability_map is not None and not allow_singular:
+            axis_margin = self.reachability_map.axis_margin
+            singularity_threshold = self.reachability_map.singularity_threshold
+        return segment_reachable_mask(points[:-1], points[1:], self.workspace_bounds,
+                                      axis_margin, singularity_threshold)
+    
+    def check_path_segments(self, points, allow_singular: bool = False) -> Tuple[bool, str]:
+        """检查整条治疗路径的所有线段"""
+        ok = self.check_segments(points, allow_singular)
+        if not ok.all():
+            bad = np.flatnonzero(~ok)
+            return False, f"路径中 {len(bad)} 段不安全，首段为第{bad[0]}段"
+        return True, "路径安全"
+    
+    def check_path(self, points, allow_singular: bool = False) -> Tuple[bool, str]:
+        """一次向量化查表检查整条路径 (N, 3) 上的所有点"""
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        lower = np.array([self.workspace_bounds[axis][0] for axis in 'xyz'])
+        upper = np.array([self.workspace_bounds[axis][1] for axis in 'xyz'])
+        ok = np.all((points >= lower) & (points <= upper), axis=1)
+        if self.reachability_map is not None:
+            ok &= self.reachability_map.is_reachable(points, allow_singular)
+        if not ok.all():
+            bad = np.flatnonzero(~ok)
+            x, y, z = points[bad[0]]
+            return False, f"路径中 {len(bad)} 个点不安全，首个为第{bad[0]}点 ({x:.1f}, {y:.1f}, {z:.1f})"
+        return True, "路径安全"
+    
     def check_joint_angles(self, angles: JointAngles) -> Tuple[bool, str]:
         """检查关节角度是否安全"""
         for joint_name, angle in angles.__dict__.items():
@@ -128,32 +179,143 @@ class SafetyChecker:
     
     def check_movement_safety(self, start_pos: Point3D, end_pos: Point3D) -> Tuple[bool, str]:
         """检查移动路径是否安全"""
-        # 检查起点和终点
-        start_safe, start_msg = self.check_position(start_pos)
+        # 检查起点和终点，起点允许处于接近奇异区域，以便从中移出
+        start_safe, start_msg = self.check_position(start_pos, allow_singular=True)
         if not start_safe:
             return False, f"起点不安全: {start_msg}"
+        start_regular, _ = self.check_position(start_pos)
         
         end_safe, end_msg = self.check_position(end_pos)
         if not end_safe:
             return False, f"终点不安全: {end_msg}"
         
-        # 检查路径中间点
-        distance = start_pos.distance_to(end_pos)
-        if distance > 100:  # 如果移动距离超过100mm，检查中间点
-            steps = int(distance / 10)  # 每10mm检查一次
-            for i in range(1, steps):
-                t = i / steps
-                intermediate_pos = Point3D(
-                    start_pos.x + t * (end_pos.x - start_pos.x),
-                    start_pos.y + t * (end_pos.y - start_pos.y),
-                    start_pos.z + t * (end_pos.z - start_pos.z)
-                )
-                safe, msg = self.check_position(intermediate_pos)
-                if not safe:
-                    return False, f"路径中间点不安全: {msg}"
+        # 精确检查整段路径（工作空间盒与可达球壳），不依赖采样
+        if not self.check_segments([[start_pos.x, start_pos.y, start_pos.z],
+                                    [end_pos.x, end_pos.y, end_pos.z]],
+                                   allow_singular=not start_regular)[0]:
+            return False, "路径中间点超出可达范围"
         
         return True, "移动路径安全"
 
+class TrajectoryStreamer:
+    """定频轨迹流式执行器
+
+    按绝对截止时刻（起始时刻 + times[i]）发送关节设定点：先睡眠到截止前spin秒，
+    再忙等到截止时刻，抖动不会累积。落后超过一个设定点时跳过已过期的中间点（终点不跳过），
+    逐点记录发送时刻相对截止时刻的延迟。支持暂停（恢复后时间基准顺延）和中止。
+    """
+    
+    def __init__(self, send: Callable[[Dict[str, Any]], Any], commands: List[Dict[str, Any]],
+                 times=None, rate_hz: float = 50.0, drop_late: bool = True, spin: float = 0.001):
+        self.send = send
+        self.commands = list(commands)
+        self.times = (np.asarray(times, dtype=float) if times is not None
+                      else np.arange(len(self.commands)) / rate_hz)
+        self.drop_late = drop_late
+        self.spin = spin
+        self.lateness: List[float] = []   # 每次发送的延迟 (s)
+        self.results: List[Any] = []      # send的返回值
+        self.skipped = 0
+        self.aborted = False
+        self._resume = threading.Event()
+        self._resume.set()
+        self._abort = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def is_paused(self) -> bool:
+        return not self._resume.is_set()
+    
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    @property
+    def skip_fraction(self) -> float:
+        """被跳过的设定点比例"""
+        return self.skipped / len(self.commands) if self.commands else 0.0
+    
+    def pause(self) -> None:
+        """暂停发送"""
+        self._resume.clear()
+    
+    def resume(self) -> None:
+        """恢复发送，剩余设定点的截止时刻顺延暂停时长"""
+        self._resume.set()
+    
+    def abort(self) -> None:
+        """中止发送"""
+        self._abort.set()
+        self._resume.set()
+    
+    def start(self) -> 'TrajectoryStreamer':
+        """在后台线程中执行"""
+        self._thread = threading.Thread(target=self.run, name="trajectory-streamer", daemon=True)
+        self._thread.start()
+        return self
+    
+    def wait(self, timeout: float = None) -> bool:
+        """等待后台执行结束，返回是否已结束"""
+        if self._thread:
+            self._thread.join(timeout)
+        return not self.is_running
+    
+    def _sleep_until(self, deadline: float) -> float:
+        """睡眠到截止时刻（中止或暂停时提前返回），返回当前时刻"""
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin:
+            self._abort.wait(remaining - self.spin)
+        while self._resume.is_set() and not self._abort.is_set():
+            now = time.perf_counter()
+            if now >= deadline:
+                return now
+        return time.perf_counter()
+    
+    def run(self) -> bool:
+        """按截止时刻发送全部设定点，返回是否完整发送（未中止）"""
+        base = time.perf_counter()
+        last = len(self.commands) - 1
+        i = 0
+        while i <= last:
+            if self._abort.is_set():
+                self.aborted = True
+                break
+            if not self._resume.is_set():
+                paused_at = time.perf_counter()
+                self._resume.wait()
+                base += time.perf_counter() - paused_at
+                continue
+            now = self._sleep_until(base + self.times[i])
+            if self._abort.is_set() or not self._resume.is_set():
+                continue
+            if self.drop_late:
+                while i < last and now >= base + self.times[i + 1]:
+                    i += 1
+                    self.skipped += 1
+            try:
+                self.results.append(self.send(self.commands[i]))
+            except Exception as e:
+                logger.error(f"轨迹发送中止: {e}")
+                self.aborted = True
+                break
+            self.lateness.append(now - (base + self.times[i]))
+            i += 1
+        return not self.aborted
+    
+    def report(self) -> Dict[str, Any]:
+        """延迟统计 (ms)"""
+        lateness = np.asarray(self.lateness) * 1000
+        if len(lateness) == 0:
+            return {"sent": 0, "skipped": self.skipped, "aborted": self.aborted}
+        return {
+            "sent": len(lateness),
+            "skipped": self.skipped,
+            "aborted": self.aborted,
+            "mean_ms": float(lateness.mean()),
+            "p99_ms": float(np.percentile(lateness, 99)),
+            "max_ms": float(lateness.max())
+        }
+
 class ImprovedRobotController:
     """改进的机械臂控制器"""
     
@@ -162,30 +324,44 @@ class ImprovedRobotController:
         self.port = port or self.config.robot.port
         self.baudrate = baudrate or self.config.robot.baudrate
         
-        # 串口连接
+        # 串口连接（所有读取由传输层的单一读线程完成）
         self.ser: Optional[serial.Serial] = None
+        self.transport: Optional[SerialTransport] = None
+        self.pipeline: Optional[CommandPipeline] = None
         self.is_connected = False
         
         # 状态管理
         self.status = RobotStatus()
         self.status_lock = threading.Lock()
         
+        # 位姿缓存：最近一次反馈时刻与最近一次指令目标（time.monotonic）
+        self._feedback_time = 0.0
+        self._commanded_position: Optional[Point3D] = None
+        self._commanded_time = 0.0
+        
         # 安全检查器
-        self.safety_checker = SafetyChecker(self.config.robot.workspace_bounds)
+        reach_map = get_reachability_map() if self.config.robot.use_reachability_map else None
+        self.safety_checker = SafetyChecker(self.config.robot.workspace_bounds, reach_map)
         
         # 数据记录
         self.position_data: List[Dict[str, Any]] = []
         self.data_queue: queue.Queue = queue.Queue()
         self.logging_thread: Optional[threading.Thread] = None
         self.stop_logging_flag = bool = False
+        self._logging_token: Optional[int] = None
         
-        # 位置监控
-        self.monitor_thread: Optional[threading.Thread] = None
-        self.stop_monitoring_flag = bool = False
+        # 位置监控（订阅T:1051反馈）
+        self._monitor_token: Optional[int] = None
         
         # 运动控制
         self.movement_lock = threading.Lock()
         self.current_movement_id = 0
+        self.active_streamer: Optional[TrajectoryStreamer] = None
+        
+        # 查找表逆运动学在启动时加载（内存映射，无需重新计算）
+        if self.config.robot.ik_mode == 'grid':
+            from ik_grid import get_ik_grid
+            get_ik_grid()
         
         # 连接机械臂
         self.connect()
@@ -198,10 +374,24 @@ class ImprovedRobotController:
     
     @communication_error_handler({"operation": "connect"})
     def connect(self) -> bool:
-        """连接机械臂"""
+        """连接机械臂（重连时先停止旧传输层上的订阅和轮询线程，连接成功后重新启动）"""
+        monitoring = self._monitor_token is not None
+        logging_active = self.logging_thread is not None and self.logging_thread.is_alive()
         try:
+            if self.transport:
+                if self.active_streamer:
+                    self.active_streamer.abort()
+                if logging_active:
+                    self.stop_logging()
+                if monitoring:
+                    self.stop_position_monitoring()
+                if self.pipeline:
+                    self.pipeline.cancel_all()
+                self.transport.stop()
             if self.ser and self.ser.is_open:
                 self.ser.close()
+            self.is_connected = False
+            self._feedback_time = 0.0
             
             self.ser = serial.Serial(
                 port=self.port,
@@ -214,12 +404,22 @@ class ImprovedRobotController:
             
             time.sleep(2)  # 等待串口初始化
             
+            self.transport = SerialTransport(self.ser, self.config.robot.timeout)
+            self.transport.start()
+            self.pipeline = CommandPipeline(self.transport, self.config.robot.command_window,
+                                            self.config.robot.command_buffer_bytes,
+                                            self.config.robot.timeout)
+            
             # 测试连接
             if self._test_connection():
                 self.is_connected = True
                 self.status.is_connected = True
                 self.status.current_state = RobotState.IDLE
                 logger.info(f"机械臂连接成功: {self.ser.name}")
+                if monitoring:
+                    self.start_position_monitoring()
+                if logging_active:
+                    self.start_logging()
                 return True
             else:
                 self.is_connected = False
@@ -246,32 +446,44 @@ class ImprovedRobotController:
     @communication_error_handler({"operation": "send_command"})
     def _send_command(self, command: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """发送命令到机械臂"""
-        if not self.is_connected or not self.ser:
+        if not self.transport or not self.transport.is_running:
             raise Exception("机械臂未连接")
         
-        command_str = json.dumps(command) + '\n'
-        self.ser.write(command_str.encode('utf-8'))
-        
-        # 读取响应
-        response = self.ser.readline().decode().strip()
-        if response:
-            try:
-                return json.loads(response)
-            except json.JSONDecodeError:
-                logger.warning(f"无法解析响应: {response}")
-                return None
-        return None
+        # 回复由读线程按T码路由回来，超时返回None
+        return self.transport.request(command)
+    
+    def submit_command(self, command: Dict[str, Any]) -> Optional[Future]:
+        """经流水线发送命令，不等待确认；在途命令达到窗口上限时阻塞"""
+        if not self.pipeline or not self.transport.is_running:
+            handle_error(ErrorType.COMMUNICATION_ERROR, "机械臂未连接")
+            return None
+        return self.pipeline.submit(command)
+    
+    def submit_commands(self, commands: List[Dict[str, Any]]) -> List[Future]:
+        """经流水线批量发送一组命令（如上传整条路径），窗口允许时合并为一次写入，返回各命令的Future"""
+        if not self.pipeline or not self.transport.is_running:
+            handle_error(ErrorType.COMMUNICATION_ERROR, "机械臂未连接")
+            return []
+        return self.pipeline.submit_batch(commands)
+    
+    def send_commands(self, commands: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """批量发送并统一等待回复，返回与commands对应的回复（未确认的为None）"""
+        futures = self.submit_commands(commands)
+        return gather_replies(futures, self.config.robot.timeout) if futures else [None] * len(commands)
+    
+    def wait_for_commands(self, timeout: float = None) -> bool:
+        """等待流水线中所有命令确认（或超时丢弃），返回上次等待以来提交的命令是否全部确认"""
+        return self.pipeline.drain(timeout) if self.pipeline else True
     
     def disconnect(self) -> None:
         """断开连接"""
-        self.stop_logging_flag = True
-        self.stop_monitoring_flag = True
-        
-        if self.logging_thread:
-            self.logging_thread.join(timeout=2)
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=2)
+        self.stop_logging()
+        self.stop_position_monitoring()
         
+        if self.pipeline:
+            self.pipeline.cancel_all()
+        if self.transport:
+            self.transport.stop()
         if self.ser and self.ser.is_open:
             self.ser.close()
         
@@ -296,8 +508,8 @@ class ImprovedRobotController:
             handle_error(ErrorType.BOUNDARY_ERROR, msg, {"target_position": target_position})
             return False
         
-        # 检查移动路径安全
-        current_pos = self.get_current_position()
+        # 检查移动路径安全（使用缓存位姿，过期时才查询）
+        current_pos = self.get_estimated_position()
         if current_pos:
             path_safe, path_msg = self.safety_checker.check_movement_safety(current_pos, target_position)
             if not path_safe:
@@ -310,14 +522,17 @@ class ImprovedRobotController:
                 self.status.current_state = RobotState.MOVING
                 
                 # 使用逆运动学计算关节角度
-                from countbyhand import anglecommandgenerator
-                command = anglecommandgenerator(x, y, z, 
+                command = self._joint_command(x, y, z, 
                                               speed or self.config.robot.default_speed,
                                               acceleration or self.config.robot.default_acceleration)
+                if command is None:
+                    handle_error(ErrorType.BOUNDARY_ERROR, "目标位置不可达", {"target_position": target_position})
+                    return False
                 
                 # 发送命令
                 response = self._send_command(command)
                 if response:
+                    self._record_commanded(target_position)
                     logger.info(f"移动到位置: ({x:.1f}, {y:.1f}, {z:.1f})")
                     return True
                 else:
@@ -330,35 +545,153 @@ class ImprovedRobotController:
         finally:
             self.status.current_state = RobotState.IDLE
     
+    def _joint_command(self, x: float, y: float, z: float, 
+                       speed: float, acceleration: float) -> Optional[Dict[str, Any]]:
+        """按配置的逆运动学模式生成T:102关节指令"""
+        if self.config.robot.ik_mode == 'grid':
+            from ik_grid import grid_anglecommandgenerator
+            return grid_anglecommandgenerator(x, y, z, speed, acceleration)
+        
+        from countbyhand import anglecommandgenerator
+        return anglecommandgenerator(x, y, z, speed, acceleration)
+    
+    def wait_until_arrived(self, x: float, y: float, z: float, tolerance: float = None,
+                           settle: float = None, timeout: float = None) -> bool:
+        """
+        等待到达指定位置并稳定（由T:1051反馈驱动），超时返回False
+        
+        以移动时相同的逆运动学求出指令关节角，与反馈关节角比较（tolerance单位为rad），
+        不依赖固件末端坐标与本地运动学坐标系是否一致
+        """
+        if not self.transport or not self.transport.is_running:
+            handle_error(ErrorType.COMMUNICATION_ERROR, "机械臂未连接")
+            return False
+        command = self._joint_command(x, y, z, 0, 0)
+        if command is None:
+            handle_error(ErrorType.BOUNDARY_ERROR, "目标位置不可达", {"target_position": Point3D(x, y, z)})
+            return False
+        robot = self.config.robot
+        target_joints = (command["base"], command["shoulder"], command["elbow"], command["wrist"])
+        arrived = wait_until_arrived(self.transport, target_joints,
+                                     robot.arrival_joint_tolerance if tolerance is None else tolerance,
+                                     robot.arrival_settle_time if settle is None else settle,
+                                     robot.arrival_timeout if timeout is None else timeout)
+        if not arrived:
+            logger.warning(f"等待到位超时: ({x:.1f}, {y:.1f}, {z:.1f})")
+        return arrived
+    
     def move_to_position_smooth(self, x: float, y: float, z: float, 
-                               steps: int = 10, speed: float = None) -> bool:
-        """平滑移动到指定位置"""
-        current_pos = self.get_current_position()
+                               profile: str = None) -> bool:
+        """沿直线平滑移动到指定位置
+        
+        按关节速度/加速度限制生成最短时间的轨迹，并以 stream_rate_hz 频率按时刻发送
+        """
+        current_pos = self.get_estimated_position()
         if not current_pos:
             return False
         
         target_pos = Point3D(x, y, z)
+        safe, msg = self.safety_checker.check_position(target_pos)
+        if not safe:
+            handle_error(ErrorType.BOUNDARY_ERROR, msg, {"target_position": target_pos})
+            return False
+        path_safe, path_msg = self.safety_checker.check_movement_safety(current_pos, target_pos)
+        if not path_safe:
+            handle_error(ErrorType.BOUNDARY_ERROR, path_msg,
+                         {"start_position": current_pos, "target_position": target_pos})
+            return False
         
-        # 生成中间点
-        for i in range(1, steps + 1):
-            t = i / steps
-            intermediate_pos = Point3D(
-                current_pos.x + t * (target_pos.x - current_pos.x),
-                current_pos.y + t * (target_pos.y - current_pos.y),
-                current_pos.z + t * (target_pos.z - current_pos.z)
-            )
-            
-            # 移动到中间点
-            success = self.move_to_position(
-                intermediate_pos.x, intermediate_pos.y, intermediate_pos.z, speed
-            )
-            if not success:
-                return False
-            
-            # 等待移动完成
-            time.sleep(0.1)
+        robot = self.config.robot
+        trajectory = plan_cartesian_line((current_pos.x, current_pos.y, current_pos.z), (x, y, z),
+                                         robot.max_joint_velocity, robot.max_joint_acceleration,
+                                         robot.stream_rate_hz, profile or robot.trajectory_profile)
+        if trajectory is None:
+            handle_error(ErrorType.BOUNDARY_ERROR, "路径包含不可达点",
+                         {"start_position": current_pos, "target_position": target_pos})
+            return False
+        start_safe, _ = self.safety_checker.check_position(current_pos)
+        path_safe, path_msg = self.safety_checker.check_path(trajectory.points, allow_singular=not start_safe)
+        if not path_safe:
+            handle_error(ErrorType.BOUNDARY_ERROR, path_msg,
+                         {"start_position": current_pos, "target_position": target_pos})
+            return False
         
-        return True
+        try:
+            with self.movement_lock:
+                self.status.current_state = RobotState.MOVING
+                streamer = self.stream_trajectory(trajectory.commands(acc=robot.default_acceleration),
+                                                  trajectory.times)
+                if streamer is None or streamer.aborted:
+                    return False
+                self._record_commanded(target_pos)
+                if streamer.skip_fraction > robot.stream_max_skip_fraction:
+                    handle_error(ErrorType.ROBOT_CONTROL_ERROR,
+                                 f"轨迹发送落后，跳过 {streamer.skipped}/{len(streamer.commands)} 个设定点，"
+                                 f"速度/加速度曲线未被执行",
+                                 {"target_position": target_pos, "stream": streamer.report()})
+                    return False
+                futures = [f for f in streamer.results if f is not None]
+                replies = gather_replies(futures, robot.timeout)
+                lost = sum(reply is None for reply in replies)
+                for future in futures:
+                    future.cancel()  # 未确认的回显不再等待，避免占用后续命令的回复
+                if lost or len(futures) < len(streamer.results):
+                    logger.error(f"轨迹指令未确认: {len(streamer.results) - len(futures) + lost}/{len(streamer.results)}")
+                    return False
+                if not self.wait_until_arrived(x, y, z):
+                    return False
+                logger.info(f"平滑移动到位置: ({x:.1f}, {y:.1f}, {z:.1f}), "
+                            f"{len(trajectory.times)}点, 用时{trajectory.duration:.2f}s")
+                return True
+        except Exception as e:
+            handle_error(ErrorType.ROBOT_CONTROL_ERROR, f"平滑移动失败: {e}")
+            return False
+        finally:
+            self.status.current_state = RobotState.IDLE
+    
+    def stream_trajectory(self, commands: List[Dict[str, Any]], times=None,
+                          wait: bool = True) -> Optional[TrajectoryStreamer]:
+        """
+        以 stream_rate_hz 定频（或按times给定时刻）流式发送关节设定点
+        
+        设定点直接写出、不等待回显确认（定频发送本身限制了速率：50Hz时每周期约111字节，
+        小于固件接收缓冲区），回显Future记录在执行器的results中；发送期间暂停数据记录的
+        T:105轮询，让出回传带宽。
+        wait为False时在后台执行并立即返回执行器，可通过 pause_stream/resume_stream/abort_stream 控制
+        """
+        if not self.transport or not self.transport.is_running:
+            handle_error(ErrorType.COMMUNICATION_ERROR, "机械臂未连接")
+            return None
+        if self.active_streamer and self.active_streamer.is_running:
+            handle_error(ErrorType.ROBOT_CONTROL_ERROR, "已有轨迹正在执行")
+            return None
+        streamer = TrajectoryStreamer(self.transport.send, commands, times, self.config.robot.stream_rate_hz)
+        self.active_streamer = streamer
+        streamer.start()
+        if wait:
+            streamer.wait()
+            stats = streamer.report()
+            logger.debug(f"轨迹流式发送: {stats}")
+            if streamer.skip_fraction > self.config.robot.stream_max_skip_fraction:
+                logger.error(f"轨迹发送落后，跳过 {stats['skipped']}/{len(streamer.commands)} 个设定点")
+            elif stats.get("skipped"):
+                logger.warning(f"轨迹发送落后，跳过 {stats['skipped']} 个设定点")
+        return streamer
+    
+    def pause_stream(self) -> None:
+        """暂停当前轨迹发送"""
+        if self.active_streamer:
+            self.active_streamer.pause()
+    
+    def resume_stream(self) -> None:
+        """恢复当前轨迹发送"""
+        if self.active_streamer:
+            self.active_streamer.resume()
+    
+    def abort_stream(self) -> None:
+        """中止当前轨迹发送"""
+        if self.active_streamer:
+            self.active_streamer.abort()
     
     def get_current_position(self) -> Optional[Point3D]:
         """获取当前位置"""
@@ -371,22 +704,71 @@ class ImprovedRobotController:
             logger.error(f"获取位置失败: {e}")
         return None
     
+    def get_estimated_position(self, max_age: float = None) -> Optional[Point3D]:
+        """获取位置估计
+        
+        取最近的T:1051反馈位置；若其后又发出了移动指令，则取该指令的目标位置。
+        两者都超过max_age未更新时退回阻塞查询
+        """
+        max_age = self.config.robot.pose_max_age if max_age is None else max_age
+        with self.status_lock:
+            feedback_time = self._feedback_time
+            position = self.status.current_position
+            commanded, commanded_time = self._commanded_position, self._commanded_time
+        latest = max(feedback_time, commanded_time)
+        if latest and time.monotonic() - latest <= max_age:
+            return commanded if commanded_time > feedback_time else position
+        return self.get_current_position()
+    
+    def _record_commanded(self, position: Point3D) -> None:
+        """记录最近一次移动指令的目标位置"""
+        with self.status_lock:
+            self._commanded_position = position
+            self._commanded_time = time.monotonic()
+    
+    def get_latency_report(self) -> str:
+        """各T码命令的写入/首字节/解析延迟统计表"""
+        if not self.transport:
+            return "无通信数据"
+        return self.transport.latency.format_report()
+    
     def get_current_status(self) -> RobotStatus:
         """获取当前状态"""
         with self.status_lock:
             return self.status
     
-    def emergency_stop(self) -> None:
-        """紧急停止"""
+    def emergency_stop(self) -> Optional[Dict[str, Optional[float]]]:
+        """紧急停止
+        
+        走传输层优先通道：不排在在途轨迹或阻塞读取之后，中止轨迹执行器并取消流水线中的命令，
+        返回停止延迟统计 (ms)
+        """
         logger.warning("执行紧急停止")
         self.status.current_state = RobotState.EMERGENCY_STOP
         
+        if self.active_streamer:
+            self.active_streamer.abort()
+        if not self.transport:
+            return None
         try:
-            # 发送紧急停止命令
-            stop_command = {"T": 999}  # 假设999是紧急停止命令
-            self._send_command(stop_command)
+            latency = self.transport.emergency_stop()
         except Exception as e:
             logger.error(f"紧急停止命令发送失败: {e}")
+            return None
+        finally:
+            if self.pipeline:
+                self.pipeline.cancel_all()
+        if latency["ack_ms"] is None:
+            logger.error("紧急停止未收到确认")
+        return latency
+    
+    def clear_emergency_stop(self) -> None:
+        """解除紧急停止，恢复命令发送"""
+        if self.transport:
+            self.transport.clear_halt()
+        if self.status.current_state == RobotState.EMERGENCY_STOP:
+            self.status.current_state = RobotState.IDLE
+        logger.info("紧急停止已解除")
     
     def set_pid_parameters(self, p: float = None, i: float = None) -> bool:
         """设置PID参数"""
@@ -394,9 +776,12 @@ class ImprovedRobotController:
             p = p or self.config.robot.pid_p
             i = i or self.config.robot.pid_i
             
-            for joint_id in range(1, 7):
-                command = {"T": 108, "joint": joint_id, "p": p, "i": i}
-                self._send_command(command)
+            commands = [{"T": 108, "joint": joint_id, "p": p, "i": i} for joint_id in range(1, 7)]
+            replies = self.send_commands(commands)
+            missing = sum(reply is None for reply in replies)
+            if missing:
+                logger.error(f"PID参数设置未确认: {missing}/{len(commands)}")
+                return False
             
             logger.info(f"PID参数已设置: P={p}, I={i}")
             return True
@@ -404,12 +789,28 @@ class ImprovedRobotController:
             handle_error(ErrorType.ROBOT_CONTROL_ERROR, f"设置PID参数失败: {e}")
             return False
     
+    def home(self, set_pid: bool = True) -> bool:
+        """回零（T:100），set_pid为True时与PID设置合并为一批发送"""
+        robot = self.config.robot
+        commands = [{"T": 108, "joint": joint_id, "p": robot.pid_p, "i": robot.pid_i}
+                    for joint_id in range(1, 7)] if set_pid else []
+        commands.append({"T": 100})
+        replies = self.send_commands(commands)
+        if any(reply is None for reply in replies):
+            logger.error("回零指令未确认")
+            return False
+        with self.status_lock:
+            self._commanded_position = None
+        logger.info("机械臂回零")
+        return True
+    
     def start_logging(self) -> None:
-        """启动数据记录"""
+        """启动数据记录：订阅T:1051反馈记录位置，并由轮询线程以50Hz请求反馈"""
         if self.logging_thread and self.logging_thread.is_alive():
             return
         
         self.stop_logging_flag = False
+        self._logging_token = self.transport.subscribe(1051, self._record_feedback)
         self.logging_thread = threading.Thread(target=self._logging_worker)
         self.logging_thread.daemon = True
         self.logging_thread.start()
@@ -420,63 +821,53 @@ class ImprovedRobotController:
         self.stop_logging_flag = True
         if self.logging_thread:
             self.logging_thread.join(timeout=2)
+        if self.transport and self._logging_token is not None:
+            self.transport.unsubscribe(self._logging_token)
+            self._logging_token = None
         logger.info("数据记录已停止")
     
     def _logging_worker(self) -> None:
-        """数据记录工作线程"""
+        """数据记录轮询线程：只发送T:105请求，不等待回复（回复由读线程分发）"""
         while not self.stop_logging_flag:
             try:
-                current_pos = self.get_current_position()
-                if current_pos:
-                    timestamp = datetime.now()
-                    data_point = {
-                        'timestamp': timestamp,
-                        'x': current_pos.x,
-                        'y': current_pos.y,
-                        'z': current_pos.z,
-                        'state': self.status.current_state.value
-                    }
-                    self.position_data.append(data_point)
+                if self.transport.halted:
+                    time.sleep(0.1)  # 紧急停止期间暂停轮询
+                    continue
+                streamer = self.active_streamer
+                if streamer is not None and streamer.is_running:
+                    time.sleep(0.02)  # 轨迹流式发送期间暂停轮询，让出回传带宽
+                    continue
+                self.transport.send({"T": 105}, expect_reply=False)
                 time.sleep(0.02)  # 50Hz采样率
             except Exception as e:
                 logger.error(f"数据记录错误: {e}")
                 time.sleep(0.1)
     
+    def _record_feedback(self, data: Dict[str, Any]) -> None:
+        """记录一条位置反馈"""
+        self.position_data.append({
+            'timestamp': datetime.now(),
+            'x': data.get('x', 0),
+            'y': data.get('y', 0),
+            'z': data.get('z', 0),
+            'state': self.status.current_state.value
+        })
+    
     def start_position_monitoring(self) -> None:
-        """启动位置监控"""
-        if self.monitor_thread and self.monitor_thread.is_alive():
+        """启动位置监控（订阅T:1051反馈）"""
+        if self._monitor_token is not None:
             return
         
-        self.stop_monitoring_flag = False
-        self.monitor_thread = threading.Thread(target=self._position_monitor_worker)
-        self.monitor_thread.daemon = True
-        self.monitor_thread.start()
+        self._monitor_token = self.transport.subscribe(1051, self._update_status_from_data)
         logger.info("位置监控已启动")
     
     def stop_position_monitoring(self) -> None:
         """停止位置监控"""
-        self.stop_monitoring_flag = True
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=2)
+        if self.transport and self._monitor_token is not None:
+            self.transport.unsubscribe(self._monitor_token)
+            self._monitor_token = None
         logger.info("位置监控已停止")
     
-    def _position_monitor_worker(self) -> None:
-        """位置监控工作线程"""
-        while not self.stop_monitoring_flag:
-            try:
-                if self.ser and self.ser.in_waiting > 0:
-                    response = self.ser.readline().decode().strip()
-                    if response:
-                        try:
-                            data = json.loads(response)
-                            self._update_status_from_data(data)
-                        except json.JSONDecodeError:
-                            pass
-                time.sleep(0.01)  # 100Hz监控频率
-            except Exception as e:
-                logger.error(f"位置监控错误: {e}")
-                time.sleep(0.1)
-    
     def _update_status_from_data(self, data: Dict[str, Any]) -> None:
         """从数据更新状态"""
         with self.status_lock:
@@ -502,6 +893,7 @@ class ImprovedRobotController:
                     wrist2_load=data.get('tR', 0)
                 )
                 self.status.last_update = datetime.now()
+                self._feedback_time = time.monotonic()
     
     def save_position_data(self, filename: str = None) -> Optional[str]:
         """保存位置数据"""
@@ -553,7 +945,7 @@ if __name__ == "__main__":
             time.sleep(2)
             
             # 平滑移动
-            arm.move_to_position_smooth(200, 0, 100, steps=5)
+            arm.move_to_position_smooth(200, 0, 100)
             
             print("测试完成")
         else:
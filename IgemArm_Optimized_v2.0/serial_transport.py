@@ -0,0 +1,710 @@
+"""
+串口传输层
+由单一读线程读取并解析所有回传数据：命令回复按T码路由给等待的调用方，
+T:1051位置反馈分发给所有订阅者；写入由锁串行化
+"""
+import re
+import json
+import math
+import time
+import logging
+import threading
+import itertools
+from collections import defaultdict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 命令T码 -> 回复T码（其余命令由固件原样回显，回复T码与命令相同）
+REPLY_TYPES = {105: 1051}
+FEEDBACK_TYPE = 1051
+
+# 紧急停止帧（T:999沿用控制器中的约定）；前置换行保证即使打断了半行输出也能被单独解析
+STOP_T_CODE = 999
+EMERGENCY_STOP_FRAME = b'\n{"T":999}\n'
+
+
+class TransportHalted(Exception):
+    """紧急停止后传输层拒绝发送普通命令"""
+
+# 固定格式命令的预编译字节模板（关节角保留4位小数，远小于舵机分辨率2π/4096；坐标保留3位小数）。
+# T:102帧长决定256字节接收缓冲区内能同时在途的帧数：spd为0（固件缺省值）时省略该字段，
+# 帧长约111字节，缓冲区可容纳2帧
+_JOINT_KEYS = {"T", "base", "shoulder", "elbow", "wrist", "roll", "hand", "spd", "acc"}
+_XYZ_KEYS = {"T", "x", "y", "z", "t", "g", "spd"}
+_T102_TEMPLATE = (b'{"T":102,"base":%.4f,"shoulder":%.4f,"elbow":%.4f,"wrist":%.4f,'
+                  b'"roll":%.4f,"hand":%.4f,"spd":%g,"acc":%g}\n')
+_T102_DEFAULT_SPD_TEMPLATE = (b'{"T":102,"base":%.4f,"shoulder":%.4f,"elbow":%.4f,"wrist":%.4f,'
+                              b'"roll":%.4f,"hand":%.4f,"acc":%g}\n')
+_T104_TEMPLATE = b'{"T":104,"x":%.3f,"y":%.3f,"z":%.3f,"t":%.6f,"g":%.6f,"spd":%g}\n'
+_T105_BYTES = b'{"T":105}\n'
+
+# T:1051反馈字段（固件输出顺序），按此顺序预编译整行匹配
+FEEDBACK_FIELDS = ("x", "y", "z", "tit", "b", "s", "e", "t", "r", "g", "tB", "tS", "tE", "tT", "tR")
+_FEEDBACK_PATTERN = re.compile(
+    rb'\{"T":1051,' + b','.join(b'"' + name.encode('ascii') + rb'":([^,}]+)' for name in FEEDBACK_FIELDS) + rb'\}')
+_FIELD_GROUPS = {name: index + 1 for index, name in enumerate(FEEDBACK_FIELDS)}
+
+def encode_joint_command(base, shoulder, elbow, wrist, roll, hand, spd=0, acc=10) -> bytes:
+    """直接编码T:102关节指令"""
+    if spd == 0:
+        return _T102_DEFAULT_SPD_TEMPLATE % (base, shoulder, elbow, wrist, roll, hand, acc)
+    return _T102_TEMPLATE % (base, shoulder, elbow, wrist, roll, hand, spd, acc)
+
+
+def encode_command(command: Dict[str, Any]) -> bytes:
+    """
+    编码命令为一行字节：T:102/T:104/T:105的固定格式走字节模板，其余走json
+    """
+    t_code = command.get("T")
+    keys = command.keys()
+    try:
+        if t_code == 102 and keys == _JOINT_KEYS:
+            return encode_joint_command(command["base"], command["shoulder"], command["elbow"],
+                                        command["wrist"], command["roll"], command["hand"],
+                                        command["spd"], command["acc"])
+        if t_code == 104 and keys == _XYZ_KEYS:
+            return _T104_TEMPLATE % (command["x"], command["y"], command["z"],
+                                     command["t"], command["g"], command["spd"])
+        if t_code == 105 and len(command) == 1:
+            return _T105_BYTES
+    except TypeError:
+        pass  # 非数值字段，走通用编码
+    return (json.dumps(command) + '\n').encode('utf-8')
+
+
+def decode_feedback(line: bytes, fields=FEEDBACK_FIELDS) -> Optional[Dict[str, float]]:
+    """
+    快速解析紧凑格式的T:1051反馈行，只转换fields中的字段；
+    不是T:1051或格式不符时返回None（由调用方退回json解析）
+    """
+    match = _FEEDBACK_PATTERN.match(line)
+    if match is None:
+        return None
+    try:
+        if fields is FEEDBACK_FIELDS:
+            message = dict(zip(FEEDBACK_FIELDS, map(float, match.groups())))
+        else:
+            message = {name: float(match.group(_FIELD_GROUPS[name])) for name in fields}
+    except ValueError:
+        return None
+    message["T"] = FEEDBACK_TYPE
+    return message
+
+class LatencyHistogram:
+    """HDR风格的对数-线性分桶延迟直方图
+
+    以微秒记录，每个2的幂区间分SUB_BUCKETS个线性子桶，相对误差约 1/SUB_BUCKETS；
+    记录只做一次列表元素自增，不加锁（多线程同时记录时极少数计数可能丢失，统计上可忽略）
+    """
+
+    SUB_BUCKETS = 16
+    MAX_US = 60_000_000
+
+    def __init__(self):
+        self.counts = [0] * (self._index(self.MAX_US) + 1)
+        self.total_us = 0
+        self.max_us = 0
+
+    @classmethod
+    def _index(cls, us: int) -> int:
+        if us < cls.SUB_BUCKETS:
+            return us
+        shift = us.bit_length() - cls.SUB_BUCKETS.bit_length()
+        return shift * cls.SUB_BUCKETS + (us >> shift)
+
+    @classmethod
+    def _bucket_value(cls, index: int) -> float:
+        """桶的代表值（中点，微秒）"""
+        if index < 2 * cls.SUB_BUCKETS:
+            return float(index)
+        shift, mantissa = divmod(index, cls.SUB_BUCKETS)
+        shift -= 1
+        mantissa += cls.SUB_BUCKETS
+        return ((mantissa << shift) + ((1 << shift) - 1) / 2)
+
+    def record(self, seconds: float) -> None:
+        """记录一次耗时（秒）"""
+        us = min(max(int(seconds * 1e6), 0), self.MAX_US)
+        self.counts[self._index(us)] += 1
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def percentile(self, p: float) -> float:
+        """百分位数 (ms)"""
+        counts = list(self.counts)
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        rank = max(1, math.ceil(total * p / 100))
+        seen = 0
+        for index, n in enumerate(counts):
+            seen += n
+            if seen >= rank:
+                return min(self._bucket_value(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> Dict[str, float]:
+        """计数、均值和p50/p90/p99/最大值 (ms)"""
+        count = self.count
+        return {
+            "count": count,
+            "mean_ms": self.total_us / count / 1000 if count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_us / 1000
+        }
+
+
+class LatencyRecorder:
+    """按 (阶段, T码) 分组的延迟直方图
+
+    阶段: write 写入耗时；first_byte 写入完成到回复首字节到达；parse 回传行解析耗时（按回传T码）
+    """
+
+    STAGES = ("write", "first_byte", "parse")
+
+    def __init__(self):
+        self.histograms: Dict[tuple, LatencyHistogram] = {}
+
+    def record(self, stage: str, t_code: Any, seconds: float) -> None:
+        histogram = self.histograms.get((stage, t_code))
+        if histogram is None:
+            histogram = self.histograms.setdefault((stage, t_code), LatencyHistogram())
+        histogram.record(seconds)
+
+    def summary(self) -> Dict[Any, Dict[str, Dict[str, float]]]:
+        """{T码: {阶段: 统计}}"""
+        result: Dict[Any, Dict[str, Dict[str, float]]] = {}
+        for (stage, t_code), histogram in sorted(self.histograms.items(), key=lambda item: str(item[0][1])):
+            result.setdefault(t_code, {})[stage] = histogram.summary()
+        return result
+
+    def format_report(self) -> str:
+        """文本表格（CLI/GUI显示用）"""
+        lines = [f"{'T':>5} {'阶段':<10} {'次数':>7} {'p50':>8} {'p99':>8} {'max':>8} (ms)"]
+        for t_code, stages in self.summary().items():
+            for stage in self.STAGES:
+                if stage in stages:
+                    s = stages[stage]
+                    lines.append(f"{t_code!s:>5} {stage:<10} {s['count']:>7} {s['p50_ms']:>8.2f} "
+                                 f"{s['p99_ms']:>8.2f} {s['max_ms']:>8.2f}")
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        self.histograms = {}
+
+
+class SerialTransport:
+    """单读线程串口传输
+
+    发送命令时先登记等待回复的Future再写入，读线程收到回复后按T码交给最早的等待者；
+    T:1051是状态快照，同时满足所有等待中的T:105请求，并分发给订阅者。
+    订阅回调在读线程中执行，应尽快返回。
+    """
+
+    def __init__(self, ser, reply_timeout: float = 1.0):
+        self.ser = ser
+        self.reply_timeout = reply_timeout
+        self._write_lock = threading.Lock()
+        self._pending: Dict[Any, deque] = defaultdict(deque)
+        self._pending_lock = threading.Lock()
+        self._subscribers: Dict[Any, Dict[int, Callable[[Dict[str, Any]], None]]] = defaultdict(dict)
+        self._tokens = itertools.count(1)
+        self._reader: Optional[threading.Thread] = None
+        self._running = False
+        self._halted = threading.Event()
+        self.latency = LatencyRecorder()
+        self.stats = {"lines": 0, "unparsed": 0, "unmatched": 0}
+
+    @property
+    def is_running(self) -> bool:
+        return self._running and self._reader is not None and self._reader.is_alive()
+
+    @property
+    def halted(self) -> bool:
+        return self._halted.is_set()
+
+    def start(self) -> None:
+        """启动读线程"""
+        if self.is_running:
+            return
+        self._running = True
+        self._reader = threading.Thread(target=self._reader_loop, name="serial-reader", daemon=True)
+        self._reader.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """停止读线程并取消所有等待中的请求"""
+        self._running = False
+        if self._reader and self._reader is not threading.current_thread():
+            self._reader.join(timeout=timeout)
+        with self._pending_lock:
+            futures = [future for waiters in self._pending.values() for future in waiters]
+            self._pending.clear()
+        # 在锁外取消，Future回调可能再次调用传输层
+        for future in futures:
+            future.cancel()
+
+    def subscribe(self, t_code: Optional[int], callback: Callable[[Dict[str, Any]], None]) -> int:
+        """订阅指定T码的消息（t_code为None时订阅全部），返回取消订阅用的令牌"""
+        token = next(self._tokens)
+        self._subscribers[t_code][token] = callback
+        return token
+
+    def unsubscribe(self, token: int) -> None:
+        """取消订阅"""
+        for callbacks in self._subscribers.values():
+            callbacks.pop(token, None)
+
+    def write(self, data: bytes) -> None:
+        """写入原始字节"""
+        with self._write_lock:
+            # 在锁内检查：等锁期间可能已紧急停止
+            if self._halted.is_set():
+                raise TransportHalted("已紧急停止")
+            self.ser.write(data)
+
+    def emergency_stop(self, frame: bytes = EMERGENCY_STOP_FRAME,
+                       ack_timeout: float = 0.5) -> Dict[str, Optional[float]]:
+        """
+        紧急停止优先通道
+
+        立即拒绝后续普通命令，丢弃串口输出缓冲区中尚未发出的数据，不经过写锁直接写入停止帧，
+        然后取消所有等待中的回复。返回延迟统计 (ms)：write_ms为调用到停止帧写入完成，
+        ack_ms为调用到收到停止帧回显（超时为None）
+        """
+        start = time.perf_counter()
+        self._halted.set()
+        ack = Future()
+        with self._pending_lock:
+            self._pending[STOP_T_CODE].appendleft(ack)
+        try:
+            self.ser.reset_output_buffer()
+        except Exception as e:
+            logger.debug(f"清空输出缓冲区失败: {e}")
+        self.ser.write(frame)
+        written = time.perf_counter()
+
+        # 停止帧写出后再取消其余等待者（其回调可能阻塞）
+        with self._pending_lock:
+            futures = [future for t_code, waiters in self._pending.items() if t_code != STOP_T_CODE
+                       for future in waiters]
+            for t_code in [t_code for t_code in self._pending if t_code != STOP_T_CODE]:
+                del self._pending[t_code]
+        for future in futures:
+            future.cancel()
+
+        try:
+            ack.result(timeout=ack_timeout)
+            acked = (time.perf_counter() - start) * 1000
+        except FutureTimeout:
+            ack.cancel()
+            acked = None
+        latency = {"write_ms": (written - start) * 1000, "ack_ms": acked}
+        logger.warning(f"紧急停止已发送: {latency}")
+        return latency
+
+    def clear_halt(self) -> None:
+        """解除紧急停止，恢复普通命令发送"""
+        self._halted.clear()
+
+    def send(self, command: Dict[str, Any], expect_reply: bool = True,
+             data: bytes = None) -> Optional[Future]:
+        """
+        发送命令；expect_reply为True时返回在收到回复时完成的Future
+        data为已编码的命令字节（省略时由encode_command编码）
+        """
+        if self._halted.is_set():
+            raise TransportHalted("已紧急停止")
+        t_code = command.get("T")
+        future = None
+        start = time.perf_counter()
+        if expect_reply:
+            future = Future()
+            future.t_code = t_code
+            # 写入完成前到达的回复按写入开始时刻计
+            future.sent_at = start
+            expected = REPLY_TYPES.get(t_code, t_code)
+            # 先登记再写入，避免回复先于登记到达
+            with self._pending_lock:
+                self._pending[expected].append(future)
+        try:
+            self.write(data if data is not None else encode_command(command))
+            sent_at = time.perf_counter()
+        except Exception as e:
+            if future is not None:
+                future.set_exception(e)
+            raise
+        self.latency.record("write", t_code, sent_at - start)
+        if future is not None:
+            future.sent_at = sent_at
+        return future
+
+    def send_batch(self, commands: List[Dict[str, Any]], data: List[bytes] = None) -> List[Future]:
+        """
+        一次写入多条命令（合并为单次write），返回各命令的回复Future；
+        data为对应的已编码字节（省略时由encode_command编码）
+        """
+        if data is None:
+            data = [encode_command(command) for command in commands]
+        if self._halted.is_set():
+            raise TransportHalted("已紧急停止")
+        futures = [Future() for _ in commands]
+        start = time.perf_counter()
+        for command, future in zip(commands, futures):
+            future.t_code = command.get("T")
+            future.sent_at = start
+        # 持写锁登记并写入，保证回复登记顺序与写入顺序一致
+        with self._write_lock:
+            if self._halted.is_set():
+                raise TransportHalted("已紧急停止")
+            with self._pending_lock:
+                for command, future in zip(commands, futures):
+                    self._pending[REPLY_TYPES.get(command.get("T"), command.get("T"))].append(future)
+            try:
+                write_start = time.perf_counter()
+                self.ser.write(b''.join(data))
+                sent_at = time.perf_counter()
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                raise
+        for future in futures:
+            future.sent_at = sent_at
+            self.latency.record("write", future.t_code, sent_at - write_start)
+        return futures
+
+    def request(self, command: Dict[str, Any], timeout: float = None) -> Optional[Dict[str, Any]]:
+        """发送命令并等待回复，超时返回None"""
+        future = self.send(command)
+        try:
+            return future.result(timeout=self.reply_timeout if timeout is None else timeout)
+        except FutureTimeout:
+            future.cancel()
+            logger.debug(f"等待回复超时: {command}")
+            return None
+
+    def _reader_loop(self) -> None:
+        """读线程：按行切分、解析并分发"""
+        buffer = b''
+        line_start = None  # 当前未完成行首字节的到达时刻
+        while self._running:
+            try:
+                chunk = self.ser.read(self.ser.in_waiting or 1)
+            except Exception as e:
+                if self._running:
+                    logger.error(f"串口读取失败: {e}")
+                break
+            if not chunk:
+                continue
+            arrived = time.perf_counter()
+            if not buffer:
+                line_start = arrived
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                self._handle_line(line, line_start)
+                line_start = arrived
+        self._running = False
+
+    def _handle_line(self, line: bytes, line_start: float = None) -> None:
+        """解析一行回传数据并分发，line_start为该行首字节到达时刻"""
+        line = line.strip()
+        if not line:
+            return
+        self.stats["lines"] += 1
+        start = time.perf_counter()
+        message = decode_feedback(line)
+        if message is None:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                self.stats["unparsed"] += 1
+                logger.debug(f"无法解析的回传数据: {line!r}")
+                return
+            if not isinstance(message, dict):
+                return
+        self.latency.record("parse", message.get("T"), time.perf_counter() - start)
+        self._dispatch(message, line_start)
+
+    def _dispatch(self, message: Dict[str, Any], line_start: float = None) -> None:
+        """将消息交给等待者和订阅者"""
+        t_code = message.get("T")
+        with self._pending_lock:
+            waiters = self._pending.get(t_code)
+            if t_code == FEEDBACK_TYPE:
+                # 状态快照满足所有等待中的查询
+                ready = list(waiters) if waiters else []
+                if waiters:
+                    waiters.clear()
+            else:
+                ready = []
+                while waiters:
+                    future = waiters.popleft()
+                    if not future.done():
+                        ready.append(future)
+                        break
+
+        matched = False
+        for future in ready:
+            if not future.done():
+                sent_at = getattr(future, "sent_at", None)
+                if line_start is not None and sent_at is not None:
+                    self.latency.record("first_byte", future.t_code, line_start - sent_at)
+                try:
+                    future.set_result(message)
+                    matched = True
+                except Exception:
+                    pass
+
+        callbacks = list(self._subscribers.get(t_code, {}).values()) + list(self._subscribers.get(None, {}).values())
+        for callback in callbacks:
+            try:
+                callback(message)
+            except Exception as e:
+                logger.error(f"回传数据处理失败: {e}")
+
+        if not matched and not callbacks:
+            self.stats["unmatched"] += 1
+
+
+def wait_until_arrived(transport: SerialTransport, target_joints, tolerance: float = 0.01,
+                       settle: float = 0.1, timeout: float = 5.0,
+                       still_tolerance: float = 0.01, poll_interval: float = 0.02) -> bool:
+    """
+    根据T:1051反馈的关节角等待机械臂到位
+
+    target_joints为指令中的关节角 (base, shoulder, elbow[, wrist])，与反馈的b/s/e/t逐一比较，
+    不依赖固件末端坐标与本地运动学坐标系是否一致。各关节误差不超过tolerance(rad)、
+    且相邻两次反馈的关节角变化不超过still_tolerance(rad)的状态持续settle秒即视为到位；
+    期间以poll_interval发送T:105查询。返回是否在timeout秒内到位，紧急停止时返回False
+    """
+    target = tuple(float(v) for v in target_joints)
+    keys = ('b', 's', 'e', 't')[:len(target)]
+    state = {"since": None, "joints": None}
+    arrived = threading.Event()
+
+    def on_feedback(data):
+        try:
+            joints = tuple(data[key] for key in keys)
+        except KeyError:
+            return
+        last = state["joints"]
+        still = last is None or max(abs(a - b) for a, b in zip(joints, last)) <= still_tolerance
+        state["joints"] = joints
+        if max(abs(a - b) for a, b in zip(joints, target)) <= tolerance and still:
+            now = time.monotonic()
+            if state["since"] is None:
+                state["since"] = now
+            if now - state["since"] >= settle:
+                arrived.set()
+        else:
+            state["since"] = None
+
+    token = transport.subscribe(FEEDBACK_TYPE, on_feedback)
+    try:
+        end = time.monotonic() + timeout
+        while not arrived.is_set():
+            remaining = end - time.monotonic()
+            if remaining <= 0 or transport.halted:
+                return False
+            try:
+                transport.send({"T": 105}, expect_reply=False)
+            except TransportHalted:
+                return False  # 检查halted之后、发送之前触发了紧急停止
+            arrived.wait(min(poll_interval, remaining))
+        return True
+    finally:
+        transport.unsubscribe(token)
+
+
+class CommandPipeline:
+    """窗口流控的命令流水线
+
+    命令写入后不等待回显即可继续发送，同时在途（已写入未确认）的命令数不超过window、
+    字节数不超过固件接收缓冲区 buffer_bytes；窗口满时submit阻塞直到有命令被确认（背压）。
+    超过ack_timeout仍未确认的命令视为丢失并取消，释放其占用的窗口；drain据此报告上次drain以来是否有命令丢失。
+    submit返回concurrent.futures.Future，异步代码可用 asyncio.wrap_future 等待。
+    """
+
+    def __init__(self, transport: SerialTransport, window: int = 8,
+                 buffer_bytes: int = 256, ack_timeout: float = 1.0):
+        self.transport = transport
+        self.window = max(1, int(window))
+        self.buffer_bytes = int(buffer_bytes)
+        self.ack_timeout = ack_timeout
+        self._cond = threading.Condition(threading.RLock())
+        self._in_flight: deque = deque()  # (确认期限, Future)
+        self._count = 0
+        self._bytes = 0
+        self._lost = 0  # 上次drain以来超时、取消或失败的命令数
+        self.stats = {"sent": 0, "acked": 0, "timeouts": 0, "failed": 0, "stalls": 0, "batches": 0}
+
+    @property
+    def in_flight(self) -> int:
+        """在途命令数"""
+        return self._count
+
+    def _has_room(self, size: int, count: int = None, used: int = None) -> bool:
+        count = self._count if count is None else count
+        used = self._bytes if used is None else used
+        if count == 0:
+            return True  # 单条超过缓冲区的命令也允许在空闲时发送
+        return count < self.window and (self.buffer_bytes <= 0 or used + size <= self.buffer_bytes)
+
+    def _wait_for_room(self, size: int) -> None:
+        """窗口已满时阻塞直到能容纳size字节的命令（需持有锁）"""
+        self._expire()
+        if not self._has_room(size):
+            self.stats["stalls"] += 1
+            while not self._has_room(size):
+                wait = self._in_flight[0][0] - time.monotonic() if self._in_flight else self.ack_timeout
+                self._cond.wait(timeout=max(wait, 0.001))
+                self._expire()
+
+    def _track(self, future: Future, size: int) -> None:
+        """登记在途命令（需持有锁）"""
+        self._in_flight.append((time.monotonic() + self.ack_timeout, future))
+        self._count += 1
+        self._bytes += size
+        self.stats["sent"] += 1
+
+    def _expire(self) -> None:
+        """清理已完成的命令并取消超时未确认的命令（需持有锁）"""
+        now = time.monotonic()
+        while self._in_flight:
+            deadline, future = self._in_flight[0]
+            if not future.done():
+                if deadline > now:
+                    break
+                if future.cancel():
+                    self.stats["timeouts"] += 1
+                    logger.warning("命令确认超时，视为丢失")
+            self._in_flight.popleft()
+
+    def _on_done(self, size: int, future: Future) -> None:
+        """命令确认（或取消/失败）后释放窗口"""
+        with self._cond:
+            self._count -= 1
+            self._bytes -= size
+            if future.cancelled():
+                self._lost += 1
+            elif future.exception() is None:
+                self.stats["acked"] += 1
+            else:
+                self.stats["failed"] += 1
+                self._lost += 1
+            self._cond.notify_all()
+
+    def submit(self, command: Dict[str, Any]) -> Future:
+        """提交命令，返回收到确认时完成的Future；窗口已满时阻塞"""
+        data = encode_command(command)
+        size = len(data)
+        with self._cond:
+            self._wait_for_room(size)
+            # 持锁写入，保证写入顺序与提交顺序一致
+            future = self.transport.send(command, data=data)
+            self._track(future, size)
+        future.add_done_callback(lambda f: self._on_done(size, f))
+        return future
+
+    def submit_many(self, commands: Iterable[Dict[str, Any]]) -> List[Future]:
+        """按顺序逐条提交一组命令，返回各命令的Future"""
+        return [self.submit(command) for command in commands]
+
+    def submit_batch(self, commands: Iterable[Dict[str, Any]]) -> List[Future]:
+        """
+        批量提交：把窗口和缓冲区当前能容纳的连续多条命令合并为一次写入，
+        容纳不下的部分等待确认后继续，返回各命令的Future
+        """
+        commands = list(commands)
+        data = [encode_command(command) for command in commands]
+        futures: List[Future] = []
+        start = 0
+        while start < len(commands):
+            with self._cond:
+                self._wait_for_room(len(data[start]))
+                # 在当前余量内尽量多取
+                end, count, used = start, self._count, self._bytes
+                while end < len(commands) and (end == start or self._has_room(len(data[end]), count, used)):
+                    count += 1
+                    used += len(data[end])
+                    end += 1
+                chunk = self.transport.send_batch(commands[start:end], data[start:end])
+                for future, item in zip(chunk, data[start:end]):
+                    self._track(future, len(item))
+                self.stats["batches"] += 1
+            for future, item in zip(chunk, data[start:end]):
+                future.add_done_callback(lambda f, size=len(item): self._on_done(size, f))
+            futures.extend(chunk)
+            start = end
+        return futures
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待所有在途命令确认或超时，返回上次drain以来提交的命令是否全部确认：
+        timeout内未结束，或有命令超时、被取消、失败时返回False
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._count > 0:
+                self._expire()
+                if self._count == 0:
+                    break
+                wait = self._in_flight[0][0] - time.monotonic() if self._in_flight else self.ack_timeout
+                if end is not None:
+                    remaining = end - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                self._cond.wait(timeout=max(wait, 0.001))
+            lost, self._lost = self._lost, 0
+            if lost:
+                logger.warning(f"{lost} 条命令未确认")
+            return lost == 0
+
+    def cancel_all(self) -> int:
+        """取消所有在途命令，返回取消的数量"""
+        with self._cond:
+            futures = [future for _, future in self._in_flight]
+            self._in_flight.clear()
+        return sum(future.cancel() for future in futures)
+
+
+def gather_replies(futures: List[Future], timeout: Optional[float] = None) -> List[Optional[Dict[str, Any]]]:
+    """批量等待一组回复，返回与futures对应的回复列表（超时、取消或失败的为None）"""
+    wait(futures, timeout=timeout)
+    return [future.result() if future.done() and not future.cancelled() and future.exception() is None
+            else None for future in futures]
+
+
+if __name__ == '__main__':
+    # 编解码基准：通用json路径 vs 字节模板/快速解析
+    import timeit
+    command = {"T": 102, "base": 0.123456789, "shoulder": 0.35, "elbow": 1.234567, "wrist": 1.45,
+               "roll": -1.4478, "hand": 3.14, "spd": 0, "acc": 10}
+    feedback = (b'{"T":1051,"x":175.0123,"y":-12.5,"z":75.25,"tit":1.57,"b":-0.0712,"s":0.1034,'
+                b'"e":1.4123,"t":1.5708,"r":-1.642,"g":3.14,"tB":12,"tS":-48,"tE":96,"tT":4,"tR":0}')
+    assert encode_command(command) == (b'{"T":102,"base":0.1235,"shoulder":0.3500,"elbow":1.2346,'
+                                       b'"wrist":1.4500,"roll":-1.4478,"hand":3.1400,"acc":10}\n')
+    assert json.loads(encode_command({**command, "spd": 5})).keys() == command.keys()
+    assert decode_feedback(feedback) == {k: float(v) for k, v in json.loads(feedback).items()
+                                         if k in FEEDBACK_FIELDS or k == "T"}
+    n = 100000
+    cases = [
+        ("编码T:102", lambda: (json.dumps(command) + '\n').encode('utf-8'), lambda: encode_command(command)),
+        ("编码T:105", lambda: (json.dumps({"T": 105}) + '\n').encode('utf-8'), lambda: encode_command({"T": 105})),
+        ("解析T:1051", lambda: json.loads(feedback), lambda: decode_feedback(feedback)),
+        ("解析T:1051(仅xyz)", lambda: json.loads(feedback), lambda: decode_feedback(feedback, ("x", "y", "z"))),
+    ]
+    for name, baseline, fast in cases:
+        t_base = timeit.timeit(baseline, number=n) / n * 1e6
+        t_fast = timeit.timeit(fast, number=n) / n * 1e6
+        print(f"{name}: json {t_base:.2f}us, 快速路径 {t_fast:.2f}us ({t_base / t_fast:.1f}x)")
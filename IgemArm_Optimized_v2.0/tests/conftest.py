@@ -0,0 +1,30 @@
+"""
+测试公共夹具：串口相关测试在伪终端模拟器（roarm_simulator）上运行，不需要真实机械臂
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+# 配置文件、日志和./data缓存都相对当前目录，测试在临时目录中运行，使用默认配置且不改动项目文件
+_original_cwd = os.getcwd()
+os.chdir(tempfile.mkdtemp(prefix="roarm_tests_"))
+
+
+def pytest_unconfigure(config):
+    os.chdir(_original_cwd)
+
+
+@pytest.fixture(scope="module")
+def sim():
+    """启动模拟器，模块内的测试共用"""
+    pytest.importorskip("tty")  # 伪终端仅在POSIX系统上可用
+    from roarm_simulator import RoArmSimulator
+
+    with RoArmSimulator(latency=0.002, jitter=0.0005, seed=0) as simulator:
+        yield simulator
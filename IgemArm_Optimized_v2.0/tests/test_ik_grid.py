@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pytest
+
+from countbyhand import calculate_all_angles_batch
+from ik_grid import IKLookupGrid
+
+BOUNDS = {'x': (100, 200), 'y': (-50, 50), 'z': (60, 120)}
+
+
+@pytest.fixture
+def grid(tmp_path):
+    return IKLookupGrid(BOUNDS, resolution=5.0, cache_dir=str(tmp_path), tolerance=0.005).load_or_build()
+
+
+def sample_points(count=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform([100, -50, 60], [200, 50, 120], size=(count, 3))
+
+
+def test_lookup_within_tolerance_on_usable_cells(grid):
+    points = sample_points()
+    approx, valid = grid.lookup(points)
+    exact, exact_valid = calculate_all_angles_batch(points)
+    assert valid.mean() > 0.9
+    assert np.all(exact_valid[valid])
+    assert np.max(np.abs(approx[valid] - exact[valid])) <= grid.tolerance
+
+
+def test_solve_falls_back_to_analytic_outside_grid(grid):
+    points = np.array([[250.0, 0.0, 90.0], [600.0, 0.0, 90.0]])
+    angles, valid = grid.solve(points)
+    exact, exact_valid = calculate_all_angles_batch(points)
+    assert valid.tolist() == exact_valid.tolist() == [True, False]
+    assert np.allclose(angles[0], exact[0])
+
+
+def test_cache_is_one_complete_directory(grid, tmp_path):
+    assert os.listdir(tmp_path) == [os.path.basename(grid.cache_path)]
+    assert sorted(os.listdir(grid.cache_path)) == ['cells.npy', 'grid.npy', 'meta.json']
+
+
+def test_reload_maps_cache_without_rebuilding(grid, monkeypatch):
+    monkeypatch.setattr(IKLookupGrid, "build", lambda self: pytest.fail("缓存存在时不应重新计算"))
+    reloaded = IKLookupGrid(BOUNDS, resolution=5.0, cache_dir=grid.cache_dir, tolerance=0.005).load_or_build()
+    assert isinstance(reloaded.grid, np.memmap)
+    assert np.array_equal(reloaded.cell_ok, grid.cell_ok)
+    assert reloaded.max_error == grid.max_error
@@ -0,0 +1,43 @@
+import numpy as np
+
+from reachability import (NEAR_SINGULAR, REACHABLE, ReachabilityMap,
+                          segment_min_link_sine, segment_reachable_mask)
+
+BOUNDS = {'x': (-200, 400), 'y': (-200, 200), 'z': (50, 300)}
+
+
+def random_segments(count=300, seed=0):
+    rng = np.random.default_rng(seed)
+    lower = [BOUNDS[axis][0] for axis in 'xyz']
+    upper = [BOUNDS[axis][1] for axis in 'xyz']
+    return rng.uniform(lower, upper, size=(count, 3)), rng.uniform(lower, upper, size=(count, 3))
+
+
+def test_segment_through_folded_arm_is_rejected():
+    # 两端可达，但线段中点处手臂接近完全折叠
+    start, end = np.array([[80.0, -80.0, 50.0]]), np.array([[80.0, 80.0, 50.0]])
+    exact = ReachabilityMap(BOUNDS).classify_exact(np.vstack((start, end)))
+    assert np.all(exact == REACHABLE)
+    assert segment_min_link_sine(start, end)[0] < 0.1
+    assert not segment_reachable_mask(start, end, BOUNDS, 20.0, 0.1)[0]
+    assert segment_reachable_mask(start, end, BOUNDS, 20.0, 0.0)[0]
+
+
+def test_accepted_segments_are_reachable_everywhere():
+    starts, ends = random_segments()
+    mask = segment_reachable_mask(starts, ends, BOUNDS, 20.0, 0.1)
+    assert mask.any()
+    reach = ReachabilityMap(BOUNDS, singularity_threshold=0.1, axis_margin=20.0)
+    t = np.linspace(0.0, 1.0, 200)[:, None]
+    for start, end in zip(starts[mask], ends[mask]):
+        assert np.all(reach.classify_exact(start + t * (end - start)) == REACHABLE)
+
+
+def test_voxel_lookup_is_conservative(tmp_path):
+    bounds = {'x': (50, 250), 'y': (-100, 100), 'z': (50, 150)}
+    reach = ReachabilityMap(bounds, resolution=10.0, cache_dir=str(tmp_path)).load_or_build()
+    rng = np.random.default_rng(0)
+    points = rng.uniform([50, -100, 50], [250, 100, 150], size=(20000, 3))
+    exact = reach.classify_exact(points)
+    assert np.all(exact[reach.is_reachable(points)] == REACHABLE)
+    assert np.all(exact[reach.is_reachable(points, allow_singular=True)] >= NEAR_SINGULAR)
@@ -0,0 +1,64 @@
+"""ImprovedRobotController在模拟器上的平滑移动、确认、紧急停止和重连"""
+import time
+
+import pytest
+
+HOME = (175, 0, 100)
+TARGET = (200, 60, 60)
+
+
+@pytest.fixture(scope="module")
+def arm(sim):
+    from robot_controller_improved import ImprovedRobotController
+
+    arm = ImprovedRobotController(port=sim.port)
+    assert arm.is_connected
+    yield arm
+    arm.disconnect()
+
+
+@pytest.fixture
+def home(arm):
+    """每个测试从同一位置开始，结束后解除紧急停止"""
+    arm.clear_emergency_stop()
+    assert arm.move_to_position(*HOME)
+    assert arm.wait_until_arrived(*HOME)
+    yield HOME
+    arm.clear_emergency_stop()
+
+
+def drop_joint_echoes(sim, monkeypatch):
+    transmit = sim._transmit
+    monkeypatch.setattr(sim, "_transmit", lambda data: None if data.startswith(b'{"T":102') else transmit(data))
+
+
+def test_smooth_move_streams_every_setpoint(arm, home):
+    assert arm.move_to_position_smooth(*TARGET)
+    assert arm.active_streamer.skipped == 0
+
+
+def test_smooth_move_fails_when_setpoints_are_skipped(arm, home, monkeypatch):
+    send = arm.transport.send
+    monkeypatch.setattr(arm.transport, "send", lambda *args, **kwargs: (time.sleep(0.045), send(*args, **kwargs))[1])
+    assert not arm.move_to_position_smooth(*TARGET)
+    assert arm.active_streamer.skip_fraction > arm.config.robot.stream_max_skip_fraction
+
+
+def test_smooth_move_fails_when_setpoints_are_not_acknowledged(sim, arm, home, monkeypatch):
+    drop_joint_echoes(sim, monkeypatch)
+    assert not arm.move_to_position_smooth(*TARGET)
+
+
+def test_emergency_stop_halts_motion(sim, arm, home):
+    assert arm.move_to_position(250, -80, 60)
+    time.sleep(0.1)
+    latency = arm.emergency_stop()
+    assert latency["ack_ms"] is not None
+    assert not sim.is_moving()
+    assert not arm.move_to_position(*HOME)  # 解除前不再发送运动命令
+
+
+def test_reconnect_restores_motion(arm, home):
+    assert arm.connect()
+    assert arm.move_to_position(*TARGET)
+    assert arm.wait_until_arrived(*TARGET)
@@ -42,14 +42,24 @@ def control_by_GUI(position,mm_eqal_pixel,resultpath):
     WC.process_shape(
         input_file="transformedresult,csv",
         output_file="circle_intersections.csv",
-        radius_step=5  # 半径检测步长（单位：坐标单位）
+        radius_step=5,  # 半径检测步长（单位：坐标单位）
+        use_two_opt=True  # 排序后再做2-opt优化，减少空行程
     )
     pointlists=read_coordinates_csv("circle_intersections.csv")
+    if not pointlists:
+        print("没有找到治疗路径点")
+        return
+    # 发送前校验整条路径
+    targets=np.column_stack((np.array(pointlists)+(60,0),np.full(len(pointlists),80)))
+    errors,ok=CO.verify_ik_roundtrip(targets)
+    if not ok.all():
+        print(f"路径校验失败：{int((~ok).sum())} 个点不可达")
+        return
     # 连接串口
     arm=control.RoArmControl()
     arm.setPID(P=8,I=0)
     arm.move_to_position(position['x'],position['y'],position['z'])
-    time.sleep(1)
+    arm.wait_until_arrived(position['x'],position['y'],position['z'])
     lastx=pointlists[0][0]
     lasty=pointlists[0][1]  
     for point in pointlists:
@@ -59,7 +69,7 @@ def control_by_GUI(position,mm_eqal_pixel,resultpath):
         x=point[0]+60  #####摄像头偏移矫正
         y=point[1] #####摄像头偏移矫正
         arm.move_to_position(x,y,80)   ####喷嘴高度矫正
-        time.sleep(distance/50)
+        arm.wait_until_arrived(x,y,80,timeout=max(3*distance/50,1.0))
     arm.close()
 
 
@@ -85,7 +95,7 @@ if __name__ == "__main__":
     arm=control.RoArmControl()
     arm.setPID(P=8,I=0)
     arm.move_to_position(175,0,75)
-    time.sleep(1)
+    arm.wait_until_arrived(175,0,75)
     lastx=pointlists[0][0]
     lasty=pointlists[0][1]
     for point in pointlists:
@@ -93,7 +103,7 @@ if __name__ == "__main__":
         x=point[0]
         y=point[1]
         arm.move_to_position(x,y,75)
-        time.sleep(distance/20)
+        arm.wait_until_arrived(x,y,75,timeout=max(3*distance/20,1.0))
         lastx=x
         lasty=y
     arm.close()
@@ -0,0 +1,126 @@
+import math
+import numpy as np
+
+from coverage import points_in_polygon
+
+
+def polygon_centroid(points):
+    """多边形面积质心（面积为0时退化为顶点平均）"""
+    p = np.asarray(points, dtype=float).reshape(-1, 2)
+    q = np.roll(p, -1, axis=0)
+    cross = p[:, 0] * q[:, 1] - q[:, 0] * p[:, 1]
+    area = cross.sum() / 2
+    if abs(area) < 1e-12:
+        return p.mean(axis=0)
+    return np.array([((p[:, 0] + q[:, 0]) * cross).sum(),
+                     ((p[:, 1] + q[:, 1]) * cross).sum()]) / (6 * area)
+
+
+def resample_by_arc_length(xy, spacing):
+    """按等弧长间距重采样折线，保留首尾点"""
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    if len(xy) < 2:
+        return xy
+    s = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))))
+    if s[-1] == 0:
+        return xy[:1]
+    count = max(int(math.ceil(s[-1] / spacing)), 1) + 1
+    target = np.linspace(0.0, s[-1], count)
+    return np.column_stack((np.interp(target, s, xy[:, 0]), np.interp(target, s, xy[:, 1])))
+
+
+def archimedean_spiral(center, max_radius, pitch, spacing):
+    """从中心向外的阿基米德螺线 r = pitch·θ/2π，按弧长近似均匀采样"""
+    turns = max_radius / pitch
+    theta_end = 2 * math.pi * turns
+    # 先按较细的角度步长采样，再做弧长重采样
+    fine = max(spacing / 4, 1e-3)
+    theta = [0.0]
+    while theta[-1] < theta_end:
+        r = pitch * theta[-1] / (2 * math.pi)
+        theta.append(theta[-1] + fine / max(r, pitch / (2 * math.pi)))
+    theta = np.minimum(np.array(theta), theta_end)
+    r = pitch * theta / (2 * math.pi)
+    xy = np.column_stack((center[0] + r * np.cos(theta), center[1] + r * np.sin(theta)))
+    return resample_by_arc_length(xy, spacing)
+
+
+def contour_parallel_spiral(polygon, pitch, spacing, center=None):
+    """
+    沿轮廓形状由外向内收缩的连续螺线（轮廓平行路径）
+
+    每圈沿轮廓一周，同时按到中心的比例向内收缩；相邻圈在最远顶点方向的间距为pitch。
+    对以中心为星形的轮廓，路径完全位于轮廓内
+    """
+    p = np.asarray(polygon, dtype=float).reshape(-1, 2)
+    center = polygon_centroid(p) if center is None else np.asarray(center, dtype=float)
+    boundary = resample_by_arc_length(np.vstack((p, p[:1])), spacing / 2)[:-1]
+    max_radius = np.hypot(*(p - center).T).max()
+    laps = max(int(math.ceil(max_radius / pitch)), 1)
+
+    # 参数u∈[0, laps)，整数部分为圈数，小数部分为沿轮廓的位置
+    u = np.arange(laps * len(boundary)) / len(boundary)
+    shrink = 1.0 - (u / laps)
+    outline = boundary[np.arange(len(u)) % len(boundary)]
+    xy = center + shrink[:, None] * (outline - center)
+    return resample_by_arc_length(np.vstack((xy, center)), spacing)
+
+
+def clip_to_polygon(xy, polygon, min_points=2):
+    """将路径裁剪到多边形内，返回连续段列表（各段为 (M, 2) 数组）"""
+    inside = points_in_polygon(xy, polygon)
+    # 以进出多边形处为界拆分
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], inside.astype(np.int8), [0]))))
+    segments = [xy[start:stop] for start, stop in zip(edges[::2], edges[1::2])]
+    return [segment for segment in segments if len(segment) >= min_points]
+
+
+def iter_spiral_path(polygon, pitch=5.0, spacing=1.0, mode='contour', inward_margin=0.0):
+    """
+    连续治疗路径生成器，逐段产出等弧长间距的稠密路径
+
+    参数:
+        polygon: (N, 2) 伤口轮廓（物理坐标, mm）
+        pitch: 相邻圈间距（与同心圆模式的radius_step对应）
+        spacing: 路径点弧长间距
+        mode: 'contour' 轮廓平行螺线（由外向内）或 'spiral' 阿基米德螺线（由内向外）
+        inward_margin: 轮廓向内收缩的距离，使喷嘴覆盖区域不越过边缘
+    产出:
+        (M, 2) 连续路径段；段与段之间为空行程
+    """
+    p = np.asarray(polygon, dtype=float).reshape(-1, 2)
+    center = polygon_centroid(p)
+    if inward_margin > 0:
+        # 按到中心的距离等比例收缩，近似内偏移
+        distance = np.hypot(*(p - center).T)
+        scale = np.clip(1.0 - inward_margin / np.maximum(distance, 1e-9), 0.0, 1.0)
+        p = center + scale[:, None] * (p - center)
+
+    if mode == 'spiral':
+        max_radius = np.hypot(*(p - center).T).max()
+        path = archimedean_spiral(center, max_radius, pitch, spacing)
+    elif mode == 'contour':
+        path = contour_parallel_spiral(p, pitch, spacing, center)
+    else:
+        raise ValueError(f"未知路径模式: {mode}")
+
+    for segment in clip_to_polygon(path, p):
+        yield segment
+
+
+def path_segments_length(segments):
+    """各段路径的总长度与段间空行程长度"""
+    treated = sum(float(np.sum(np.hypot(*np.diff(s, axis=0).T))) for s in segments)
+    travel = sum(float(np.hypot(*(b[0] - a[-1]))) for a, b in zip(segments, segments[1:]))
+    return treated, travel
+
+
+if __name__ == "__main__":
+    theta = np.linspace(0, 2 * np.pi, 200, endpoint=False)
+    radius = 30 + 8 * np.sin(5 * theta)
+    shape = np.column_stack((200 + radius * np.cos(theta), 10 + radius * np.sin(theta)))
+    for mode in ('contour', 'spiral'):
+        segments = list(iter_spiral_path(shape, pitch=5, spacing=1, mode=mode))
+        treated, travel = path_segments_length(segments)
+        print(f"{mode}: {len(segments)} 段, {sum(len(s) for s in segments)} 点, "
+              f"路径 {treated:.1f}mm, 空行程 {travel:.1f}mm")
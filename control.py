@@ -3,8 +3,9 @@ import time
 import json
 import numpy as np
 import countbyhand as CO
+import trajectory as TR
+from serial_transport import SerialTransport, CommandPipeline, wait_until_arrived, gather_replies
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
 import threading
 import queue
@@ -50,19 +51,26 @@ class RoArmControl:
         time.sleep(2)
         print(f"Connected to {self.ser.name}")
         
+        # 单一读线程：命令回复按T码路由，T:1051反馈分发给订阅者
+        self.transport = SerialTransport(self.ser, reply_timeout=1)
+        self.transport.start()
+        # 流水线发送：最多8条命令在途，不超过固件256字节接收缓冲区
+        self.pipeline = CommandPipeline(self.transport, window=8, buffer_bytes=256, ack_timeout=1)
+        
         # 数据记录相关
         self.enable_logging = enable_logging
         self.position_data = []
         self.data_queue = queue.Queue()
         self.logging_thread = None
         self.stop_logging = False
+        self.streaming = False  # 流式发送轨迹期间暂停T:105轮询，让出流水线窗口
         
         # 位置和状态监听相关
         self.current_position = [0, 0, 0]
         self.current_joint_angles = {}
         self.current_joint_loads = {}
         self.position_monitoring = False
-        self.monitor_thread = None
+        self.monitor_token = None
         
         if self.enable_logging:
             self.start_logging()
@@ -78,31 +86,37 @@ class RoArmControl:
         self.logging_thread.start()
 
     def _logging_worker(self):
-        """数据记录工作线程"""
+        """数据记录轮询线程：定期请求位置反馈，不等待回复（反馈由位置监听记录）"""
         while not self.stop_logging:
             try:
-                # 定期获取当前位置
-                current_pos = self.getcurrentposition()
-                if current_pos:
-                    timestamp = datetime.now()
-                    data_point = {
-                        'timestamp': timestamp,
-                        'x': current_pos[0],
-                        'y': current_pos[1],
-                        'z': current_pos[2]
-                    }
-                    self.position_data.append(data_point)
+                if self.transport.halted:
+                    time.sleep(0.1)  # 紧急停止期间暂停轮询
+                    continue
+                if self.streaming:
+                    time.sleep(0.02)  # 轨迹流式发送期间暂停轮询
+                    continue
+                self.transport.send({"T": 105}, expect_reply=False)
                 time.sleep(0.02)  # 50Hz采样率 (提高频率)
             except Exception as e:
                 print(f"Logging error: {e}")
                 time.sleep(0.1)
 
     def send_command(self, command_dict):
-        """发送JSON指令到机械臂"""
-        command_str = json.dumps(command_dict) + '\n'
-        self.ser.write(command_str.encode('utf-8'))
-        response = self.ser.readline().decode().strip()
-        return response
+        """发送JSON指令到机械臂，返回回复（dict），超时返回None"""
+        return self.transport.request(command_dict)
+
+    def send_batch(self, commands):
+        """批量发送指令（窗口允许时合并为一次写入）并统一等待回复，返回回复列表（未确认的为None）"""
+        futures = self.pipeline.submit_batch(commands)
+        return gather_replies(futures, self.pipeline.ack_timeout)
+
+    def submit_command(self, command_dict):
+        """经流水线发送指令，不等待回复，返回Future；在途指令达到窗口上限时阻塞"""
+        return self.pipeline.submit(command_dict)
+
+    def wait_for_commands(self, timeout=None):
+        """等待流水线中所有指令确认（或超时丢弃），返回上次等待以来提交的指令是否全部确认"""
+        return self.pipeline.drain(timeout)
 
     def set_end_position(self, x, y, z,t=3.1415/2,g=3.14,speed=0.08):
         """设置末端执行器位置（单位：毫米）"""
@@ -123,50 +137,104 @@ class RoArmControl:
         self.stop_logging = True
         if self.logging_thread:
             self.logging_thread.join(timeout=2)
+        self.stop_position_monitoring()
+        self.pipeline.cancel_all()
+        self.transport.stop()
         self.ser.close()
         print("Serial connection closed")
 
-    def zero(self):
-        command = {
-            "T": 100
-        }
-        self.send_command(command)
+    def emergency_stop(self):
+        """紧急停止：经优先通道立即写入停止帧并取消在途指令，返回停止延迟统计(ms)"""
+        latency = self.transport.emergency_stop()
+        self.pipeline.cancel_all()
+        return latency
+
+    def clear_emergency_stop(self):
+        """解除紧急停止，恢复指令发送"""
+        self.transport.clear_halt()
+
+    def zero(self,P=None,I=0):
+        """回零；给出P时先设置PID，与回零指令合并为一批发送"""
+        commands = [{"T":108,"joint":i,"p":P,"i":I} for i in range(1,7)] if P is not None else []
+        commands.append({"T": 100})
+        self.send_batch(commands)
     
     def setPID(self,P=8,I=0):
-        for i in range(1,7):
-            command={"T":108,"joint":i,"p":P,"i":I}
-            self.send_command(command)
+        """设置6个关节的PID，一次写入并统一等待确认"""
+        replies = self.send_batch([{"T":108,"joint":i,"p":P,"i":I} for i in range(1,7)])
+        return all(reply is not None for reply in replies)
 
     def getcurrentposition(self):
         """获取当前末端执行器位置"""
         command = {"T": 105}
         response = self.send_command(command)
         try:
-            data = json.loads(response)
-            return [data['x'], data['y'], data['z']]
-        except (json.JSONDecodeError, KeyError):
+            return [response['x'], response['y'], response['z']]
+        except (TypeError, KeyError):
             return None
 
-    def move_to_position_straight(self,startpoint,endpoint,gap=10):
-        """移动到指定位置"""
-        # 301: 末端位置控制指令
-        
-        
-    
-        distance=((startpoint[0]-endpoint[0])**2+(startpoint[1]-endpoint[1])**2+(startpoint[2]-endpoint[2])**2)**0.5
-        point_number=max(1,int(distance/gap)+1)
-        print(point_number,distance)
-        points = np.linspace(startpoint, endpoint, point_number)
-        
-        for point in points:    
-            command = CO.anglecommandgenerator(point[0],point[1],point[2])
-            print(command)
-            self.send_command(command)
-            time.sleep(0.020)
+    def move_to_position_straight(self,startpoint,endpoint,gap=10,profile='s_curve',max_skip_fraction=0.05):
+        """
+        沿直线移动到指定位置，按关节速度/加速度限制生成轨迹并以50Hz流式发送；
+        设定点按时刻直接写出、不占用流水线窗口（定频发送本身限制了速率），
+        落后超过一个设定点时跳过已过期的中间点（终点不跳过）；
+        跳过比例超过max_skip_fraction或有设定点未收到回显确认时返回False
+        """
+        trajectory = TR.plan_cartesian_line(startpoint, endpoint, rate_hz=TR.DEFAULT_RATE_HZ,
+                                            profile=profile, resolution=gap)
+        if trajectory is None:
+            print("路径包含不可达点，取消移动")
+            return False
+        commands = trajectory.commands()
+        errors, ok = CO.verify_commands(commands, trajectory.points)
+        if not ok.all():
+            print(f"路径包含 {int((~ok).sum())} 个不可达点，取消移动")
+            return False
+
+        last = len(commands) - 1
+        skipped = 0
+        futures = []
+        self.streaming = True
+        try:
+            start_time = time.perf_counter()
+            i = 0
+            while i <= last:
+                delay = start_time + trajectory.times[i] - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # 发送落后时跳到当前时刻对应的设定点，避免后续点集中补发
+                now = time.perf_counter() - start_time
+                while i < last and now >= trajectory.times[i + 1]:
+                    i += 1
+                    skipped += 1
+                futures.append(self.transport.send(commands[i]))
+                i += 1
+        finally:
+            self.streaming = False
+        if skipped > max_skip_fraction * len(commands):
+            print(f"轨迹发送落后，跳过 {skipped}/{len(commands)} 个设定点，速度/加速度曲线未被执行")
+            return False
+        replies = gather_replies(futures, self.pipeline.ack_timeout)
+        for future in futures:
+            future.cancel()  # 未确认的回显不再等待
+        lost = sum(reply is None for reply in replies)
+        if lost:
+            print(f"轨迹指令未确认: {lost}/{len(futures)}")
+            return False
+        return True
     def move_to_position(self,x,y,z):
         command=CO.anglecommandgenerator(x,y,z)
         self.send_command(command)
 
+    def wait_until_arrived(self,x,y,z,tolerance=0.01,settle=0.1,timeout=5.0):
+        """根据T:1051反馈的关节角等待到达(x,y,z)对应的指令关节角（误差tolerance弧度）并稳定，超时返回False"""
+        command = CO.anglecommandgenerator(x, y, z)
+        target_joints = (command["base"], command["shoulder"], command["elbow"], command["wrist"])
+        arrived = wait_until_arrived(self.transport, target_joints, tolerance, settle, timeout)
+        if not arrived:
+            print(f"等待到位超时: ({x:.1f}, {y:.1f}, {z:.1f})")
+        return arrived
+
     def save_position_data(self, filename=None):
         """保存位置数据到CSV文件"""
         if not filename:
@@ -182,78 +250,64 @@ class RoArmControl:
             return None
 
     def start_position_monitoring(self):
-        """启动位置监听"""
+        """启动位置监听（订阅T:1051反馈）"""
         self.position_monitoring = True
-        self.monitor_thread = threading.Thread(target=self._position_monitor_worker)
-        self.monitor_thread.daemon = True
-        self.monitor_thread.start()
+        if self.monitor_token is None:
+            self.monitor_token = self.transport.subscribe(1051, self._on_feedback)
 
     def stop_position_monitoring(self):
         """停止位置监听"""
         self.position_monitoring = False
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=2)
+        if self.monitor_token is not None:
+            self.transport.unsubscribe(self.monitor_token)
+            self.monitor_token = None
 
-    def _position_monitor_worker(self):
-        """位置监听工作线程 - 增强版"""
-        while getattr(self, 'position_monitoring', False):
-            try:
-                # 持续监听串口
-                if self.ser.in_waiting > 0:
-                    response = self.ser.readline().decode().strip()
-                    if response:
-                        try:
-                            data = json.loads(response)
-                            # 检查是否为位置反馈数据 (T:1051)
-                            if data.get('T') == 1051:
-                                # 更新当前位置和状态
-                                self.current_position = [data['x'], data['y'], data['z']]
-                                self.current_joint_angles = {
-                                    'tit': data.get('tit', 0),  # 末端关节姿态
-                                    'b': data.get('b', 0),     # 基础关节
-                                    's': data.get('s', 0),     # 肩关节
-                                    'e': data.get('e', 0),     # 肘关节
-                                    't': data.get('t', 0),     # 手腕关节1
-                                    'r': data.get('r', 0),     # 手腕关节2
-                                    'g': data.get('g', 0)      # 末端关节
-                                }
-                                self.current_joint_loads = {
-                                    'tB': data.get('tB', 0),   # 基础关节负载
-                                    'tS': data.get('tS', 0),   # 肩关节负载
-                                    'tE': data.get('tE', 0),   # 肘关节负载
-                                    'tT': data.get('tT', 0),   # 手腕关节1负载
-                                    'tR': data.get('tR', 0)    # 手腕关节2负载
-                                }
-                                
-                                # 如果启用了数据记录
-                                if self.enable_logging:
-                                    timestamp = datetime.now()
-                                    data_point = {
-                                        'timestamp': timestamp,
-                                        'x': data['x'],
-                                        'y': data['y'],
-                                        'z': data['z'],
-                                        'tit': data.get('tit', 0),
-                                        'base_angle': data.get('b', 0),
-                                        'shoulder_angle': data.get('s', 0),
-                                        'elbow_angle': data.get('e', 0),
-                                        'wrist1_angle': data.get('t', 0),
-                                        'wrist2_angle': data.get('r', 0),
-                                        'end_angle': data.get('g', 0),
-                                        'base_load': data.get('tB', 0),
-                                        'shoulder_load': data.get('tS', 0),
-                                        'elbow_load': data.get('tE', 0),
-                                        'wrist1_load': data.get('tT', 0),
-                                        'wrist2_load': data.get('tR', 0)
-                                    }
-                                    self.position_data.append(data_point)
-                        except (json.JSONDecodeError, KeyError) as e:
-                            1==1
+    def _on_feedback(self, data):
+        """位置反馈 (T:1051) 处理，在传输层读线程中调用"""
+        try:
+            # 更新当前位置和状态
+            self.current_position = [data['x'], data['y'], data['z']]
+            self.current_joint_angles = {
+                'tit': data.get('tit', 0),  # 末端关节姿态
+                'b': data.get('b', 0),     # 基础关节
+                's': data.get('s', 0),     # 肩关节
+                'e': data.get('e', 0),     # 肘关节
+                't': data.get('t', 0),     # 手腕关节1
+                'r': data.get('r', 0),     # 手腕关节2
+                'g': data.get('g', 0)      # 末端关节
+            }
+            self.current_joint_loads = {
+                'tB': data.get('tB', 0),   # 基础关节负载
+                'tS': data.get('tS', 0),   # 肩关节负载
+                'tE': data.get('tE', 0),   # 肘关节负载
+                'tT': data.get('tT', 0),   # 手腕关节1负载
+                'tR': data.get('tR', 0)    # 手腕关节2负载
+            }
             
-                time.sleep(0.01)  # 10ms间隔
-            except Exception as e:
-                print(f"Position monitoring error: {e}")
-                time.sleep(0.1)
+            # 如果启用了数据记录
+            if self.enable_logging:
+                timestamp = datetime.now()
+                data_point = {
+                    'timestamp': timestamp,
+                    'x': data['x'],
+                    'y': data['y'],
+                    'z': data['z'],
+                    'tit': data.get('tit', 0),
+                    'base_angle': data.get('b', 0),
+                    'shoulder_angle': data.get('s', 0),
+                    'elbow_angle': data.get('e', 0),
+                    'wrist1_angle': data.get('t', 0),
+                    'wrist2_angle': data.get('r', 0),
+                    'end_angle': data.get('g', 0),
+                    'base_load': data.get('tB', 0),
+                    'shoulder_load': data.get('tS', 0),
+                    'elbow_load': data.get('tE', 0),
+                    'wrist1_load': data.get('tT', 0),
+                    'wrist2_load': data.get('tR', 0)
+                }
+                self.position_data.append(data_point)
+        except KeyError:
+            pass
 
     def get_current_joint_status(self):
         """获取当前关节状态"""
@@ -0,0 +1,210 @@
+"""
+治疗覆盖栅格
+以物理坐标(mm)栅格累计喷嘴在各处的停留时间（剂量），规划器据此跳过已达到剂量的区域
+或缩短停留时间，中断后恢复或重复治疗时无需从头重放整条路径；
+栅格记录所属伤口轮廓、标定指纹和会话时间，只有同一伤口和标定才能继续使用
+"""
+import os
+import json
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def points_in_polygon(xy, polygon, chunk=20000):
+    """向量化射线法判断 (N, 2) 点是否在多边形内，返回 (N,) bool"""
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    p = np.asarray(polygon, dtype=float).reshape(-1, 2)
+    q = np.roll(p, -1, axis=0)
+    inside = np.zeros(len(xy), dtype=bool)
+    for start in range(0, len(xy), chunk):
+        x = xy[start:start + chunk, 0:1]
+        y = xy[start:start + chunk, 1:2]
+        crosses = (p[:, 1] > y) != (q[:, 1] > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = p[:, 0] + (y - p[:, 1]) * (q[:, 0] - p[:, 0]) / (q[:, 1] - p[:, 1])
+        inside[start:start + chunk] = np.sum(crosses & (x < x_cross), axis=1) % 2 == 1
+    return inside
+
+
+class CoverageMap:
+    """覆盖栅格
+
+    每次执行（停留或匀速经过）时，将停留秒数累加到喷嘴圆形覆盖范围内的所有栅格；
+    某点的剂量取喷嘴中心所在栅格的累计值，达到 required_dose（即治疗时间）视为已完成。
+    """
+
+    def __init__(self, bounds: Tuple[float, float, float, float], resolution: float = 0.5,
+                 nozzle_radius: float = 2.5, required_dose: float = 0.5):
+        self.bounds = tuple(float(v) for v in bounds)  # (x_min, x_max, y_min, y_max)
+        self.resolution = float(resolution)
+        self.nozzle_radius = float(nozzle_radius)
+        self.required_dose = float(required_dose)
+        self.polygon: Optional[np.ndarray] = None   # 所属伤口轮廓（物理坐标）
+        self.calibration: Optional[str] = None      # 所属标定指纹
+        self.session = time.strftime('%Y%m%d_%H%M%S')
+        x_min, x_max, y_min, y_max = self.bounds
+        self.shape = (int(np.ceil((y_max - y_min) / self.resolution)) + 1,
+                      int(np.ceil((x_max - x_min) / self.resolution)) + 1)
+        self.dose = np.zeros(self.shape, dtype=np.float32)
+
+        # 喷嘴覆盖范围的栅格偏移模板
+        reach = int(np.ceil(self.nozzle_radius / self.resolution))
+        oy, ox = np.mgrid[-reach:reach + 1, -reach:reach + 1]
+        disk = np.hypot(ox, oy) * self.resolution <= self.nozzle_radius
+        self._stencil = (oy[disk], ox[disk])
+
+    @classmethod
+    def for_polygon(cls, polygon, margin: float = 5.0, calibration: str = None, **kwargs) -> 'CoverageMap':
+        """按轮廓外包矩形（加边距）创建覆盖栅格，记录轮廓和标定指纹"""
+        p = np.asarray(polygon, dtype=float).reshape(-1, 2)
+        bounds = (p[:, 0].min() - margin, p[:, 0].max() + margin,
+                  p[:, 1].min() - margin, p[:, 1].max() + margin)
+        coverage = cls(bounds, **kwargs)
+        coverage.polygon = p.copy()
+        coverage.calibration = calibration
+        return coverage
+
+    def covers(self, polygon) -> bool:
+        """轮廓是否完全位于栅格范围内（用于判断已保存的栅格能否继续使用）"""
+        p = np.asarray(polygon, dtype=float).reshape(-1, 2)
+        x_min, x_max, y_min, y_max = self.bounds
+        return bool(np.all((p[:, 0] >= x_min) & (p[:, 0] <= x_max) &
+                           (p[:, 1] >= y_min) & (p[:, 1] <= y_max)))
+
+    def _cell_centers(self) -> np.ndarray:
+        """全部栅格中心的物理坐标 (H·W, 2)"""
+        x_min, _, y_min, _ = self.bounds
+        rows, cols = np.mgrid[0:self.shape[0], 0:self.shape[1]]
+        return np.column_stack((x_min + cols.ravel() * self.resolution,
+                                y_min + rows.ravel() * self.resolution))
+
+    def matches(self, polygon, calibration: str, min_overlap: float = 0.9) -> bool:
+        """
+        是否属于同一伤口和标定：标定指纹一致，且新轮廓与记录轮廓的面积交并比不低于min_overlap
+        （同一伤口重新识别时轮廓会有轻微差异，不能要求完全相同）
+        """
+        if self.polygon is None or calibration != self.calibration or not self.covers(polygon):
+            return False
+        centers = self._cell_centers()
+        old = points_in_polygon(centers, self.polygon)
+        new = points_in_polygon(centers, polygon)
+        union = np.count_nonzero(old | new)
+        return union > 0 and np.count_nonzero(old & new) / union >= min_overlap
+
+    def _cells(self, xy):
+        """(N, 2) 点对应的栅格行列索引"""
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        col = np.rint((xy[:, 0] - self.bounds[0]) / self.resolution).astype(int)
+        row = np.rint((xy[:, 1] - self.bounds[2]) / self.resolution).astype(int)
+        return row, col
+
+    def _footprint(self, xy):
+        """每个点喷嘴覆盖的栅格索引，返回 (点序号, 行, 列)，已去除栅格外部分"""
+        row, col = self._cells(xy)
+        rows = row[:, None] + self._stencil[0][None, :]
+        cols = col[:, None] + self._stencil[1][None, :]
+        index = np.broadcast_to(np.arange(len(row))[:, None], rows.shape)
+        inside = (rows >= 0) & (rows < self.shape[0]) & (cols >= 0) & (cols < self.shape[1])
+        return index[inside], rows[inside], cols[inside]
+
+    def add_dwell(self, xy, seconds) -> None:
+        """在 (N, 2) 点处累加停留时间，seconds为标量或 (N,)"""
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        seconds = np.broadcast_to(np.asarray(seconds, dtype=np.float32), (len(xy),))
+        index, rows, cols = self._footprint(xy)
+        np.add.at(self.dose, (rows, cols), seconds[index])
+
+    def add_path(self, xy, speed: float) -> None:
+        """累加匀速经过折线路径的剂量，每个点分得与相邻点间距对应的停留时间"""
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        if len(xy) < 2:
+            return
+        step = np.hypot(*np.diff(xy, axis=0).T)
+        share = (np.concatenate(([0.0], step)) + np.concatenate((step, [0.0]))) / 2
+        self.add_dwell(xy, share / speed)
+
+    def pass_speed(self) -> float:
+        """匀速单遍经过即可使路径上各点达到 required_dose 的速度 (mm/s)
+
+        喷嘴经过某点的时长为覆盖弦长除以速度；栅格取整可能使覆盖半径缩小约一个栅格，
+        按 2·(nozzle_radius - resolution) 的保守弦长计算
+        """
+        chord = 2 * max(self.nozzle_radius - self.resolution, self.resolution)
+        return chord / self.required_dose
+
+    def dose_at(self, xy) -> np.ndarray:
+        """(N, 2) 点（喷嘴中心所在栅格）的累计剂量，栅格外为0"""
+        row, col = self._cells(xy)
+        inside = (row >= 0) & (row < self.shape[0]) & (col >= 0) & (col < self.shape[1])
+        result = np.zeros(len(row), dtype=np.float32)
+        result[inside] = self.dose[row[inside], col[inside]]
+        return result
+
+    def remaining(self, xy) -> np.ndarray:
+        """(N, 2) 点距所需剂量还差的停留时间(秒)"""
+        return np.maximum(self.required_dose - self.dose_at(xy), 0.0)
+
+    def needs_treatment(self, xy, tolerance: float = 0.05) -> np.ndarray:
+        """(N,) bool，剂量不足 required_dose·(1-tolerance) 的点"""
+        return self.dose_at(xy) < self.required_dose * (1.0 - tolerance)
+
+    def coverage_fraction(self, polygon) -> float:
+        """轮廓内已达到所需剂量的面积比例"""
+        inside = points_in_polygon(self._cell_centers(), polygon)
+        if not inside.any():
+            return 0.0
+        return float(np.mean(self.dose.ravel()[inside] >= self.required_dose))
+
+    def split_untreated(self, segment, min_points: int = 2):
+        """将连续路径段拆成仍需治疗的子段列表，已覆盖的部分被跳过"""
+        segment = np.asarray(segment, dtype=float).reshape(-1, 2)
+        need = self.needs_treatment(segment)
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], need.astype(np.int8), [0]))))
+        runs = [segment[start:stop] for start, stop in zip(edges[::2], edges[1::2])]
+        return [run for run in runs if len(run) >= min_points]
+
+    def save(self, path: str) -> None:
+        """保存剂量栅格（.npy）和参数、所属轮廓/标定/会话（.json）"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.save(path, self.dose)
+        with open(os.path.splitext(path)[0] + '.json', 'w', encoding='utf-8') as f:
+            json.dump({"bounds": self.bounds, "resolution": self.resolution,
+                       "nozzle_radius": self.nozzle_radius,
+                       "required_dose": self.required_dose,
+                       "polygon": None if self.polygon is None else self.polygon.tolist(),
+                       "calibration": self.calibration, "session": self.session}, f, indent=4)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['CoverageMap']:
+        """加载已保存的覆盖栅格，文件不存在时返回None"""
+        meta_path = os.path.splitext(path)[0] + '.json'
+        if not (os.path.exists(path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        coverage = cls(meta["bounds"], meta["resolution"], meta["nozzle_radius"], meta["required_dose"])
+        dose = np.load(path)
+        if dose.shape != coverage.shape:
+            return None
+        coverage.dose = dose.astype(np.float32)
+        if meta.get("polygon") is not None:
+            coverage.polygon = np.asarray(meta["polygon"], dtype=float).reshape(-1, 2)
+        coverage.calibration = meta.get("calibration")
+        coverage.session = meta.get("session", coverage.session)
+        return coverage
+
+
+if __name__ == '__main__':
+    theta = np.linspace(0, 2 * np.pi, 100, endpoint=False)
+    shape = np.column_stack((200 + 20 * np.cos(theta), 20 * np.sin(theta)))
+    coverage = CoverageMap.for_polygon(shape, calibration="demo")
+    points = shape[::2] * 0.8 + np.array([200, 0]) * 0.2
+    coverage.add_dwell(points[:25], 0.5)
+    print(f"需治疗点: {int(coverage.needs_treatment(points).sum())}/{len(points)}")
+    print(f"覆盖比例: {coverage.coverage_fraction(shape):.1%}")
+    print(f"同一伤口: {coverage.matches(shape + 0.3, 'demo')}, "
+          f"不同伤口: {coverage.matches(shape * 0.6 + np.array([200, 0]) * 0.4, 'demo')}")
@@ -81,6 +81,10 @@ def run_cli_mode():
         robot_controller = get_robot_controller()
         coordinate_transformer = get_coordinate_transformer()
         
+        # 加载缓存标定
+        if coordinate_transformer.load_cached_calibration():
+            print("已加载缓存标定，治疗前请输入 'calibrate' 执行快速验证")
+        
         print("=== 智能机械臂伤口治疗系统 CLI模式 ===")
         print("输入 'help' 查看可用命令")
         
@@ -94,7 +98,7 @@ def run_cli_mode():
                 elif command == 'help':
                     print_help()
                 elif command == 'status':
-                    show_status(robot_controller)
+                    show_status(robot_controller, coordinate_transformer)
                 elif command == 'connect':
                     connect_robot(robot_controller)
                 elif command == 'disconnect':
@@ -140,7 +144,7 @@ def print_help():
     """
     print(help_text)
 
-def show_status(robot_controller):
+def show_status(robot_controller, coordinate_transformer=None):
     """显示系统状态"""
     print("\n=== 系统状态 ===")
     
@@ -154,6 +158,14 @@ def show_status(robot_controller):
     else:
         print("机械臂: 未连接")
     
+    # 标定状态
+    if coordinate_transformer and coordinate_transformer.calibration_data:
+        calibration_data = coordinate_transformer.calibration_data
+        source = "缓存 (待验证)" if coordinate_transformer.calibration_from_cache else "已验证"
+        print(f"标定: {source}, 比例={calibration_data.scale_factor:.4f}")
+    else:
+        print("标定: 未标定")
+    
     # 配置状态
     config = get_config()
     print(f"摄像头设备: {config.camera.device_id}")
@@ -195,9 +207,52 @@ def calibrate_system(robot_controller, coordinate_transformer):
         print("请先连接机械臂")
         return
     
+    if coordinate_transformer.calibration_from_cache:
+        verify_cached_calibration(robot_controller, coordinate_transformer)
+        return
+    
     print("系统标定功能需要GUI模式或手动操作")
     print("请使用GUI模式进行标定")
 
+def verify_cached_calibration(robot_controller, coordinate_transformer):
+    """移动一次快速验证缓存标定（与GUI相同），失败时丢弃缓存"""
+    import cv2
+    from coordinate_transformer import CalibrationManager
+    
+    config = get_config()
+    cap = cv2.VideoCapture(config.camera.device_id)
+    if not cap.isOpened():
+        print("无法打开摄像头，不能验证缓存标定")
+        return False
+    
+    def locate_wound():
+        ret, frame = cap.read()
+        if not ret:
+            return None
+        if coordinate_transformer.image_center is None:
+            height, width = frame.shape[:2]
+            coordinate_transformer.set_image_center(width, height)
+        result = detect_wound(frame, stable=True)
+        if not result.success or not result.contours:
+            return None
+        return result.contours[0].center
+    
+    print("正在快速验证缓存标定...")
+    try:
+        passed, residual = CalibrationManager(coordinate_transformer).quick_verify(robot_controller, locate_wound)
+    except Exception as e:
+        print(f"缓存标定验证失败: {e}")
+        coordinate_transformer.invalidate_cached_calibration()
+        return False
+    finally:
+        cap.release()
+    
+    if passed:
+        print(f"✓ 缓存标定验证通过: 残差 {residual:.2f}mm")
+    else:
+        print(f"✗ 缓存标定验证失败: 残差 {residual:.2f}mm，请使用GUI模式重新标定")
+    return passed
+
 def test_system(robot_controller, coordinate_transformer):
     """测试系统功能"""
     print("\n=== 系统测试 ===")
@@ -0,0 +1,47 @@
+"""
+测试公共夹具：串口相关测试在伪终端模拟器（roarm_simulator）上运行，不需要真实机械臂
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def sim():
+    """启动模拟器，测试结束后关闭"""
+    pytest.importorskip("tty")  # 伪终端仅在POSIX系统上可用
+    from roarm_simulator import RoArmSimulator
+
+    with RoArmSimulator(latency=0.002, jitter=0.0005, seed=0) as simulator:
+        yield simulator
+
+
+@pytest.fixture
+def transport(sim):
+    """连接模拟器的串口传输层"""
+    import serial
+    from serial_transport import SerialTransport
+
+    ser = serial.Serial(sim.port, 115200, timeout=0.1)
+    transport = SerialTransport(ser)
+    transport.start()
+    yield transport
+    transport.stop()
+    ser.close()
+
+
+@pytest.fixture
+def drop_replies(sim):
+    """让模拟器丢弃以给定前缀开头的回复（模拟回显丢失），测试结束后恢复"""
+    transmit = sim._transmit
+
+    def drop(prefix):
+        sim._transmit = lambda data: None if data.startswith(prefix) else transmit(data)
+
+    yield drop
+    sim._transmit = transmit
@@ -0,0 +1,79 @@
+"""RoArmControl在模拟器上的流式发送、确认和紧急停止"""
+import time
+
+import pytest
+
+import countbyhand as CO
+
+
+@pytest.fixture(scope="module")
+def sim():
+    pytest.importorskip("tty")
+    from roarm_simulator import RoArmSimulator
+
+    with RoArmSimulator(latency=0.002, jitter=0.0005, seed=0) as simulator:
+        yield simulator
+
+
+@pytest.fixture(scope="module")
+def arm(sim):
+    from control import RoArmControl
+
+    arm = RoArmControl(port=sim.port)
+    yield arm
+    arm.close()
+
+
+@pytest.fixture
+def home(arm):
+    """每个测试从同一位置开始，结束后解除紧急停止"""
+    arm.clear_emergency_stop()
+    arm.move_to_position(175, 0, 100)
+    assert arm.wait_until_arrived(175, 0, 100)
+    yield [175, 0, 100]
+    arm.clear_emergency_stop()
+
+
+@pytest.fixture
+def drop_joint_echoes(sim, monkeypatch):
+    transmit = sim._transmit
+    monkeypatch.setattr(sim, "_transmit", lambda data: None if data.startswith(b'{"T":102') else transmit(data))
+
+
+def test_straight_move_streams_and_arrives(arm, home):
+    assert arm.move_to_position_straight(home, [200, 60, 60])
+    assert arm.wait_until_arrived(200, 60, 60)
+
+
+def test_straight_move_fails_when_setpoints_are_skipped(arm, home, monkeypatch):
+    send = arm.transport.send
+    monkeypatch.setattr(arm.transport, "send", lambda *args, **kwargs: (time.sleep(0.045), send(*args, **kwargs))[1])
+    assert not arm.move_to_position_straight(home, [200, 60, 60])
+
+
+def test_straight_move_fails_when_setpoints_are_not_acknowledged(arm, home, drop_joint_echoes):
+    assert not arm.move_to_position_straight(home, [200, 60, 60])
+
+
+def test_logging_poll_pauses_while_streaming(arm, home, monkeypatch):
+    sent = []
+    send = arm.transport.send
+    monkeypatch.setattr(arm.transport, "send",
+                        lambda command, *args, **kwargs: (sent.append(command["T"]), send(command, *args, **kwargs))[1])
+    assert arm.move_to_position_straight(home, [200, 60, 60])
+    first, last = sent.index(102), len(sent) - 1 - sent[::-1].index(102)
+    # 轮询线程可能在流式发送开始前已通过检查，最多漏过一次
+    assert sent[first:last].count(105) <= 1
+
+
+def test_wait_for_commands_reports_lost_commands(arm, home, drop_joint_echoes):
+    arm.submit_command(CO.anglecommandgenerator(180, 0, 90))
+    assert not arm.wait_for_commands()
+
+
+def test_emergency_stop_halts_motion(sim, arm, home):
+    arm.move_to_position(250, -80, 40)
+    time.sleep(0.1)
+    latency = arm.emergency_stop()
+    assert latency["ack_ms"] is not None
+    assert not sim.is_moving()
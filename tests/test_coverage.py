@@ -0,0 +1,73 @@
+import numpy as np
+
+from coverage import CoverageMap, points_in_polygon
+
+
+def circle(cx=200.0, cy=0.0, r=20.0, n=100):
+    theta = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    return np.column_stack((cx + r * np.cos(theta), cy + r * np.sin(theta)))
+
+
+def test_points_in_polygon():
+    inside = points_in_polygon([[200, 0], [215, 0], [230, 0], [200, 25]], circle())
+    assert inside.tolist() == [True, True, False, False]
+
+
+def test_dwell_completes_dose_under_nozzle_only():
+    coverage = CoverageMap.for_polygon(circle(), required_dose=0.5)
+    coverage.add_dwell([[200, 0]], 0.5)
+    assert coverage.needs_treatment([[200, 0], [201, 1], [210, 0]]).tolist() == [False, False, True]
+
+
+def test_remaining_is_the_missing_dwell():
+    coverage = CoverageMap.for_polygon(circle(), required_dose=0.5)
+    coverage.add_dwell([[200, 0]], 0.2)
+    assert np.isclose(coverage.remaining([[200, 0]])[0], 0.3)
+
+
+def test_single_pass_at_pass_speed_reaches_dose():
+    coverage = CoverageMap.for_polygon(circle(), required_dose=0.5)
+    path = np.column_stack((np.linspace(185, 215, 61), np.zeros(61)))
+    coverage.add_path(path, coverage.pass_speed())
+    interior = path[10:-10]  # 两端喷嘴只经过半个覆盖弦长
+    assert not coverage.needs_treatment(interior).any()
+
+
+def test_split_untreated_skips_covered_part():
+    coverage = CoverageMap.for_polygon(circle(), required_dose=0.5)
+    coverage.add_dwell([[200, 0]], 0.5)
+    segment = np.column_stack((np.linspace(185, 215, 31), np.zeros(31)))
+    runs = coverage.split_untreated(segment)
+    assert len(runs) == 2
+    assert all(coverage.needs_treatment(run).all() for run in runs)
+
+
+def test_matches_same_wound_redetected():
+    coverage = CoverageMap.for_polygon(circle(), calibration="cam0")
+    assert coverage.matches(circle() + 0.3, "cam0")
+
+
+def test_does_not_match_other_wound_in_same_area():
+    coverage = CoverageMap.for_polygon(circle(), calibration="cam0")
+    assert not coverage.matches(circle(r=12.0), "cam0")
+
+
+def test_does_not_match_other_calibration():
+    coverage = CoverageMap.for_polygon(circle(), calibration="cam0")
+    assert not coverage.matches(circle(), "cam1")
+
+
+def test_save_and_load_keep_dose_and_owner(tmp_path):
+    coverage = CoverageMap.for_polygon(circle(), calibration="cam0")
+    coverage.add_dwell(circle()[::5], 0.3)
+    path = str(tmp_path / "coverage.npy")
+    coverage.save(path)
+    loaded = CoverageMap.load(path)
+    assert np.array_equal(loaded.dose, coverage.dose)
+    assert loaded.calibration == "cam0"
+    assert loaded.session == coverage.session
+    assert loaded.matches(circle(), "cam0")
+
+
+def test_load_missing_map_returns_none(tmp_path):
+    assert CoverageMap.load(str(tmp_path / "missing.npy")) is None
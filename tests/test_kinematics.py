@@ -0,0 +1,52 @@
+import numpy as np
+
+import countbyhand as CO
+
+
+def workspace_points(count=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform([100, -150, 20], [280, 150, 200], size=(count, 3))
+
+
+def test_batch_ik_matches_scalar_ik():
+    points = workspace_points(50)
+    angles, valid = CO.calculate_all_angles_batch(points)
+    for point, row, ok in zip(points, angles, valid):
+        if ok:
+            command = CO.anglecommandgenerator(*point)
+            assert np.allclose(row[:3], [command["base"], command["shoulder"], command["elbow"]])
+
+
+def test_ik_fk_roundtrip_within_tolerance():
+    points = workspace_points()
+    errors, ok = CO.verify_ik_roundtrip(points)
+    reachable = CO.calculate_all_angles_batch(points)[1]
+    assert np.array_equal(ok, reachable)
+    assert np.all(errors[reachable] < 1e-6)
+
+
+def test_unreachable_points_are_flagged():
+    errors, ok = CO.verify_ik_roundtrip([[600.0, 0.0, 90.0], [0.0, 0.0, 0.0]])
+    assert not ok.any()
+    assert np.all(np.isinf(errors))
+
+
+def test_generated_commands_verify_against_targets():
+    points = workspace_points(100)
+    commands, valid = CO.anglecommandgenerator_batch(points)
+    errors, ok = CO.verify_commands(commands, points)
+    assert np.array_equal(ok, valid)
+
+
+def test_forward_kinematics_accepts_empty_input():
+    assert CO.forward_kinematics_batch(np.empty((0, 6))).shape == (0, 3)
+
+
+def test_roundtrip_of_empty_path_is_empty():
+    errors, ok = CO.verify_ik_roundtrip(np.empty((0, 3)))
+    assert errors.shape == ok.shape == (0,)
+
+
+def test_verify_commands_accepts_empty_path():
+    errors, ok = CO.verify_commands([], [])
+    assert errors.shape == ok.shape == (0,)
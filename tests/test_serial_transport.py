@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+import countbyhand as CO
+from serial_transport import (CommandPipeline, SerialTransport, TransportHalted,
+                              encode_joint_command, wait_until_arrived)
+
+JOINT_KEYS = ("base", "shoulder", "elbow", "wrist")
+
+
+def line_commands(count, y_from=-40, y_to=40):
+    points = np.column_stack((np.full(count, 175.0), np.linspace(y_from, y_to, count), np.full(count, 90.0)))
+    commands, valid = CO.anglecommandgenerator_batch(points)
+    assert valid.all()
+    return commands
+
+
+def test_two_joint_frames_fit_default_buffer():
+    frame = encode_joint_command(-3.141592, -1.570796, 3.141592, -3.141592, -3.141592, 3.141592, acc=10)
+    assert 2 * len(frame) <= 256
+
+
+def test_pipeline_window_limits_in_flight_commands(transport):
+    pipeline = CommandPipeline(transport, window=4, buffer_bytes=0)
+    peak = 0
+    for command in line_commands(40):
+        pipeline.submit(command)
+        peak = max(peak, pipeline.in_flight)
+    assert pipeline.drain(timeout=5)
+    assert 1 <= peak <= 4
+
+
+def test_pipeline_buffer_limits_in_flight_bytes(transport):
+    pipeline = CommandPipeline(transport, window=8, buffer_bytes=256)
+    peak = 0
+    for command in line_commands(40):
+        pipeline.submit(command)
+        peak = max(peak, pipeline.in_flight)
+    assert pipeline.drain(timeout=5)
+    assert peak <= 2  # T:102约111字节，256字节缓冲区最多容纳两帧
+
+
+def test_drain_reports_unacknowledged_commands(transport, drop_replies):
+    drop_replies(b'{"T":102')
+    pipeline = CommandPipeline(transport, window=8, buffer_bytes=0, ack_timeout=0.2)
+    pipeline.submit_many(line_commands(3))
+    assert not pipeline.drain(timeout=5)
+    assert pipeline.stats["timeouts"] == 3
+
+
+def test_drain_resets_after_reporting_loss(transport, drop_replies):
+    drop_replies(b'{"T":102')
+    pipeline = CommandPipeline(transport, window=8, buffer_bytes=0, ack_timeout=0.2)
+    pipeline.submit_many(line_commands(2))
+    assert not pipeline.drain(timeout=5)
+    pipeline.submit_many([{"T": 108, "joint": joint, "p": 8, "i": 0} for joint in range(1, 4)])
+    assert pipeline.drain(timeout=5)
+
+
+def test_emergency_stop_does_not_wait_for_write_lock(sim, transport):
+    with transport._write_lock:  # 模拟另一线程卡在普通命令写入中
+        latency = transport.emergency_stop()
+    assert latency["ack_ms"] is not None
+    assert sim.stats["stops"] == 1
+
+
+def test_emergency_stop_cancels_pending_replies(transport, drop_replies):
+    drop_replies(b'{"T":102')
+    future = transport.send(line_commands(1)[0])
+    transport.emergency_stop()
+    assert future.cancelled()
+
+
+def test_halted_transport_rejects_commands_until_cleared(transport):
+    transport.emergency_stop()
+    with pytest.raises(TransportHalted):
+        transport.send({"T": 105})
+    transport.clear_halt()
+    assert transport.request({"T": 105}) is not None
+
+
+def test_wait_until_arrived_detects_arrival(sim, transport):
+    command = CO.anglecommandgenerator(175, 40, 90)
+    transport.request(command)
+    assert wait_until_arrived(transport, [command[key] for key in JOINT_KEYS], timeout=5)
+    assert np.allclose(sim.joints[:4], [command[key] for key in JOINT_KEYS], atol=0.01)
+
+
+def test_wait_until_arrived_times_out_while_moving(transport):
+    command = CO.anglecommandgenerator(250, -80, 40)
+    transport.request(command)
+    assert not wait_until_arrived(transport, [command[key] for key in JOINT_KEYS], timeout=0.1)
+
+
+def test_wait_until_arrived_returns_false_when_stop_races_poll(transport, monkeypatch):
+    # halted检查通过后、发送T:105之前触发紧急停止
+    monkeypatch.setattr(SerialTransport, "halted", property(lambda self: False))
+    transport._halted.set()
+    assert wait_until_arrived(transport, (0.0, 0.0, 1.5, 0.0), timeout=1) is False
+    assert not transport._subscribers[1051]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import countbyhand as CO
+import trajectory as TR
+
+V_LIMIT = np.asarray(TR.DEFAULT_MAX_VELOCITY)
+A_LIMIT = np.asarray(TR.DEFAULT_MAX_ACCELERATION)
+
+
+def reachable_lines(count, seed=0):
+    rng = np.random.default_rng(seed)
+    lines = []
+    while len(lines) < count:
+        start, end = rng.uniform([100, -150, 20], [280, 150, 200], size=(2, 3))
+        if CO.calculate_all_angles_batch(np.linspace(start, end, 50))[1].all():
+            lines.append((start, end))
+    return lines
+
+
+def sampled_acceleration(trajectory, q_start):
+    t = np.concatenate(([0.0], trajectory.times))
+    q = np.vstack((q_start, trajectory.positions))
+    return np.abs(np.gradient(np.gradient(q, t, axis=0), t, axis=0))
+
+
+@pytest.mark.parametrize("start,end", reachable_lines(50))
+def test_cartesian_line_respects_joint_limits(start, end):
+    trajectory = TR.plan_cartesian_line(start, end)
+    assert trajectory is not None
+    q_start = CO.calculate_all_angles_batch([start])[0][0]
+    assert np.all(np.abs(trajectory.velocities) <= V_LIMIT + 1e-9)
+    assert np.all(sampled_acceleration(trajectory, q_start) <= A_LIMIT + 1e-9)
+
+
+def test_cartesian_line_stays_on_the_line():
+    start, end = np.array([150.0, -60.0, 120.0]), np.array([220.0, 60.0, 60.0])
+    trajectory = TR.plan_cartesian_line(start, end)
+    reached = CO.forward_kinematics_batch(trajectory.positions)
+    direction = (end - start) / np.linalg.norm(end - start)
+    offset = reached - start
+    off_line = offset - np.outer(offset @ direction, direction)
+    assert np.max(np.linalg.norm(off_line, axis=1)) < 0.5
+    assert np.allclose(reached[-1], end, atol=0.5)
+
+
+def test_cartesian_line_to_unreachable_target_is_rejected():
+    assert TR.plan_cartesian_line([175, 0, 90], [600, 0, 90]) is None
+
+
+def test_cartesian_line_is_never_returned_unchecked(monkeypatch):
+    monkeypatch.setattr(TR, "MAX_RESCALE_STEPS", 0)
+    assert TR.plan_cartesian_line([175, 0, 90], [200, 60, 60]) is None
+
+
+def test_zero_length_line_is_a_single_setpoint():
+    trajectory = TR.plan_cartesian_line([175, 0, 90], [175, 0, 90])
+    assert len(trajectory.times) == 1
+    assert trajectory.duration == 0.0
+
+
+def test_joint_move_respects_limits_and_ends_at_target():
+    q_start = np.array([0.0, 0.0, 1.57, 0.0, 0.0, 3.14])
+    q_end = np.array([0.8, 0.4, 1.0, 0.3, -0.5, 3.14])
+    trajectory = TR.plan_joint_move(q_start, q_end)
+    assert np.allclose(trajectory.positions[-1], q_end)
+    assert np.all(np.abs(trajectory.velocities) <= V_LIMIT + 1e-6)
+    assert np.all(sampled_acceleration(trajectory, q_start) <= A_LIMIT + 1e-9)
@@ -0,0 +1,199 @@
+"""
+关节空间轨迹生成
+在关节速度/加速度限制下生成按时间参数化的轨迹（梯形或S形速度曲线），
+按流式发送频率采样，运动用时为满足限制的最短时间
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+import countbyhand as CO
+
+# 默认关节限制 [base, shoulder, elbow, wrist, roll, hand]
+DEFAULT_MAX_VELOCITY = (1.5, 1.5, 1.5, 2.0, 2.0, 2.0)      # rad/s
+DEFAULT_MAX_ACCELERATION = (3.0, 3.0, 3.0, 4.0, 4.0, 4.0)  # rad/s²
+DEFAULT_RATE_HZ = 50.0
+MAX_RESCALE_STEPS = 5       # 笛卡尔直线采样后超限时的最大重新规划次数，仍超限则放弃
+
+
+@dataclass
+class JointTrajectory:
+    """时间参数化的关节轨迹"""
+    times: np.ndarray        # (N,) 秒
+    positions: np.ndarray    # (N, 6) 关节角
+    velocities: np.ndarray   # (N, 6) 关节角速度
+    points: np.ndarray = None  # (N, 3) 对应的笛卡尔点（笛卡尔直线规划时）
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    def commands(self, speed=0, acc=10):
+        """转换为T:102指令列表"""
+        names = ("base", "shoulder", "elbow", "wrist", "roll", "hand")
+        return [{"T": 102, **dict(zip(names, row)), "spd": speed, "acc": acc}
+                for row in self.positions.tolist()]
+
+
+def _profile_timing(distance, v_max, a_max, profile):
+    """
+    一维运动的时间参数：返回 (峰值速度, 加速段时间, 总时间)
+
+    S形曲线的加速度按正弦平方变化，峰值加速度为平均值的两倍，
+    因此加速段时长为梯形的两倍，但加速段位移相同 (v*Ta/2)
+    """
+    if distance <= 0:
+        return 0.0, 0.0, 0.0
+    ramp = 2.0 if profile == 's_curve' else 1.0
+    v_peak = min(v_max, math.sqrt(distance * a_max / ramp))
+    t_acc = ramp * v_peak / a_max
+    t_cruise = (distance - v_peak * t_acc) / v_peak
+    return v_peak, t_acc, 2 * t_acc + max(t_cruise, 0.0)
+
+
+def _profile_sample(t, distance, v_peak, t_acc, duration, profile):
+    """在时刻t（数组）采样位移和速度"""
+    t = np.clip(t, 0.0, duration)
+    s = np.empty_like(t)
+    v = np.empty_like(t)
+    if duration == 0:
+        s[:] = distance
+        v[:] = 0.0
+        return s, v
+
+    def ramp(tau):
+        if profile == 's_curve':
+            w = 2 * math.pi / t_acc
+            pos = v_peak * (tau**2 / (2 * t_acc) + (np.cos(w * tau) - 1) / (w**2 * t_acc))
+            vel = v_peak * (tau / t_acc - np.sin(w * tau) / (2 * math.pi))
+        else:
+            pos = v_peak * tau**2 / (2 * t_acc)
+            vel = v_peak * tau / t_acc
+        return pos, vel
+
+    acc = t < t_acc
+    dec = t > duration - t_acc
+    cruise = ~(acc | dec)
+    s[acc], v[acc] = ramp(t[acc])
+    s[cruise] = v_peak * t_acc / 2 + v_peak * (t[cruise] - t_acc)
+    v[cruise] = v_peak
+    pos, vel = ramp(duration - t[dec])
+    s[dec] = distance - pos
+    v[dec] = vel
+    return s, v
+
+
+def _sample_times(duration, rate_hz):
+    """按发送频率采样的时间点，末点为终点时刻"""
+    dt = 1.0 / rate_hz
+    times = np.arange(0.0, duration, dt)
+    return np.append(times[1:], duration) if duration > 0 else np.array([0.0])
+
+
+def _sampled_acceleration(times, positions, q_start):
+    """由采样点（含起点）差分得到的各关节最大加速度"""
+    if len(times) < 2:
+        return np.zeros(positions.shape[1])
+    t = np.concatenate(([0.0], times))
+    q = np.vstack((q_start, positions))
+    return np.max(np.abs(np.gradient(np.gradient(q, t, axis=0), t, axis=0)), axis=0)
+
+
+def plan_joint_move(q_start, q_end, max_velocity=DEFAULT_MAX_VELOCITY,
+                    max_acceleration=DEFAULT_MAX_ACCELERATION,
+                    rate_hz=DEFAULT_RATE_HZ, profile='s_curve'):
+    """
+    关节空间点到点同步运动，各关节同时起止，用时由最受限的关节决定
+
+    参数:
+        q_start, q_end: (6,) 起止关节角
+        max_velocity, max_acceleration: 标量或(6,)各关节限制
+        rate_hz: 采样频率
+        profile: 'trapezoid' 或 's_curve'
+    """
+    q_start = np.asarray(q_start, dtype=float)
+    delta = np.asarray(q_end, dtype=float) - q_start
+    v_lim = np.broadcast_to(np.asarray(max_velocity, dtype=float), delta.shape)
+    a_lim = np.broadcast_to(np.asarray(max_acceleration, dtype=float), delta.shape)
+
+    # 归一化路径参数 s∈[0,1]，其速度/加速度上限由各关节限制共同决定
+    moving = np.abs(delta) > 1e-12
+    if not np.any(moving):
+        return JointTrajectory(np.array([0.0]), q_start[None, :].copy(), np.zeros((1, len(delta))))
+    v_norm = np.min(v_lim[moving] / np.abs(delta[moving]))
+    a_norm = np.min(a_lim[moving] / np.abs(delta[moving]))
+
+    v_peak, t_acc, duration = _profile_timing(1.0, v_norm, a_norm, profile)
+    times = _sample_times(duration, rate_hz)
+    s, ds = _profile_sample(times, 1.0, v_peak, t_acc, duration, profile)
+    return JointTrajectory(times, q_start + s[:, None] * delta, ds[:, None] * delta)
+
+
+def plan_cartesian_line(start, end, max_velocity=DEFAULT_MAX_VELOCITY,
+                        max_acceleration=DEFAULT_MAX_ACCELERATION,
+                        rate_hz=DEFAULT_RATE_HZ, profile='s_curve', resolution=1.0):
+    """
+    笛卡尔直线运动的关节轨迹：沿直线做速度曲线规划，每个采样点做逆运动学
+
+    以直线上关节角对弧长一、二阶导数的最大值换算出弧长方向的速度/加速度上限，
+    采样后再按差分速度/加速度校核，保证任一关节都不超限。
+    目标不可达，或重新规划MAX_RESCALE_STEPS次后仍超限时返回None
+    """
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    length = float(np.linalg.norm(end - start))
+    v_lim = np.asarray(max_velocity, dtype=float)
+    a_lim = np.asarray(max_acceleration, dtype=float)
+
+    # 估计 dq/ds 和 d²q/ds²
+    n = max(3, int(length / resolution) + 1)
+    probe = np.linspace(start, end, n)
+    q_probe, valid = CO.calculate_all_angles_batch(probe)
+    if not valid.all():
+        return None
+    if length == 0:
+        return JointTrajectory(np.array([0.0]), q_probe[:1], np.zeros((1, 6)), probe[:1])
+    step = length / (n - 1)
+    dq = np.gradient(q_probe, step, axis=0)
+    dq_ds = np.max(np.abs(dq), axis=0)
+    d2q_ds2 = np.max(np.abs(np.gradient(dq, step, axis=0)), axis=0)
+
+    # 关节加速度 q̈ = q'·s̈ + q''·ṡ²：速度上限同时保证曲率项不超过加速度限制的一半，
+    # 剩余的加速度余量分给弧长方向
+    v_lim = np.broadcast_to(v_lim, dq_ds.shape)
+    a_lim = np.broadcast_to(a_lim, dq_ds.shape)
+    sensitive = dq_ds > 1e-12
+    curved = d2q_ds2 > 1e-12
+    v_path = np.min(v_lim[sensitive] / dq_ds[sensitive]) if np.any(sensitive) else np.inf
+    if np.any(curved):
+        v_path = min(v_path, np.min(np.sqrt(0.5 * a_lim[curved] / d2q_ds2[curved])))
+    a_path = np.min((a_lim[sensitive] - d2q_ds2[sensitive] * v_path**2) / dq_ds[sensitive]) if np.any(sensitive) else np.inf
+
+    direction = (end - start) / length
+    for _ in range(MAX_RESCALE_STEPS):
+        v_peak, t_acc, duration = _profile_timing(length, v_path, a_path, profile)
+        times = _sample_times(duration, rate_hz)
+        s, ds = _profile_sample(times, length, v_peak, t_acc, duration, profile)
+        points = start + s[:, None] * direction
+        positions, valid = CO.calculate_all_angles_batch(points)
+        if not valid.all():
+            return None
+        velocities = np.gradient(positions, times, axis=0) if len(times) > 1 else np.zeros_like(positions)
+
+        # 采样后按差分速度/加速度校核，超限则按比例放慢（用时×√r，速度÷√r，加速度÷r）
+        ratio = max(np.max(_sampled_acceleration(times, positions, q_probe[0]) / a_lim),
+                    np.max(np.abs(velocities) / v_lim) ** 2)
+        if ratio <= 1.0:
+            return JointTrajectory(times, positions, velocities, points)
+        v_path /= math.sqrt(ratio)
+        a_path /= ratio
+    return None
+
+
+if __name__ == '__main__':
+    trajectory = plan_cartesian_line((175, -100, 75), (175, 100, 100))
+    print(f"采样点: {len(trajectory.times)}, 用时: {trajectory.duration:.3f}s")
+    print(f"最大关节速度: {np.abs(trajectory.velocities).max(axis=0)}")
+    q_start, _ = CO.calculate_all_angles_batch([(175, -100, 75)])
+    print(f"最大关节加速度: {_sampled_acceleration(trajectory.times, trajectory.positions, q_start[0])}")